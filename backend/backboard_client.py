@@ -3,13 +3,29 @@
 import os
 import json
 import re
+import asyncio
+import bisect
+import hashlib
+import heapq
+import inspect
+import itertools
 import logging
-from datetime import datetime
-from typing import Optional, Type, Any
-from .models import InvestorProfile
+import operator
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from functools import lru_cache, partial
+from pathlib import Path
+from typing import Optional, Type, Any, AsyncIterator, Callable, NamedTuple
+from .models import InvestorProfile, Objective, Constraints, Preferences
+from .sector_data import get_sectors_by_keywords, find_sector_mentions
 
 logger = logging.getLogger(__name__)
 
+# Assistant IDs are persisted here so a fresh process (or the short-lived
+# clients created by ticker_lookup.py) can skip the list_assistants round-trip
+ASSISTANT_CACHE_FILE = Path(os.getenv("XDG_CACHE_HOME") or Path.home() / ".cache") / "portfolio-copilot" / "assistants.json"
+
 # Try to import the Backboard SDK - make it optional
 try:
     from backboard import BackboardClient as SDKClient
@@ -19,21 +35,687 @@ except ImportError:
     SDKClient = None
     logger.warning("backboard SDK not installed. Backboard integration will be disabled. Install with: pip install backboard-sdk")
 
+# httpx is optional here - it is only used to give the SDK a pooled connection client
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    httpx = None
+    HTTPX_AVAILABLE = False
+
+# orjson is optional - memory payloads fall back to compact stdlib JSON
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    orjson = None
+    ORJSON_AVAILABLE = False
+
+# google-re2 is optional - patterns run over user-typed text use its linear-time engine when installed
+try:
+    import re2
+    RE2_AVAILABLE = True
+except ImportError:
+    re2 = None
+    RE2_AVAILABLE = False
+
+
+def _user_text_re(pattern: str):
+    """Compile a pattern that scans user-supplied text (RE2 when available, else stdlib re)."""
+    if RE2_AVAILABLE:
+        try:
+            return re2.compile(pattern)
+        except re2.error as e:
+            logger.debug("RE2 cannot compile %r (%s), using re", pattern, e)
+    return re.compile(pattern)
+
+
+def _dumps(obj: Any) -> str:
+    """Serialize a memory payload to compact JSON."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+    return json.dumps(obj, separators=(",", ":"))
+
+
+def dumps_indented(obj: Any) -> str:
+    """Serialize to JSON indented by two spaces, for files people read and edit."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2).decode()
+    return json.dumps(obj, indent=2)
+
+
+def _loads(data: str) -> Any:
+    """Parse a memory payload; raises json.JSONDecodeError on bad input with either backend."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# Field extractors for memory objects, built once per memory class on first sighting
+_MEMORY_EXTRACTORS: dict[type, Callable[[Any], tuple[dict, Any, Any]]] = {}
+
+
+def _build_memory_extractor(memory: Any) -> Callable[[Any], tuple[dict, Any, Any]]:
+    """Inspect a memory once and return a getter for (metadata, content, memory_id)."""
+    if isinstance(memory, dict):
+        return lambda m: (m.get('metadata') or {}, m.get('content'), m.get('id') or m.get('memory_id'))
+    if not hasattr(memory, 'metadata'):
+        return lambda m: ({}, str(m) if m else None, None)
+    id_attr = 'id' if hasattr(memory, 'id') else 'memory_id' if hasattr(memory, 'memory_id') else None
+    has_content = hasattr(memory, 'content')
+    if id_attr and has_content:
+        return lambda m: (m.metadata or {}, m.content, getattr(m, id_attr))
+    return lambda m: (
+        m.metadata or {},
+        m.content if has_content else None,
+        getattr(m, id_attr) if id_attr else None
+    )
+
+
+def _memory_fields(memory: Any) -> tuple[dict, Any, Optional[str]]:
+    """Normalize an SDK memory object or dict to (metadata, content, memory_id)."""
+    extractor = _MEMORY_EXTRACTORS.get(type(memory))
+    if extractor is None:
+        extractor = _MEMORY_EXTRACTORS[type(memory)] = _build_memory_extractor(memory)
+    metadata, content, mem_id = extractor(memory)
+    return metadata, content, str(mem_id) if mem_id else None
+
+
+# One keep-alive connection pool per process, shared by every BackboardClient
+# (ticker_lookup.py creates a client per lookup); closed once at app shutdown
+_shared_http_client: Optional[Any] = None
+
+# Writes queued within this window are sent together
+WRITE_BATCH_WINDOW_SECONDS = 0.05
+# Backoff between thread-message polls while waiting for an assistant reply (last value repeats)
+POLL_DELAYS_SECONDS = (0.25, 0.5, 1.0, 1.5, 2.0)
+# Seconds to wait for the AI explanation before answering with the template; the request keeps running
+EXPLANATION_TIMEOUT_SECONDS = 20.0
+# AI explanations kept per process, keyed by the full prompt
+EXPLANATION_CACHE_SIZE = 128
+# Extracted profiles kept per process, keyed by a hash of the normalized onboarding text
+EXTRACTED_PROFILE_CACHE_SIZE = 512
+# Extraction threads kept per user (least recently used dropped first)
+PROFILE_THREAD_POOL_SIZE = 500
+# Documented working cheap model for profile extraction
+PROFILE_EXTRACTION_MODEL = "gpt-4o-mini"
+# Attempts for a background profile write before it is left in-memory only
+ASYNC_WRITE_ATTEMPTS = 4
+
+
+def _sdk_http_client_param() -> Optional[str]:
+    """Name of the SDK constructor argument annotated as an httpx.AsyncClient, if any.
+    
+    Without one the SDK keeps its own HTTP client - the pool is never passed to a parameter
+    that merely looks like it might take one.
+    """
+    if SDKClient is None:
+        return None
+    try:
+        params = inspect.signature(SDKClient.__init__).parameters
+    except (TypeError, ValueError):
+        return None
+    for name, param in params.items():
+        annotation = param.annotation
+        if annotation is inspect.Parameter.empty:
+            continue
+        # Covers httpx.AsyncClient, Optional[httpx.AsyncClient] and string annotations alike
+        if "httpx.AsyncClient" in (annotation if isinstance(annotation, str) else repr(annotation)):
+            return name
+    return None
+
+
+def _get_shared_http_client() -> Any:
+    """Create the shared pooled httpx client on first use."""
+    global _shared_http_client
+    if _shared_http_client is None:
+        _shared_http_client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=50, max_keepalive_connections=20, keepalive_expiry=60.0),
+            # Model calls can take a while - only fail fast on connect
+            timeout=httpx.Timeout(120.0, connect=10.0)
+        )
+    return _shared_http_client
+
+
+async def close_shared_http_client() -> None:
+    """Close the process-wide httpx pool; call once when the app shuts down."""
+    global _shared_http_client
+    if _shared_http_client is not None:
+        await _shared_http_client.aclose()
+        _shared_http_client = None
+
+
+# Sector aliases never change while the process runs - load and format them once
+SECTOR_ALIASES_FILE = Path(__file__).parent.parent / "data" / "sector_aliases.json"
+_aliases_cache: Optional[dict] = None
+_alias_mapping_cache: dict[int, str] = {}
+
+
+def _load_aliases_sync() -> dict:
+    """Read sector_aliases.json (blocking)."""
+    with open(SECTOR_ALIASES_FILE, 'r') as f:
+        return json.load(f)
+
+
+async def _alias_mapping_text(limit: int) -> str:
+    """Prompt table rows `exact_name|alias,alias,...` with the first `limit` aliases per sector."""
+    global _aliases_cache
+    text = _alias_mapping_cache.get(limit)
+    if text is None:
+        if _aliases_cache is None:
+            # First use only - keep the disk read off the event loop
+            _aliases_cache = await asyncio.to_thread(_load_aliases_sync)
+        text = "".join(
+            f"{sector_info['exact_name']}|{','.join(sector_info['aliases'][:limit])}\n"
+            for sector_info in _aliases_cache['sector_aliases'].values()
+        )
+        _alias_mapping_cache[limit] = text
+    return text
+
+
+# Onboarding text sent to the model: whitespace collapsed, control/zero-width chars dropped, capped
+MAX_PROMPT_ONBOARDING_CHARS = 2000
+_WHITESPACE_RE = re.compile(r"\s+")
+_CTRL_TABLE = dict.fromkeys([*range(0x00, 0x20), 0x7F, 0x200B, 0x200C, 0x200D, 0x2060, 0xFEFF])
+
+
+def _normalize_onboarding_text(text: str) -> str:
+    """Onboarding text as sent in extraction prompts."""
+    normalized = _WHITESPACE_RE.sub(" ", text).translate(_CTRL_TABLE).strip()
+    if len(normalized) > MAX_PROMPT_ONBOARDING_CHARS:
+        logger.info(f"Onboarding text truncated from {len(normalized)} to {MAX_PROMPT_ONBOARDING_CHARS} chars for the model prompt")
+        normalized = normalized[:MAX_PROMPT_ONBOARDING_CHARS]
+    return normalized
+
+
+def _fail_extractions(batch: list[tuple[str, Optional[str], asyncio.Future]], error: BaseException) -> None:
+    """Resolve every still-pending queued extraction with `error`."""
+    for _, _, future in batch:
+        if not future.done():
+            future.set_exception(error)
+
+
+_SHORT_EXTRACT_PROMPT = "Extract investor profile from the following text. Return ONLY valid JSON matching InvestorProfile schema."
+_BATCH_EXTRACT_INSTRUCTIONS = (
+    "There are {count} separate onboarding texts below, numbered [1]..[{count}]. "
+    "Return ONLY a JSON array with exactly one InvestorProfile object per text, in the same order."
+)
+
+
+# Aliases that are ordinary onboarding vocabulary ("capital appreciation", "I want it to grow")
+_AMBIGUOUS_ALIASES = frozenset({"it", "data", "content", "capital", "investment", "investments", "trading"})
+_alias_scanner_cache: Optional[tuple[re.Pattern, dict[str, str]]] = None
+
+
+async def _alias_scanner() -> tuple[re.Pattern, dict[str, str]]:
+    """One compiled alternation over every sector alias, plus the alias -> exact_name map."""
+    global _aliases_cache, _alias_scanner_cache
+    if _alias_scanner_cache is None:
+        if _aliases_cache is None:
+            _aliases_cache = await asyncio.to_thread(_load_aliases_sync)
+        alias_to_sector: dict[str, str] = {}
+        for sector_info in _aliases_cache['sector_aliases'].values():
+            for alias in sector_info['aliases']:
+                alias = alias.lower()
+                if alias not in _AMBIGUOUS_ALIASES:
+                    alias_to_sector.setdefault(alias, sector_info['exact_name'])
+        # A sector's own name always maps to itself (e.g. "utilities" is also an Energy alias)
+        for sector_info in _aliases_cache['sector_aliases'].values():
+            alias_to_sector[sector_info['exact_name'].lower()] = sector_info['exact_name']
+        # Longest first so "real estate investment trust" wins over "real estate"
+        alternation = "|".join(re.escape(a) for a in sorted(alias_to_sector, key=len, reverse=True))
+        _alias_scanner_cache = (_user_text_re(rf"\b(?:{alternation})\b"), alias_to_sector)
+    return _alias_scanner_cache
+
+
+# Onboarding text with none of these words and no sector alias carries no profile signal
+# and gets the default profile without a model call (length alone says nothing: "no tech")
+_PROFILE_KEYWORDS = frozenset({
+    "risk", "averse", "conservative", "moderate", "balanced", "aggressive", "safe", "safety", "volatility",
+    "growth", "income", "dividend", "dividends", "yield", "capital", "appreciation", "both",
+    "year", "years", "month", "months", "term", "horizon", "retire", "retirement",
+    "holdings", "position", "positions", "avoid", "exclude", "rebalance", "monthly", "quarterly", "annual", "yearly",
+    "steady", "stable", "payout", "payouts", "preserve", "preservation", "cash", "bonds", "save", "savings",
+    "invest", "investing", "investment", "investments", "investor", "portfolio", "stocks", "sectors", "money",
+})
+_WORD_RE = _user_text_re(r"[a-z]+")
+
+
+async def _has_profile_signal(text_lower: str) -> bool:
+    """True when lowercased onboarding text mentions any profile keyword or sector alias."""
+    # finditer stops at the first keyword instead of materializing every word
+    if any(m.group() in _PROFILE_KEYWORDS for m in _WORD_RE.finditer(text_lower)):
+        return True
+    alias_re, _ = await _alias_scanner()
+    return alias_re.search(text_lower) is not None
+
+
+# Static profile-extraction prompt; only {alias_mapping_text} is filled in (once).
+# Rules are a compact JSON spec rather than prose to keep prompt tokens down.
+_EXTRACT_SYSTEM_PROMPT_TEMPLATE = """Extract an InvestorProfile from the user's onboarding text. Return ONLY the JSON object - no prose, no markdown, no code blocks.
+
+SECTORS (exact_name|aliases). sectors_like/sectors_avoid must contain exact_name values only, e.g. biotech->Healthcare, tech->Technology, banks->Financial Services:
+{alias_mapping_text}
+RULES (explicit numbers always beat keywords; "3 years" is 36, not 60):
+{{"horizon_months":{{"N years":"N*12","N months":"N","retirement in N years":"N*12","long term":60,"short term":12,"early investor":72,"retirement":180,"default":60}},
+"risk_score":{{"risk averse|very conservative|low risk|conservative":25,"moderate|balanced":50,"aggressive|high risk|risk tolerant":75,"very aggressive|very high risk":85,"default":50}},
+"objective.type":{{"growth|capital appreciation":"growth","income|dividend|yield":"income","balanced|both":"balanced","default":"balanced"}},
+"constraints":{{"max N holdings":"max_holdings=N","max N% per position|no position exceed N%":"max_position_pct=N"}},
+"preferences.sectors_avoid":"sectors after avoid|exclude|don't want",
+"rebalance_frequency":{{"monthly":"monthly","quarterly":"quarterly","annual|yearly":"annual","default":"quarterly"}}}}
+
+SCHEMA:
+{{"user_id":str,"objective":{{"type":"growth|income|balanced","notes":str}},"horizon_months":int,"risk_score":int 0-100,"constraints":{{"max_holdings":int,"max_position_pct":float,"exclusions":[str],"options_allowed":bool,"leverage_allowed":bool}},"preferences":{{"sectors_like":[str],"sectors_avoid":[str],"regions_like":[str]}},"rebalance_frequency":"monthly|quarterly|annual","last_updated":"ISO datetime"}}"""
+_extract_system_prompt_cache: Optional[str] = None
+
+
+async def _extract_system_prompt() -> str:
+    """Profile-extraction system prompt with the sector alias mapping filled in."""
+    global _extract_system_prompt_cache
+    if _extract_system_prompt_cache is None:
+        _extract_system_prompt_cache = _EXTRACT_SYSTEM_PROMPT_TEMPLATE.format_map(
+            {"alias_mapping_text": await _alias_mapping_text(10)}
+        )
+    return _extract_system_prompt_cache
+
+
+_UPDATE_SYSTEM_PROMPT_TEMPLATE = """Given existing InvestorProfile JSON and update_text, return updated InvestorProfile JSON only. Preserve fields not mentioned.
+
+SECTOR ALIAS MAPPING (exact_name|aliases, use EXACT sector names):
+{alias_mapping_text}
+
+For sectors_like and sectors_avoid, map any keywords to EXACT sector names (exact_name values only)."""
+_update_system_prompt_cache: Optional[str] = None
+
+
+async def _update_system_prompt() -> str:
+    """Profile-update system prompt with the sector alias mapping filled in."""
+    global _update_system_prompt_cache
+    if _update_system_prompt_cache is None:
+        _update_system_prompt_cache = _UPDATE_SYSTEM_PROMPT_TEMPLATE.format_map(
+            {"alias_mapping_text": await _alias_mapping_text(8)}
+        )
+    return _update_system_prompt_cache
+
+# Explanation prompts; the system prompt only varies with plan type, risk score and horizon
+_RISK_AVERSE_NOTE_TEMPLATE = "\n\nIMPORTANT: This client is RISK-AVERSE (risk score: {risk_score}/100). Emphasize:\n- Enhanced diversification across sectors (max 20-25% per sector)\n- Higher defensive allocations (bonds, low-volatility stocks)\n- Higher cash reserves for safety\n- Reduced concentration risk\n- Why diversification is critical for risk-averse portfolios"
+_EXPLAIN_SYSTEM_PROMPT_TEMPLATE = """You are a sophisticated investment advisor. Provide a clear, personalized explanation of the {plan_type} plan that ties each recommendation directly to the user's profile and current portfolio state. Be specific about why each action is recommended.{risk_note}
+
+Structure your response as:
+1. **Overview** (2-3 sentences): Summary of what's changing and why, referencing key profile attributes (risk score, horizon, objective). If risk-averse, emphasize risk management and diversification.
+2. **Key Recommendations** (3-5 bullets): For each major action (BUY/SELL), explain:
+   - What ticker/sector is being adjusted
+   - Why this aligns with their profile (e.g., "Adding X sector exposure aligns with your {risk_score}/100 risk tolerance and {horizon_months}-month horizon")
+   - How it moves toward target allocation
+   - For risk-averse clients: Explain how this maintains sector diversification (no single sector >20-25%)
+3. **Portfolio Improvements** (2-3 bullets): Explain improvements in:
+   - Sector diversification (if concentration improved, mention sector weight limits enforced)
+   - Risk management (if moving toward target risk profile, emphasize for risk-averse)
+   - Sector alignment (if better matching preferred sectors, but balanced with diversification needs)
+   - Defensive positioning (for risk-averse clients)
+4. **Considerations** (1-2 bullets): Assumptions, risks, or tradeoffs
+
+Be concise but specific. Reference actual tickers, sectors, and profile numbers. For risk-averse clients, always emphasize how the portfolio maintains proper sector diversification (max 20-25% per sector) even when incorporating preferred sectors. No generic financial advice language."""
+_EXPLAIN_PROMPT_TEMPLATE = """{context_str}
+### RECOMMENDED ACTIONS ({plan_type}):
+{actions}
+
+### PLAN NOTES:
+{notes}
+
+### WARNINGS:
+{warnings}
+
+Generate a personalized explanation that:
+1. References specific profile attributes (risk score {risk_score}/100, {horizon_months}-month horizon, {objective} objective)
+2. Explains how each major action (BUY/SELL) aligns with their goals
+3. Highlights portfolio improvements (diversification, sector alignment, risk management)
+4. Uses specific numbers from the current portfolio and target allocation
+
+Be specific and actionable. Reference actual tickers and sectors mentioned in the plan."""
+
+
+@lru_cache(maxsize=256)
+def _explain_system_prompt(plan_type: str, risk_score: int, horizon_months: int) -> str:
+    """Explanation system prompt for a plan type and profile; risk-averse profiles (<50) get the extra note."""
+    values = {"plan_type": plan_type, "risk_score": risk_score, "horizon_months": horizon_months}
+    values["risk_note"] = _RISK_AVERSE_NOTE_TEMPLATE.format_map(values) if risk_score < 50 else ""
+    return _EXPLAIN_SYSTEM_PROMPT_TEMPLATE.format_map(values)
+
+
+# One holding row in the explanation context
+_HOLDING_LINE = "  - {ticker}: {weight_pct}% ({sector})"
+# Budget-mode explanation: closing block per plan type, filled with the rebalance frequency
+_TEMPLATE_ASSUMPTIONS_NEW = """
+Assumptions: Portfolio constructed based on your investment profile. Rebalancing recommended every {freq} per your preference.
+Risks / tradeoffs: Diversification does not guarantee returns. Market movements may require ongoing adjustments. No guarantees on returns.
+"""
+_TEMPLATE_ASSUMPTIONS_REBALANCE = """
+Assumptions: Rebalancing to target every {freq} per your preference.
+Risks / tradeoffs: Market movements may require ongoing adjustments. No guarantees on returns.
+"""
+
+
+_iso_second: int = -1
+_iso_text: str = ""
+
+
+def _iso_now() -> str:
+    """UTC ISO-8601 timestamp at second resolution, reformatted at most once per second."""
+    global _iso_second, _iso_text
+    now = int(time.time())
+    if now != _iso_second:
+        _iso_text = datetime.fromtimestamp(now, tz=timezone.utc).isoformat(timespec="seconds")
+        _iso_second = now
+    return _iso_text
+
+
+# Model-reply JSON recovery (fenced blocks, bare objects, common LLM syntax slips)
+_JSON_BLOCK_RE = re.compile(r'```(?:json)?\s*(.*?)\s*```', re.DOTALL)
+_JSON_DECODER = json.JSONDecoder()
+_JSON_OBJECT_RE = re.compile(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', re.DOTALL)
+_TRAILING_COMMA_RE = re.compile(r',\s*([}\]])')
+_LINE_COMMENT_RE = re.compile(r'//.*?$', re.MULTILINE)
+_BLOCK_COMMENT_RE = re.compile(r'/\*.*?\*/', re.DOTALL)
+
+
+# Normalized thread-message roles written by the model (enum value, or str() of the enum)
+_ASSISTANT_ROLES = frozenset({"assistant", "ai", "bot", "messagerole.assistant"})
+# Raw role (API string or MessageRole enum) -> normalized role; seeded with the exact strings
+# the API sends, other roles are memoized after their first normalization
+_ROLE_NAMES: dict[Any, str] = {"assistant": "assistant", "ai": "assistant", "bot": "assistant", "user": "user", "system": "system"}
+_MAX_ROLE_NAMES = 64
+# Message classes seen with both .role and .content (SDK models): read with one attrgetter
+_ROLE_CONTENT = operator.attrgetter("role", "content")
+_role_content_classes: set[type] = set()
+
+
+# Assistant replies that report a backend error, or only confirm delivery
+ERROR_RE = re.compile(r"llm error|api error|invalid model|not supported|supported models", re.IGNORECASE)
+NONSUBSTANTIAL_RE = re.compile(r"message added|successfully|message sent", re.IGNORECASE)
+# Both in one pass; the "error" group tells which matched first
+_REPLY_REJECT_RE = re.compile(rf"(?P<error>{ERROR_RE.pattern})|{NONSUBSTANTIAL_RE.pattern}", re.IGNORECASE)
+# SDK errors that mean the prompt was too long
+_LENGTH_ERROR_RE = re.compile(r"length|too long|truncat|max", re.IGNORECASE)
+
+
+def response_content(response) -> Optional[str]:
+    """Reply text from an add_message response (object or dict) in any SDK shape, or None."""
+    if isinstance(response, dict):
+        return (
+            (response.get('latest_message') or {}).get('content', '') or
+            (response.get('message') or {}).get('content', '') or
+            response.get('content', '') or
+            response.get('text', '')
+        )
+    try:
+        return response.content
+    except AttributeError:
+        pass
+    for field in ('latest_message', 'message'):
+        try:
+            msg_obj = getattr(response, field)
+        except AttributeError:
+            continue
+        if isinstance(msg_obj, dict):
+            return msg_obj.get('content', '')
+        try:
+            return msg_obj.content
+        except AttributeError:
+            # A bare 'message' may be the content itself
+            return str(msg_obj) if field == 'message' else None
+    return None
+
+
+class _HorizonInfo(NamedTuple):
+    months: int
+    explicit: bool  # stated as a number of years/months, not inferred from keywords
+
+
+class _PortfolioContextLayout(NamedTuple):
+    """Which current_portfolio_context keys the explanation prompt shows, and under which labels."""
+    header: str
+    holdings_key: str
+    holdings_label: str
+    holdings_cap: int
+    extra_key: str
+    extra_line: str  # format template for the extra_key value
+    sector_keys: tuple[str, ...]  # first non-empty allocation wins
+    sector_label: str
+
+
+_NEW_PORTFOLIO_LAYOUT = _PortfolioContextLayout(
+    header="### CONSTRUCTED PORTFOLIO:",
+    holdings_key='constructed_portfolio',
+    holdings_label="Portfolio Holdings",
+    holdings_cap=15,  # Show all constructed
+    extra_key='total_holdings_constructed',
+    extra_line="Total Holdings: {}",
+    sector_keys=('sector_allocation',),
+    sector_label="Portfolio Sector Allocation",
+)
+_REBALANCE_LAYOUT = _PortfolioContextLayout(
+    header="### CURRENT PORTFOLIO STATE:",
+    holdings_key='current_holdings',
+    holdings_label="Top Holdings",
+    holdings_cap=10,  # Top 10
+    extra_key='current_cash_pct',
+    extra_line="Current Cash: {}%",
+    sector_keys=('current_sector_allocation', 'sector_allocation'),
+    sector_label="Current Sector Allocation",
+)
+
+
+class _Msg(NamedTuple):
+    role: str
+    content: Optional[str]
+
+
+def _message_text(content: Any) -> Optional[str]:
+    """Plain text of a message's content (str, text/body object, or list of parts)."""
+    # Exact-type check first: plain str is by far the common case
+    if content.__class__ is str or content is None:
+        return content or None
+    if hasattr(content, 'text'):
+        return _message_text(content.text)
+    if hasattr(content, 'body'):
+        return _message_text(content.body)
+    if isinstance(content, (list, tuple)):
+        return ' '.join(str(c) for c in content) or None
+    return str(content)
+
+
+def _role_name(role) -> str:
+    """Normalized role for a raw message role: "assistant" for any assistant alias, else lowercased."""
+    try:
+        return _ROLE_NAMES[role]
+    except KeyError:
+        pass
+    except TypeError:  # unhashable role object
+        return str(role).lower()
+    role_str = str(getattr(role, "value", role)).lower()  # MessageRole enum
+    if role_str in _ASSISTANT_ROLES:
+        role_str = "assistant"
+    if len(_ROLE_NAMES) < _MAX_ROLE_NAMES:
+        _ROLE_NAMES[role] = role_str
+    return role_str
+
+
+def coerce_msg(msg) -> _Msg:
+    """Role ("assistant" for any assistant alias, "" if absent) and text of a thread message, reflected once."""
+    cls = msg.__class__
+    if cls in _role_content_classes:
+        try:
+            role, content = _ROLE_CONTENT(msg)
+        except AttributeError:
+            _role_content_classes.discard(cls)
+            return coerce_msg(msg)
+    elif isinstance(msg, dict):
+        role = msg.get("role") or msg.get("type")
+        content = msg.get("content")
+    else:
+        try:
+            role, content = _ROLE_CONTENT(msg)
+            _role_content_classes.add(cls)
+        except AttributeError:
+            role = getattr(msg, "role", None)
+            content = getattr(msg, "content", None)
+    if content is None:
+        if isinstance(msg, dict):
+            content = next((msg[key] for key in ('text', 'body', 'message') if msg.get(key).__class__ is str), None)
+        else:
+            content = getattr(msg, "text", None)
+    if role is None:
+        return _Msg("", _message_text(content))
+    return _Msg(_role_name(role), _message_text(content))
+
+
+# Deterministic onboarding-text rules (mirror the extraction prompt's RULES)
+_MAX_HOLDINGS_RE = _user_text_re(r'max(?:imum)?\s+(\d+)\s+holdings?')
+# Max-position phrasings as one alternation; group N is alternative N, lower N wins
+_MAX_POSITION_RE = _user_text_re(
+    r'max(?:imum)?\s+(\d+(?:\.\d+)?)\s*%'  # "max 15%"
+    r'|(\d+(?:\.\d+)?)\s*%\s+per\s+position'  # "15% per position"
+    r'|no\s+.*?exceed\s+(\d+(?:\.\d+)?)\s*%'  # "no position exceed 15%"
+    r'|should\s+not\s+exceed\s+(\d+(?:\.\d+)?)\s*%'  # "should not exceed 15%"
+)
+
+
+def _max_position_pct(text_lower: str) -> Optional[float]:
+    """Max position % stated in the text, preferring the earlier phrasings above; one pass."""
+    if '%' not in text_lower:
+        return None
+    best = None
+    for match in _MAX_POSITION_RE.finditer(text_lower):
+        if best is None or match.lastindex < best.lastindex:
+            best = match
+            if best.lastindex == 1:
+                break
+    return float(best.group(best.lastindex)) if best else None
+
+
+# Negation in the 20 chars before an alias, with no clause break in between
+_AVOID_WINDOW = 20
+_AVOID_CONTEXT_RE = _user_text_re(r"\b(?:avoid|exclude|don'?t\s+want|no)\b[^,.;]*$")
+# Clause after avoid/don't want/exclude/no, up to the next comma or period (one pass for all four)
+_AVOID_PHRASE_RE = _user_text_re(r"\b(?:avoid|don'?t\s+want|exclude|no)\s+([^,\.]+)")
+# Onboarding text states a risk level
+_EXPLICIT_RISK_RE = _user_text_re(r'risk averse|conservative|aggressive|high risk|moderate|balanced')
+# Horizon phrasings as one alternation, most specific first; group N is alternative N and
+# lower N wins. Groups 1-5 are years, 6-7 months; the bare catch-alls must stay last in each
+_HORIZON_NUMBER_RE = _user_text_re(
+    r'retirement\s+in\s+(\d+)\s*years?'  # "retirement in 10 years"
+    r'|investing\s+for\s+(\d+)\s*years?'  # "investing for 20 years"
+    r'|investment\s+(?:horizon|timeline)\s+is\s+(\d+)\s*years?'  # "investment horizon/timeline is 5 years"
+    r'|(\d+)\s*year\s+horizon'  # "7 year horizon"
+    r'|(\d+)\s*years?'  # "3 years", "5 years", etc.
+    r'|need\s+(?:cash|money)\s+in\s+(\d+)\s*months?'  # "need cash in 24 months"
+    r'|(\d+)\s*months?'  # "18 months", "24 months", etc.
+)
+_HORIZON_YEAR_GROUPS = 5
+_RETIREMENT_YEARS_RE = _user_text_re(r'retirement.*?(\d+)\s*years?')
+# Demo fallback parser (looser than the rules above)
+_FALLBACK_MAX_RE = _user_text_re(r'max\s*(\d+)\s*(?:(?P<holdings>holdings?)|%)')  # "max 12 holdings" / "max 15%"
+_FALLBACK_EXCLUSIONS_RE = _user_text_re(r'(?:avoid|exclude)\s+([^.]+)')
+_CASH_MONTHS_RE = _user_text_re(r'(\d+)\s*month')
+_REBALANCE_KEYWORDS = (
+    ("monthly", frozenset({"monthly"})),
+    ("quarterly", frozenset({"quarterly"})),
+    ("annual", frozenset({"annual", "annually", "yearly"})),
+)
+
 
 class BackboardClient:
     """Client for interacting with Backboard.io API using official SDK."""
     
+    # Fixed attribute set - new instance state must be declared here
+    __slots__ = (
+        "api_key",
+        "base_url",
+        "project_id",
+        "budget_mode",
+        "verify_writes",
+        "profile_cache_ttl",
+        "_in_memory_storage",
+        "_decision_logs",
+        "_memory_storage",
+        "_profile_ttl",
+        "_profile_refreshes",
+        "_sdk_client",
+        "_assistant_id",
+        "_assistant_lock",
+        "_memory_index",
+        "_decision_log_index",
+        "_profile_parse_cache",
+        "_index_ready",
+        "_index_lock",
+        "_write_queue",
+        "_write_flusher",
+        "async_writes",
+        "_pending_writes",
+        "try_assistant_default",
+        "extract_batch_max",
+        "extract_batch_wait",
+        "_extract_queue",
+        "_extract_flusher",
+        "_extract_batches",
+        "_extracted_profiles",
+        "_thread_pool",
+        "_thread_initialized",
+        "_explanations",
+        "_explanation_tasks",
+        "raw_messages",
+    )
+    
     def __init__(self):
         self.api_key = os.getenv("BACKBOARD_API_KEY", "")
         self.base_url = os.getenv("BACKBOARD_BASE_URL", "https://app.backboard.io/api")
         self.project_id = os.getenv("BACKBOARD_PROJECT_ID", "")
         self.budget_mode = os.getenv("BUDGET_MODE", "false").lower() == "true"
+        self.verify_writes = os.getenv("VERIFY_WRITES", "false").lower() == "true"
+        self.profile_cache_ttl = float(os.getenv("PROFILE_CACHE_TTL_SECONDS", "60"))
+        self.async_writes = os.getenv("BACKBOARD_ASYNC_WRITES", "false").lower() == "true"
+        self.raw_messages = os.getenv("BACKBOARD_RAW_MESSAGES", "false").lower() == "true"
+        self.try_assistant_default = os.getenv("BACKBOARD_TRY_ASSISTANT_DEFAULT", "false").lower() == "true"
+        self.extract_batch_max = int(os.getenv("PROFILE_BATCH_MAX_SIZE", "8"))
+        self.extract_batch_wait = float(os.getenv("PROFILE_BATCH_MAX_WAIT_MS", "50")) / 1000
         
         # For demo purposes, if no API key, use in-memory storage
         self._in_memory_storage: dict[str, InvestorProfile] = {}
         self._decision_logs: dict[str, list[str]] = {}
+        self._memory_storage: dict[str, list[dict]] = {}
+        # time.monotonic() of the last Backboard fetch/store per cached profile
+        self._profile_ttl: dict[str, float] = {}
+        self._profile_refreshes: dict[str, asyncio.Task] = {}
         self._sdk_client: Optional[Any] = None
         self._assistant_id: Optional[str] = None
+        self._assistant_lock = asyncio.Lock()
+        # Latest Backboard memory per (user_id, memory type): {"id", "metadata", "content"}
+        self._memory_index: dict[tuple[str, str], dict] = {}
+        # Append-only decision log entries per user: {memory_id: (ts, line)}
+        self._decision_log_index: dict[str, dict[str, tuple[str, str]]] = {}
+        # Last parsed profile per user, keyed by a hash of the stored content
+        self._profile_parse_cache: dict[str, tuple[int, InvestorProfile]] = {}
+        self._index_ready = asyncio.Event()
+        self._index_lock = asyncio.Lock()
+        # Queued add_memory writes (assistant_id, content, metadata, fallback), created on first write
+        self._write_queue: Optional[asyncio.Queue] = None
+        self._write_flusher: Optional[asyncio.Task] = None
+        # Background profile writes (BACKBOARD_ASYNC_WRITES), awaited in close()
+        self._pending_writes: set[asyncio.Task] = set()
+        # Onboarding texts waiting to share one extraction call: (text, future)
+        self._extract_queue: Optional[asyncio.Queue] = None
+        self._extract_flusher: Optional[asyncio.Task] = None
+        self._extract_batches: set[asyncio.Task] = set()
+        # LRU of successful extractions (EXTRACTED_PROFILE_CACHE_SIZE entries)
+        self._extracted_profiles: OrderedDict[str, InvestorProfile] = OrderedDict()
+        # Backboard thread used for each user's extractions: {user_id: thread_id}
+        self._thread_pool: OrderedDict[str, str] = OrderedDict()
+        # Pooled threads whose first message already carried the extraction system prompt
+        self._thread_initialized: set[str] = set()
+        # LRU of AI explanations (EXPLANATION_CACHE_SIZE entries) and requests still in flight, keyed by prompt
+        self._explanations: OrderedDict[str, str] = OrderedDict()
+        self._explanation_tasks: dict[str, asyncio.Task] = {}
         
         if not SDK_AVAILABLE:
             logger.warning("Backboard SDK not available. Using in-memory storage only.")
@@ -43,14 +725,79 @@ class BackboardClient:
             logger.warning("BACKBOARD_API_KEY not set. Using in-memory storage for demo.")
         else:
             try:
-                # Initialize SDK client
-                self._sdk_client = SDKClient(api_key=self.api_key, base_url=self.base_url)
+                # Initialize SDK client, reusing pooled connections when the SDK accepts an HTTP client
+                sdk_kwargs = {"api_key": self.api_key, "base_url": self.base_url}
+                http_client_param = _sdk_http_client_param()
+                if http_client_param and HTTPX_AVAILABLE:
+                    sdk_kwargs[http_client_param] = _get_shared_http_client()
+                self._sdk_client = SDKClient(**sdk_kwargs)
                 logger.info(f"Backboard SDK client initialized (base_url: {self.base_url})")
+                self._assistant_id = self._load_cached_assistant_id()
             except Exception as e:
                 logger.warning(f"Failed to initialize Backboard SDK: {e}")
                 logger.warning("Falling back to in-memory storage.")
                 self._sdk_client = None
     
+    def _assistant_cache_key(self) -> str:
+        """Key for the assistant ID cache (one entry per API key and base URL)."""
+        return hashlib.sha256(f"{self.base_url}|{self.api_key}".encode()).hexdigest()[:16]
+    
+    def _load_cached_assistant_id(self) -> Optional[str]:
+        """Load a previously resolved assistant ID from the on-disk cache."""
+        try:
+            with open(ASSISTANT_CACHE_FILE, 'r') as f:
+                assistant_id = json.load(f).get(self._assistant_cache_key())
+        except (OSError, ValueError, AttributeError):
+            return None
+        if assistant_id:
+            logger.info(f"Using cached assistant: {assistant_id}")
+        return assistant_id
+    
+    def _save_cached_assistant_id(self, assistant_id: str) -> None:
+        """Persist the assistant ID atomically so other processes can reuse it."""
+        try:
+            try:
+                with open(ASSISTANT_CACHE_FILE, 'r') as f:
+                    cache = json.load(f)
+                if not isinstance(cache, dict):
+                    cache = {}
+            except (OSError, ValueError):
+                cache = {}
+            cache[self._assistant_cache_key()] = assistant_id
+            ASSISTANT_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+            tmp_file = ASSISTANT_CACHE_FILE.with_name(f"{ASSISTANT_CACHE_FILE.name}.{os.getpid()}.tmp")
+            with open(tmp_file, 'w') as f:
+                json.dump(cache, f)
+            os.replace(tmp_file, ASSISTANT_CACHE_FILE)
+        except OSError as e:
+            logger.warning(f"Could not persist assistant ID cache: {e}")
+    
+    async def close(self) -> None:
+        """Flush queued writes and cancel background work (the shared HTTP pool is closed by close_shared_http_client)."""
+        if self._pending_writes:
+            await asyncio.gather(*self._pending_writes, return_exceptions=True)
+        await self._drain_writes()
+        if self._write_flusher is not None:
+            self._write_flusher.cancel()
+            self._write_flusher = None
+        if self._extract_flusher is not None:
+            # The flusher fails the batch it is still collecting when cancelled
+            self._extract_flusher.cancel()
+            await asyncio.gather(self._extract_flusher, return_exceptions=True)
+            self._extract_flusher = None
+        if self._extract_queue is not None:
+            queued = []
+            while not self._extract_queue.empty():
+                queued.append(self._extract_queue.get_nowait())
+            _fail_extractions(queued, RuntimeError("BackboardClient closed"))
+        if self._extract_batches:
+            await asyncio.gather(*self._extract_batches, return_exceptions=True)
+        for task in list(self._profile_refreshes.values()):
+            task.cancel()
+        self._profile_refreshes.clear()
+        for task in list(self._explanation_tasks.values()):
+            task.cancel()
+    
     async def _ensure_assistant(self) -> Optional[str]:
         """Ensure we have an assistant for storing memories."""
         if not self._sdk_client:
@@ -59,29 +806,36 @@ class BackboardClient:
         if self._assistant_id:
             return self._assistant_id
         
-        try:
-            # Try to find existing assistant
-            assistants = await self._sdk_client.list_assistants()
-            for assistant in assistants:
-                if assistant.name == "Portfolio Copilot" or "portfolio" in assistant.name.lower():
-                    # Assistant ID might be in different attribute
-                    assistant_id = getattr(assistant, 'id', None) or getattr(assistant, 'assistant_id', None) or str(assistant)
-                    self._assistant_id = str(assistant_id)
-                    return self._assistant_id
+        # Serialize the lookup so concurrent cold-start requests issue a single list_assistants
+        async with self._assistant_lock:
+            if self._assistant_id:
+                return self._assistant_id
             
-            # Create new assistant if not found
-            assistant = await self._sdk_client.create_assistant(
-                name="Portfolio Copilot",
-                description="Manages investment profiles and portfolio recommendations."
-            )
-            # Get ID from assistant object
-            assistant_id = getattr(assistant, 'id', None) or getattr(assistant, 'assistant_id', None) or str(assistant)
-            self._assistant_id = str(assistant_id)
-            logger.info(f"Created assistant: {self._assistant_id}")
-            return self._assistant_id
-        except Exception as e:
-            logger.error(f"Error ensuring assistant: {e}", exc_info=True)
-            return None
+            try:
+                # Try to find existing assistant
+                assistants = await self._sdk_client.list_assistants()
+                for assistant in assistants:
+                    if assistant.name == "Portfolio Copilot" or "portfolio" in assistant.name.lower():
+                        # Assistant ID might be in different attribute
+                        assistant_id = getattr(assistant, 'id', None) or getattr(assistant, 'assistant_id', None) or str(assistant)
+                        self._assistant_id = str(assistant_id)
+                        self._save_cached_assistant_id(self._assistant_id)
+                        return self._assistant_id
+                
+                # Create new assistant if not found
+                assistant = await self._sdk_client.create_assistant(
+                    name="Portfolio Copilot",
+                    description="Manages investment profiles and portfolio recommendations."
+                )
+                # Get ID from assistant object
+                assistant_id = getattr(assistant, 'id', None) or getattr(assistant, 'assistant_id', None) or str(assistant)
+                self._assistant_id = str(assistant_id)
+                self._save_cached_assistant_id(self._assistant_id)
+                logger.info(f"Created assistant: {self._assistant_id}")
+                return self._assistant_id
+            except Exception as e:
+                logger.error(f"Error ensuring assistant: {e}", exc_info=True)
+                return None
     
     def _get_memory_key(self, user_id: str) -> str:
         """Get memory key for user profile."""
@@ -112,216 +866,343 @@ class BackboardClient:
                 logger.error(f"Unexpected memories response type: {type(memories_response)}, attributes: {dir(memories_response)}")
                 return []
     
+    def _index_memory(self, metadata: dict, content: Any, mem_id: Optional[str]) -> None:
+        """Record a memory by (user_id, type) so reads and writes can skip a full memory scan."""
+        mem_user_id = metadata.get("user_id")
+        mem_type = metadata.get("type")
+        if mem_user_id and mem_type and mem_id:
+            self._memory_index[(mem_user_id, mem_type)] = {
+                "id": mem_id,
+                "metadata": metadata,
+                "content": content,
+                "indexed_at": time.monotonic(),
+            }
+            if mem_type == "decision_log_entry":
+                self._decision_log_index.setdefault(mem_user_id, {})[mem_id] = (
+                    metadata.get("ts", ""), str(content or "")
+                )
+    
+    async def _iter_memories(self, assistant_id: str) -> AsyncIterator[tuple[dict, Any, Optional[str]]]:
+        """Yield (metadata, content, memory_id) per memory, indexing each as it is read."""
+        # get_memories returns a single unpaged response, so callers can stop early but not fetch less
+        memories_response = await self._sdk_client.get_memories(assistant_id)
+        for memory in self._extract_memories_list(memories_response):
+            fields = _memory_fields(memory)
+            self._index_memory(*fields)
+            yield fields
+    
+    def _memory_id_from_result(self, result) -> Optional[str]:
+        """Get the new memory ID from an add_memory response."""
+        if isinstance(result, dict):
+            mem_id = result.get('memory_id') or result.get('id')
+        else:
+            mem_id = getattr(result, 'memory_id', None) or getattr(result, 'id', None)
+        return str(mem_id) if mem_id else None
+    
+    async def _bootstrap_index(self, assistant_id: str) -> None:
+        """List memories once and fill the local index; later writes keep it current."""
+        if self._index_ready.is_set():
+            return
+        async with self._index_lock:
+            if self._index_ready.is_set():
+                return
+            count = 0
+            async for _ in self._iter_memories(assistant_id):
+                count += 1
+            self._index_ready.set()
+            logger.info("Indexed %s Backboard memories for assistant_id: %s", count, assistant_id)
+    
+    async def _ensure_indexed_assistant(self) -> Optional[str]:
+        """Resolve the assistant ID and make sure its memory index is loaded."""
+        assistant_id = await self._ensure_assistant()
+        if assistant_id:
+            await self._bootstrap_index(assistant_id)
+        return assistant_id
+    
+    def _profile_from_content(self, user_id: str, content) -> Optional[InvestorProfile]:
+        """Parse an InvestorProfile from stored memory content."""
+        content_hash = None
+        if isinstance(content, str):
+            # Unchanged content was already validated - skip the JSON parse and pydantic validation
+            content_hash = hash(content)
+            cached = self._profile_parse_cache.get(user_id)
+            if cached is not None and cached[0] == content_hash:
+                return cached[1]
+            try:
+                profile_dict = _loads(content)
+            except json.JSONDecodeError as e:
+                logger.error("Failed to parse profile JSON for user_id: %s: %s", user_id, e)
+                logger.debug("Content preview: %.500s", content)
+                return None
+        elif isinstance(content, dict):
+            profile_dict = content
+        else:
+            logger.error("Unexpected content type for user_id: %s: %s", user_id, type(content))
+            return None
+        
+        try:
+            profile = InvestorProfile(**profile_dict)
+        except Exception as e:
+            logger.error("Failed to create InvestorProfile from dict for user_id: %s: %s", user_id, e, exc_info=True)
+            return None
+        if profile.user_id != user_id:
+            logger.warning("Profile user_id mismatch: expected %s, got %s, updating...", user_id, profile.user_id)
+            profile.user_id = user_id
+        if content_hash is not None:
+            self._profile_parse_cache[user_id] = (content_hash, profile)
+        return profile
+    
+    async def _fetch_profile(self, user_id: str, refresh: bool = False) -> Optional[InvestorProfile]:
+        """Load a profile from Backboard via the memory index; refresh=True re-lists memories first."""
+        started = time.monotonic()
+        assistant_id = await self._ensure_indexed_assistant()
+        if not assistant_id:
+            logger.warning("Could not get assistant_id, falling back to in-memory for user_id: %s", user_id)
+            return None
+        
+        index_key = (user_id, "investor_profile")
+        entry = None if refresh else self._memory_index.get(index_key)
+        if entry is not None and self.profile_cache_ttl > 0 and started - entry["indexed_at"] >= self.profile_cache_ttl:
+            # Indexed longer ago than the cache TTL - another worker may have updated or deleted it since
+            logger.debug("Index entry for user_id %s is stale, re-listing", user_id)
+            self._memory_index.pop(index_key, None)
+            entry = None
+        if entry is None:
+            # Not indexed (or refreshing) - it may have been written by another process since bootstrap
+            logger.debug("Listing memories for user_id: %s", user_id)
+            async for metadata, _, _ in self._iter_memories(assistant_id):
+                if not refresh and metadata.get("user_id") == user_id and metadata.get("type") == "investor_profile":
+                    break
+            entry = self._memory_index.get(index_key)
+        
+        if entry is None:
+            logger.warning("Profile not found in Backboard memories for user_id: %s, memory_key: %s", user_id, self._get_memory_key(user_id))
+            return None
+        
+        logger.info("Found profile in Backboard memory for user_id: %s (memory_id: %s)", user_id, entry['id'])
+        profile = self._profile_from_content(user_id, entry["content"])
+        if profile is None:
+            return None
+        # A set_profile that landed while this fetch was in flight is newer - keep it
+        if self._profile_ttl.get(user_id, 0.0) > started:
+            return self._in_memory_storage.get(user_id, profile)
+        # ALWAYS cache in memory for fast access
+        self._in_memory_storage[user_id] = profile
+        self._profile_ttl[user_id] = time.monotonic()
+        logger.info("✓ Successfully retrieved and cached profile for user_id: %s", user_id)
+        return profile
+    
+    async def _refresh_profile(self, user_id: str) -> None:
+        """Background re-fetch of a stale cached profile."""
+        try:
+            await self._fetch_profile(user_id, refresh=True)
+        except Exception as e:
+            logger.warning("Background profile refresh failed for user_id %s: %s", user_id, e)
+        finally:
+            self._profile_refreshes.pop(user_id, None)
+    
     async def get_profile(self, user_id: str) -> Optional[InvestorProfile]:
-        """Retrieve investor profile from Backboard memory."""
-        logger.info(f"Getting profile for user_id: {user_id}")
+        """Retrieve investor profile from Backboard memory.
         
-        # ALWAYS try Backboard first if SDK is available (persistent storage)
+        Returns a copy: callers may modify it without touching the cached profile other requests see.
+        """
+        profile = await self._get_cached_profile(user_id)
+        return profile.model_copy(deep=True) if profile is not None else None
+    
+    async def _get_cached_profile(self, user_id: str) -> Optional[InvestorProfile]:
+        """The cached/stored profile instance itself (shared - do not modify)."""
+        logger.info("Getting profile for user_id: %s", user_id)
+        
+        # Serve recently fetched/stored profiles from memory; refresh stale ones in the background
+        fetched_at = self._profile_ttl.get(user_id)
+        if fetched_at is not None and self.profile_cache_ttl > 0 and user_id in self._in_memory_storage:
+            if self._sdk_client and time.monotonic() - fetched_at >= self.profile_cache_ttl:
+                if user_id not in self._profile_refreshes:
+                    self._profile_refreshes[user_id] = asyncio.create_task(self._refresh_profile(user_id))
+            return self._in_memory_storage[user_id]
+        
+        # Otherwise try Backboard first if SDK is available (persistent storage)
         # Only use in-memory as fallback
         if self._sdk_client:
             try:
-                assistant_id = await self._ensure_assistant()
-                if assistant_id:
-                    # Get all memories for this assistant
-                    logger.debug(f"Fetching memories from Backboard for assistant_id: {assistant_id}")
-                    memories_response = await self._sdk_client.get_memories(assistant_id)
-                    memories = self._extract_memories_list(memories_response)
-                    logger.info(f"Retrieved {len(memories)} memories from Backboard for user_id: {user_id}")
-                    
-                    # Find memory with matching user_id in metadata
-                    memory_key = self._get_memory_key(user_id)
-                    logger.debug(f"Looking for profile with memory_key: {memory_key}, user_id: {user_id}")
-                    
-                    for idx, memory in enumerate(memories):
-                        # Handle both object and tuple responses
-                        if hasattr(memory, 'metadata'):
-                            metadata = memory.metadata or {}
-                            content = getattr(memory, 'content', None)
-                        elif isinstance(memory, dict):
-                            metadata = memory.get('metadata', {})
-                            content = memory.get('content')
-                        else:
-                            metadata = {}
-                            content = str(memory) if memory else None
-                        
-                        # Check both user_id and key matches
-                        mem_user_id = metadata.get("user_id") or metadata.get("user_id")
-                        mem_key = metadata.get("key")
-                        mem_type = metadata.get("type", "")
-                        
-                        # Debug: log all memories to see what we're getting
-                        logger.debug(f"Memory {idx}: user_id={mem_user_id}, key={mem_key}, type={mem_type}, has_content={content is not None}")
-                        
-                        # Match by user_id, key, or type - be more lenient
-                        matches = False
-                        if mem_user_id == user_id:
-                            matches = True
-                            logger.debug(f"Match by user_id: {mem_user_id} == {user_id}")
-                        elif mem_key == memory_key:
-                            matches = True
-                            logger.debug(f"Match by key: {mem_key} == {memory_key}")
-                        elif mem_type == "investor_profile":
-                            # If type matches, check if user_id also matches
-                            if mem_user_id == user_id:
-                                matches = True
-                                logger.debug(f"Match by type and user_id: {mem_type} + {mem_user_id} == {user_id}")
-                        
-                        if matches:
-                            logger.info(f"Found profile in Backboard memory for user_id: {user_id} (metadata user_id: {mem_user_id}, key: {mem_key}, type: {mem_type})")
-                            
-                            # Parse profile from memory content
-                            if content is None:
-                                logger.warning(f"Memory {idx} matched but has no content for user_id: {user_id}")
-                                continue
-                            
-                            # Handle string content
-                            if isinstance(content, str):
-                                try:
-                                    profile_dict = json.loads(content)
-                                except json.JSONDecodeError as e:
-                                    logger.error(f"Failed to parse profile JSON for user_id: {user_id}: {e}")
-                                    logger.debug(f"Content preview: {content[:500]}")
-                                    continue
-                            elif isinstance(content, dict):
-                                profile_dict = content
-                            else:
-                                logger.error(f"Unexpected content type for user_id: {user_id}: {type(content)}")
-                                continue
-                            
-                            try:
-                                profile = InvestorProfile(**profile_dict)
-                                # Verify user_id matches
-                                if profile.user_id != user_id:
-                                    logger.warning(f"Profile user_id mismatch: expected {user_id}, got {profile.user_id}, updating...")
-                                    profile.user_id = user_id
-                                
-                                # ALWAYS cache in memory for fast access
-                                self._in_memory_storage[user_id] = profile
-                                logger.info(f"✓ Successfully retrieved and cached profile for user_id: {user_id}")
-                                return profile
-                            except Exception as e:
-                                logger.error(f"Failed to create InvestorProfile from dict for user_id: {user_id}: {e}", exc_info=True)
-                                logger.debug(f"Profile dict keys: {list(profile_dict.keys()) if isinstance(profile_dict, dict) else 'N/A'}")
-                                continue
-                        else:
-                            logger.debug(f"Memory {idx} doesn't match: user_id={mem_user_id}, key={mem_key}, type={mem_type}")
-                    
-                    # Log all memory metadata for debugging
-                    logger.warning(f"Profile not found in Backboard memories for user_id: {user_id}, memory_key: {memory_key} (searched {len(memories)} memories)")
-                    if memories:
-                        logger.warning(f"Available memories metadata:")
-                        for idx, mem in enumerate(memories[:10]):  # Log first 10
-                            if hasattr(mem, 'metadata'):
-                                meta = mem.metadata or {}
-                            elif isinstance(mem, dict):
-                                meta = mem.get('metadata', {})
-                            else:
-                                meta = {}
-                            logger.warning(f"  Memory {idx}: user_id={meta.get('user_id')}, key={meta.get('key')}, type={meta.get('type')}")
-                else:
-                    logger.warning(f"Could not get assistant_id, falling back to in-memory for user_id: {user_id}")
+                profile = await self._fetch_profile(user_id)
+                if profile is not None:
+                    return profile
             except Exception as e:
-                logger.error(f"Error fetching profile from Backboard for user_id {user_id}: {e}", exc_info=True)
-                import traceback
-                logger.error(f"Traceback: {traceback.format_exc()}")
+                logger.error("Error fetching profile from Backboard for user_id %s: %s", user_id, e, exc_info=True)
         
         # Fallback to in-memory cache
         if user_id in self._in_memory_storage:
             cached_profile = self._in_memory_storage.get(user_id)
-            logger.info(f"Profile found in in-memory cache for user_id: {user_id}")
+            logger.info("Profile found in in-memory cache for user_id: %s", user_id)
             # If we have SDK but couldn't find in Backboard, log a warning but return cached
             if self._sdk_client:
-                logger.warning(f"Profile found in cache but not in Backboard for user_id: {user_id}. This may indicate a sync issue.")
+                logger.warning("Profile found in cache but not in Backboard for user_id: %s. This may indicate a sync issue.", user_id)
             return cached_profile
         
-        logger.error(f"Profile not found anywhere for user_id: {user_id} (checked Backboard and in-memory)")
-        logger.error(f"Available user_ids in cache: {list(self._in_memory_storage.keys())}")
+        logger.error("Profile not found anywhere for user_id: %s (checked Backboard and in-memory)", user_id)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Available user_ids in cache: %s", list(self._in_memory_storage))
         return None
     
     async def set_profile(self, user_id: str, profile: InvestorProfile) -> bool:
         """Store investor profile in Backboard memory."""
-        logger.info(f"Storing profile for user_id: {user_id}")
+        logger.info("Storing profile for user_id: %s", user_id)
+        
+        # Resolve the assistant (and memory index) while the cache write and serialization run
+        assistant_task = asyncio.create_task(self._ensure_indexed_assistant()) if self._sdk_client else None
         
         # Always store in in-memory cache first (fast access) - NEVER clear this!
         self._in_memory_storage[user_id] = profile
-        logger.info(f"✓ Profile cached in memory for user_id: {user_id} (cache now has {len(self._in_memory_storage)} profiles)")
+        self._profile_ttl[user_id] = time.monotonic()
+        self._profile_parse_cache.pop(user_id, None)
+        logger.info("✓ Profile cached in memory for user_id: %s (cache now has %s profiles)", user_id, len(self._in_memory_storage))
         
-        if not self._sdk_client:
+        if assistant_task is None:
             # No SDK client, only in-memory storage
-            logger.warning(f"No SDK client available - profile stored in-memory only for user_id: {user_id}. Profile will be lost on server restart!")
+            logger.warning("No SDK client available - profile stored in-memory only for user_id: %s. Profile will be lost on server restart!", user_id)
+            return True
+        
+        if self.async_writes:
+            # Return now; the write (with retries) finishes in the background
+            task = asyncio.create_task(self._persist_profile_bg(user_id, profile, assistant_task))
+            self._pending_writes.add(task)
+            task.add_done_callback(self._pending_writes.discard)
             return True
         
         try:
-            assistant_id = await self._ensure_assistant()
-            if not assistant_id:
-                logger.warning(f"Could not get assistant_id - profile stored in-memory only for user_id: {user_id}. Profile will be lost on server restart!")
-                return True
-            
-            memory_key = self._get_memory_key(user_id)
-            profile_json = json.dumps(profile.model_dump(), indent=2)
-            logger.debug(f"Storing profile to Backboard with memory_key: {memory_key}")
-            
-            # Check if memory already exists
-            memories_response = await self._sdk_client.get_memories(assistant_id)
-            memories = self._extract_memories_list(memories_response)
-            existing_memory_id = None
-            for memory in memories:
-                # Handle both object and tuple responses
-                if hasattr(memory, 'metadata'):
-                    metadata = memory.metadata or {}
-                    mem_id = getattr(memory, 'id', None) or getattr(memory, 'memory_id', None)
-                elif isinstance(memory, dict):
-                    metadata = memory.get('metadata', {})
-                    mem_id = memory.get('id') or memory.get('memory_id')
-                else:
-                    metadata = {}
-                    mem_id = None
-                    
-                if metadata.get("user_id") == user_id or metadata.get("key") == memory_key:
-                    existing_memory_id = str(mem_id) if mem_id else None
-                    logger.debug(f"Found existing memory for user_id: {user_id}, memory_id: {existing_memory_id}")
+            await self._persist_profile(user_id, profile, assistant_task)
+        except Exception as e:
+            logger.error("Error storing profile to Backboard for user_id %s: %s", user_id, e, exc_info=True)
+            # Profile is already in in-memory storage, so we can still return True
+            logger.warning("Profile remains available in-memory only for user_id: %s - will be lost on server restart!", user_id)
+        return True
+    
+    async def _persist_profile(self, user_id: str, profile: InvestorProfile, assistant_task: Optional[asyncio.Task] = None) -> None:
+        """Write a profile to Backboard memory; raises on SDK errors."""
+        memory_key = self._get_memory_key(user_id)
+        profile_json = _dumps(profile.model_dump())
+        
+        assistant_id = await (assistant_task or self._ensure_indexed_assistant())
+        if not assistant_id:
+            logger.warning("Could not get assistant_id - profile stored in-memory only for user_id: %s. Profile will be lost on server restart!", user_id)
+            return
+        logger.debug("Storing profile to Backboard with memory_key: %s", memory_key)
+        
+        # Check if memory already exists
+        index_key = (user_id, "investor_profile")
+        existing_memory_id = self._memory_index.get(index_key, {}).get("id")
+        if not existing_memory_id:
+            # Not indexed - another worker or process may have written it since bootstrap; rescan before creating
+            async for _ in self._iter_memories(assistant_id):
+                if index_key in self._memory_index:
                     break
-            
-            metadata = {
-                "user_id": user_id,
-                "key": memory_key,
-                "type": "investor_profile",
-                "last_updated": datetime.utcnow().isoformat()
-            }
-            
-            if existing_memory_id:
-                # Update existing memory
-                logger.info(f"Updating existing profile memory for user_id: {user_id}, memory_id: {existing_memory_id}")
+            existing_memory_id = self._memory_index.get(index_key, {}).get("id")
+        if existing_memory_id:
+            logger.debug("Found existing memory for user_id: %s, memory_id: %s", user_id, existing_memory_id)
+        
+        metadata = {
+            "user_id": user_id,
+            "key": memory_key,
+            "type": "investor_profile",
+            "last_updated": _iso_now()
+        }
+        
+        if existing_memory_id:
+            # Update existing memory
+            logger.info("Updating existing profile memory for user_id: %s, memory_id: %s", user_id, existing_memory_id)
+            try:
                 await self._sdk_client.update_memory(
                     assistant_id=assistant_id,
                     memory_id=existing_memory_id,
                     content=profile_json,
                     metadata=metadata
                 )
-            else:
-                # Create new memory
-                logger.info(f"Creating new profile memory for user_id: {user_id}")
-                result = await self._sdk_client.add_memory(
-                    assistant_id=assistant_id,
-                    content=profile_json,
-                    metadata=metadata
-                )
-                logger.debug(f"add_memory result: {result}")
-            
-            # Verify the profile was saved by trying to retrieve it
-            logger.info(f"Verifying profile was saved to Backboard for user_id: {user_id}")
-            verify_profile = await self.get_profile(user_id)
+            except Exception:
+                # The indexed memory may have been deleted - fall back to a new memory on the next write
+                self._memory_index.pop(index_key, None)
+                raise
+        else:
+            # Create new memory
+            logger.info("Creating new profile memory for user_id: %s", user_id)
+            result = await self._sdk_client.add_memory(
+                assistant_id=assistant_id,
+                content=profile_json,
+                metadata=metadata
+            )
+            logger.debug("add_memory result: %s", result)
+            existing_memory_id = self._memory_id_from_result(result)
+        
+        if existing_memory_id:
+            self._memory_index[index_key] = {"id": existing_memory_id, "metadata": metadata, "content": profile_json, "indexed_at": time.monotonic()}
+        
+        # The SDK raises on failed writes, so read-back verification is opt-in (VERIFY_WRITES=true)
+        if self.verify_writes:
+            logger.info("Verifying profile was saved to Backboard for user_id: %s", user_id)
+            verify_profile = await self._fetch_profile(user_id, refresh=True)
             if verify_profile and verify_profile.user_id == user_id:
-                logger.info(f"✓ Profile successfully persisted to Backboard for user_id: {user_id}")
+                logger.info("✓ Profile successfully persisted to Backboard for user_id: %s", user_id)
             else:
-                logger.error(f"✗ Profile verification failed for user_id: {user_id} - profile may not be persisted!")
-            
-            return True
-        except Exception as e:
-            logger.error(f"Error storing profile to Backboard for user_id {user_id}: {e}", exc_info=True)
-            # Profile is already in in-memory storage, so we can still return True
-            logger.warning(f"Profile remains available in-memory only for user_id: {user_id} - will be lost on server restart!")
-            return True
+                logger.error("✗ Profile verification failed for user_id: %s - profile may not be persisted!", user_id)
+    
+    async def _persist_profile_bg(self, user_id: str, profile: InvestorProfile, assistant_task: asyncio.Task) -> None:
+        """Background profile write with exponential backoff (BACKBOARD_ASYNC_WRITES)."""
+        delay = 0.5
+        for attempt in range(1, ASYNC_WRITE_ATTEMPTS + 1):
+            # A newer set_profile for this user has its own write in flight - don't retry over it
+            if attempt > 1 and self._in_memory_storage.get(user_id) is not profile:
+                return
+            try:
+                await self._persist_profile(user_id, profile, assistant_task if attempt == 1 else None)
+                return
+            except Exception as e:
+                if attempt == ASYNC_WRITE_ATTEMPTS:
+                    logger.error("Giving up storing profile to Backboard for user_id %s after %s attempts: %s", user_id, attempt, e, exc_info=True)
+                    logger.warning("Profile remains available in-memory only for user_id: %s - will be lost on server restart!", user_id)
+                    return
+                logger.warning("Profile write attempt %s failed for user_id %s: %s - retrying in %.1fs", attempt, user_id, e, delay)
+                await asyncio.sleep(delay)
+                delay *= 2
+    
+    def _enqueue_write(self, assistant_id: str, content: str, metadata: dict, fallback: Callable[[], None]) -> None:
+        """Queue an add_memory call; fallback() keeps the entry in-memory if the write fails."""
+        if self._write_queue is None:
+            self._write_queue = asyncio.Queue()
+        if self._write_flusher is None or self._write_flusher.done():
+            self._write_flusher = asyncio.create_task(self._flush_writes())
+        self._write_queue.put_nowait((assistant_id, content, metadata, fallback))
+    
+    async def _flush_writes(self) -> None:
+        """Send queued writes in bursts, one concurrent add_memory per entry."""
+        while True:
+            batch = [await self._write_queue.get()]
+            await asyncio.sleep(WRITE_BATCH_WINDOW_SECONDS)
+            while not self._write_queue.empty():
+                batch.append(self._write_queue.get_nowait())
+            try:
+                results = await asyncio.gather(
+                    *(
+                        self._sdk_client.add_memory(assistant_id=assistant_id, content=content, metadata=metadata)
+                        for assistant_id, content, metadata, _ in batch
+                    ),
+                    return_exceptions=True
+                )
+                for (_, content, metadata, fallback), result in zip(batch, results):
+                    if isinstance(result, BaseException):
+                        logger.error(f"Error writing {metadata.get('type')} memory to Backboard: {result}")
+                        fallback()
+                        continue
+                    memory_id = self._memory_id_from_result(result)
+                    if memory_id:
+                        self._index_memory(metadata, content, memory_id)
+            finally:
+                for _ in batch:
+                    self._write_queue.task_done()
+    
+    async def _drain_writes(self) -> None:
+        """Wait for queued writes so listings include them."""
+        if self._write_queue is not None:
+            await self._write_queue.join()
     
     async def append_decision(self, user_id: str, entry: str) -> bool:
         """Append entry to decision log."""
@@ -340,58 +1221,21 @@ class BackboardClient:
                 self._decision_logs[user_id].append(entry)
                 return True
             
-            log_key = self._get_log_key(user_id)
-            
-            # Get existing log or create new
-            memories_response = await self._sdk_client.get_memories(assistant_id)
-            memories = self._extract_memories_list(memories_response)
-            existing_log_id = None
-            log_content = ""
-            for memory in memories:
-                # Handle both object and tuple responses (same as in get_profile)
-                if hasattr(memory, 'metadata'):
-                    metadata = memory.metadata or {}
-                    mem_id = getattr(memory, 'id', None) or getattr(memory, 'memory_id', None)
-                    mem_content = getattr(memory, 'content', '') if hasattr(memory, 'content') else ''
-                elif isinstance(memory, dict):
-                    metadata = memory.get('metadata', {})
-                    mem_id = memory.get('id') or memory.get('memory_id')
-                    mem_content = memory.get('content', '')
-                else:
-                    metadata = {}
-                    mem_id = None
-                    mem_content = ''
-                
-                if metadata.get("key") == log_key:
-                    existing_log_id = str(mem_id) if mem_id else None
-                    log_content = mem_content
-                    break
-            
-            # Append new entry
-            timestamp = datetime.utcnow().isoformat()
-            new_entry = f"[{timestamp}] {entry}\n"
-            updated_log = log_content + new_entry
-            
+            # Each decision is its own memory, so appending never rewrites earlier entries
+            timestamp = _iso_now()
+            new_entry = f"[{timestamp}] {entry}"
             metadata = {
                 "user_id": user_id,
-                "key": log_key,
-                "type": "decision_log"
+                "key": self._get_log_key(user_id),
+                "type": "decision_log_entry",
+                "ts": timestamp
             }
-            
-            if existing_log_id:
-                await self._sdk_client.update_memory(
-                    assistant_id=assistant_id,
-                    memory_id=existing_log_id,
-                    content=updated_log,
-                    metadata=metadata
-                )
-            else:
-                await self._sdk_client.add_memory(
-                    assistant_id=assistant_id,
-                    content=new_entry,
-                    metadata=metadata
-                )
-            
+            self._enqueue_write(
+                assistant_id,
+                new_entry,
+                metadata,
+                lambda: self._decision_logs.setdefault(user_id, []).append(entry)
+            )
             return True
         except Exception as e:
             logger.error(f"Error appending to log: {e}", exc_info=True)
@@ -401,85 +1245,66 @@ class BackboardClient:
             self._decision_logs[user_id].append(entry)
             return True
     
+    async def get_decision_log(self, user_id: str) -> list[str]:
+        """Return a user's decision log entries, oldest first."""
+        entries: list[str] = []
+        if self._sdk_client:
+            try:
+                assistant_id = await self._ensure_assistant()
+                if assistant_id:
+                    await self._drain_writes()
+                    await self._bootstrap_index(assistant_id)
+                    # Logs written before per-entry memories were a single "decision_log" memory
+                    legacy_log = self._memory_index.get((user_id, "decision_log"), {}).get("content")
+                    if legacy_log:
+                        entries.extend(line for line in str(legacy_log).splitlines() if line.strip())
+                    log_entries = self._decision_log_index.get(user_id, {}).values()
+                    entries.extend(line for _, line in sorted(log_entries, key=lambda e: e[0]))
+            except Exception as e:
+                logger.error("Error reading decision log from Backboard: %s", e, exc_info=True)
+        entries.extend(self._decision_logs.get(user_id, []))
+        return entries
+    
+    def _append_in_memory(self, user_id: str, key: str, content: dict) -> None:
+        """Keep a memory entry locally when it cannot be written to Backboard."""
+        self._memory_storage.setdefault(user_id, []).append({
+            'key': key,
+            'content': content,
+            'timestamp': _iso_now()
+        })
+    
     async def append_memory(self, user_id: str, key: str, content: dict) -> bool:
         """Append a memory entry to Backboard.io memory."""
-        if not self._sdk_client:
-            # In-memory fallback - store in a simple dict
-            if not hasattr(self, '_memory_storage'):
-                self._memory_storage: dict[str, list] = {}
-            if user_id not in self._memory_storage:
-                self._memory_storage[user_id] = []
-            self._memory_storage[user_id].append({
-                'key': key,
-                'content': content,
-                'timestamp': datetime.utcnow().isoformat()
-            })
-            return True
-        
         try:
-            assistant_id = await self._ensure_assistant()
-            if not assistant_id:
-                # Fallback to in-memory
-                if not hasattr(self, '_memory_storage'):
-                    self._memory_storage: dict[str, list] = {}
-                if user_id not in self._memory_storage:
-                    self._memory_storage[user_id] = []
-                self._memory_storage[user_id].append({
-                    'key': key,
-                    'content': content,
-                    'timestamp': datetime.utcnow().isoformat()
-                })
+            assistant_id = await self._ensure_assistant() if self._sdk_client else None
+            if assistant_id:
+                content_json = _dumps(content)
+                metadata = {
+                    "user_id": user_id,
+                    "key": key,
+                    "type": "portfolio_snapshot",
+                    "timestamp": _iso_now()
+                }
+                
+                # Create new memory entry
+                self._enqueue_write(
+                    assistant_id,
+                    content_json,
+                    metadata,
+                    lambda: self._append_in_memory(user_id, key, content)
+                )
                 return True
-            
-            memory_key = key
-            content_json = json.dumps(content, indent=2)
-            
-            metadata = {
-                "user_id": user_id,
-                "key": memory_key,
-                "type": "portfolio_snapshot",
-                "timestamp": datetime.utcnow().isoformat()
-            }
-            
-            # Create new memory entry
-            await self._sdk_client.add_memory(
-                assistant_id=assistant_id,
-                content=content_json,
-                metadata=metadata
-            )
-            
-            # Also store in in-memory fallback for reliability
-            if not hasattr(self, '_memory_storage'):
-                self._memory_storage: dict[str, list] = {}
-            if user_id not in self._memory_storage:
-                self._memory_storage[user_id] = []
-            self._memory_storage[user_id].append({
-                'key': memory_key,
-                'content': content,
-                'timestamp': datetime.utcnow().isoformat()
-            })
-            
-            return True
         except Exception as e:
             logger.error(f"Error storing memory to Backboard: {e}", exc_info=True)
-            # Fallback to in-memory storage
-            if not hasattr(self, '_memory_storage'):
-                self._memory_storage: dict[str, list] = {}
-            if user_id not in self._memory_storage:
-                self._memory_storage[user_id] = []
-            self._memory_storage[user_id].append({
-                'key': key,
-                'content': content,
-                'timestamp': datetime.utcnow().isoformat()
-            })
-            return True
+        
+        # No SDK client, no assistant, or the write failed - store in-memory
+        self._append_in_memory(user_id, key, content)
+        return True
     
     async def get_memories(self, user_id: str, key_prefix: Optional[str] = None) -> list:
         """Retrieve memories for a user, optionally filtered by key prefix."""
         if not self._sdk_client:
             # In-memory fallback
-            if not hasattr(self, '_memory_storage'):
-                return []
             memories = self._memory_storage.get(user_id, [])
             if key_prefix:
                 memories = [m for m in memories if m.get('key', '').startswith(key_prefix)]
@@ -489,73 +1314,48 @@ class BackboardClient:
             assistant_id = await self._ensure_assistant()
             if not assistant_id:
                 # Fallback to in-memory
-                if not hasattr(self, '_memory_storage'):
-                    return []
                 memories = self._memory_storage.get(user_id, [])
                 if key_prefix:
                     memories = [m for m in memories if m.get('key', '').startswith(key_prefix)]
                 return memories
             
-            # Get all memories for this assistant
-            try:
-                memories_response = await self._sdk_client.get_memories(assistant_id)
-                memories = self._extract_memories_list(memories_response)
-            except Exception as e:
-                logger.warning(f"Error getting memories from Backboard SDK: {e}, using in-memory fallback")
-                memories = []
+            # Queued writes land in Backboard (or the in-memory fallback) before we read
+            await self._drain_writes()
             
             # Also check in-memory storage as fallback
-            in_memory_fallback = []
-            if hasattr(self, '_memory_storage'):
-                in_memory_fallback = self._memory_storage.get(user_id, [])
-                if key_prefix:
-                    in_memory_fallback = [m for m in in_memory_fallback if m.get('key', '').startswith(key_prefix)]
+            in_memory_fallback = self._memory_storage.get(user_id, [])
+            if key_prefix:
+                in_memory_fallback = [m for m in in_memory_fallback if m.get('key', '').startswith(key_prefix)]
             
             # Filter by user_id and optionally by key prefix
             filtered_memories = []
-            for memory in memories:
-                # Handle both object and tuple responses
-                if hasattr(memory, 'metadata'):
-                    metadata = memory.metadata or {}
-                elif isinstance(memory, dict):
-                    metadata = memory.get('metadata', {})
-                else:
-                    metadata = {}
-                
-                # Check if this memory belongs to the user
-                if metadata.get("user_id") == user_id:
-                    # Check key prefix if specified
+            try:
+                prefix = key_prefix or ""
+                now = _iso_now()
+                async for metadata, content, _ in self._iter_memories(assistant_id):
+                    # Only this user's memories under the key prefix
+                    if metadata.get("user_id") != user_id:
+                        continue
                     memory_key = metadata.get("key", "")
-                    if key_prefix and not memory_key.startswith(key_prefix):
+                    if not memory_key.startswith(prefix):
                         continue
                     
-                    # Extract content
-                    content = None
-                    if hasattr(memory, 'content'):
-                        content = memory.content
-                    elif isinstance(memory, dict):
-                        content = memory.get('content', '')
+                    # Parse JSON content; if content is not JSON, use as-is
+                    if content.__class__ is str:
+                        try:
+                            content = _loads(content)
+                        except (json.JSONDecodeError, TypeError):
+                            pass
                     
-                    # Parse JSON content
-                    try:
-                        if isinstance(content, str):
-                            content_dict = json.loads(content)
-                        else:
-                            content_dict = content
-                        
-                        # Create a simple dict representation
-                        filtered_memories.append({
-                            'key': memory_key,
-                            'content': content_dict,
-                            'timestamp': metadata.get('timestamp', datetime.utcnow().isoformat())
-                        })
-                    except (json.JSONDecodeError, TypeError):
-                        # If content is not JSON, use as-is
-                        filtered_memories.append({
-                            'key': memory_key,
-                            'content': content,
-                            'timestamp': metadata.get('timestamp', datetime.utcnow().isoformat())
-                        })
+                    # Create a simple dict representation
+                    filtered_memories.append({
+                        'key': memory_key,
+                        'content': content,
+                        'timestamp': metadata.get('timestamp', now)
+                    })
+                self._index_ready.set()
+            except Exception as e:
+                logger.warning(f"Error getting memories from Backboard SDK: {e}, using in-memory fallback")
             
             # Merge with in-memory fallback (avoid duplicates)
             seen_keys = {m['key'] for m in filtered_memories}
@@ -568,909 +1368,193 @@ class BackboardClient:
         except Exception as e:
             logger.error(f"Error fetching memories from Backboard: {e}", exc_info=True)
             # Fallback to in-memory
-            if not hasattr(self, '_memory_storage'):
-                return []
             memories = self._memory_storage.get(user_id, [])
             if key_prefix:
                 memories = [m for m in memories if m.get('key', '').startswith(key_prefix)]
             return memories
     
-    async def cheap_extract_profile(self, onboarding_text: str) -> InvestorProfile:
-        """Use CHEAP model to extract InvestorProfile from onboarding text."""
-        logger.error("=" * 100)
-        logger.error(f"🚀 cheap_extract_profile CALLED - text length: {len(onboarding_text)}")
-        logger.error(f"📝 First 200 chars: {onboarding_text[:200]}")
-        logger.error("=" * 100)
+    async def cheap_extract_profile(self, onboarding_text: str, user_id: Optional[str] = None) -> InvestorProfile:
+        """Use CHEAP model to extract InvestorProfile from onboarding text (user_id reuses that user's thread)."""
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("cheap_extract_profile called - text length: %s, first 200 chars: %.200s", len(onboarding_text), onboarding_text)
+        
+        text_lower = onboarding_text.strip().lower()
+        if not await _has_profile_signal(text_lower):
+            logger.info("Onboarding text has no profile signal, returning default profile")
+            return InvestorProfile(
+                user_id="temp",  # Will be set by caller
+                objective=Objective(type="balanced", notes=""),
+                horizon_months=60,
+                risk_score=50,
+                rebalance_frequency="quarterly",
+            )
+        
+        cache_key = hashlib.blake2b(text_lower.encode(), digest_size=16).hexdigest()
+        cached = self._extracted_profiles.get(cache_key)
+        if cached is not None:
+            self._extracted_profiles.move_to_end(cache_key)
+            logger.info("Returning cached profile extraction")
+            return cached.model_copy(deep=True)
+        
+        # Horizon, risk, objective, constraints and frequency are deterministic rules; the
+        # model is only needed when no sector could be mapped from the text locally
+        rule_profile = await self._rule_extract(onboarding_text)
+        if rule_profile is not None:
+            logger.info("Extracted profile with local rules - horizon: %s, risk: %s, sectors: %s", rule_profile.horizon_months, rule_profile.risk_score, rule_profile.preferences.sectors_like)
+            return self._remember_extraction(cache_key, rule_profile)
         
         if not self._sdk_client:
             # Fallback: parse basic keywords for demo
-            logger.error("❌ No SDK client, using fallback parser")
+            logger.debug("No SDK client, using fallback parser")
             return self._parse_profile_fallback(onboarding_text)
         
-        logger.error("✅ SDK client exists, proceeding with Backboard API")
-        
         try:
-            logger.error("🔍 Checking assistant...")
-            assistant_id = await self._ensure_assistant()
-            if not assistant_id:
-                logger.error("❌ No assistant ID, using fallback parser")
-                return self._parse_profile_fallback(onboarding_text)
-            logger.error(f"✅ Assistant ID: {assistant_id}")
-            
-            # Load sector data for context
-            from .sector_data import get_sectors_by_keywords, load_sectors_data
-            
-            # Load sector aliases for AI reference
-            import json as json_module
-            from pathlib import Path
-            aliases_file = Path(__file__).parent.parent / "data" / "sector_aliases.json"
-            with open(aliases_file, 'r') as f:
-                aliases_data = json_module.load(f)
-            
-            # Build comprehensive alias mapping for AI
-            alias_mapping_text = ""
-            for sector_name, sector_info in aliases_data['sector_aliases'].items():
-                aliases = ", ".join(sector_info['aliases'][:10])  # Show first 10 aliases
-                alias_mapping_text += f"- {sector_info['exact_name']}: {aliases}\n"
-            
-            system_prompt = f"""You are an investment profile analyzer. Extract investor preferences and map them to exact sector names.
-
-SECTOR ALIAS MAPPING (map user keywords to these EXACT sector names):
-{alias_mapping_text}
-
-CRITICAL INSTRUCTIONS:
-1. Analyze the user's text for sector interests
-2. Match any mentioned keywords/aliases to the EXACT sector names above
-3. For sectors_like and sectors_avoid, use ONLY the exact_name values (e.g., "Healthcare", "Technology", NOT "biotech" or "tech")
-4. Map all variations: "biotech" → "Healthcare", "tech" → "Technology", "banks" → "Financial Services", etc.
-
-HORIZON EXTRACTION RULES (CRITICAL - convert to horizon_months as INTEGER):
-- If user says "X years" or "X year" where X is a number: horizon_months = X * 12
-  Examples: "3 years" → 36, "5 years" → 60, "10 years" → 120, "15 years" → 180, "20 years" → 240
-- If user says "X months" or "X month" where X is a number: horizon_months = X
-  Examples: "18 months" → 18, "24 months" → 24, "6 months" → 6
-- "long horizon", "long term", "long-term" → 60-120 months (use 60 as default)
-- "short horizon", "short term", "short-term" → 6-24 months (use 12 as default)
-- "early investor", "early stage" → 60-120 months (use 72 as default)
-- "retirement", "retire" → 120-240 months (use 180 as default)
-- If user says "retirement in X years": horizon_months = X * 12 (e.g., "retirement in 10 years" → 120)
-- If no horizon mentioned: default to 60 months
-
-CRITICAL: Always prioritize explicit numbers (years/months) over keywords. If user says "3 years", use 36 months, NOT 60.
-
-RISK SCORE EXTRACTION RULES (0-100 scale, use INTEGER):
-- "risk averse", "I'm risk averse", "very conservative", "low risk" → 20-30 (use 25)
-- "conservative", "somewhat conservative" → 20-30 (use 25)
-- "moderate risk", "moderate", "balanced" → 40-50 (use 50)
-- "aggressive", "high risk", "risk tolerant", "I'm aggressive" → 70-80 (use 75)
-- "very aggressive", "very high risk" → 80-90 (use 85)
-- If no risk mentioned: default to 50
-
-CRITICAL: If user explicitly says "risk averse" or "I'm risk averse", use 20-30, NOT 50.
-
-OBJECTIVE EXTRACTION:
-- "growth", "capital appreciation", "growth focus", "looking for growth" → "growth"
-- "income", "dividend", "yield", "need income", "want income" → "income"
-- "balanced", "both", "balanced approach" → "balanced"
-- If unclear: default to "balanced"
-
-CONSTRAINTS EXTRACTION:
-- "max X holdings" or "maximum X holdings" → constraints.max_holdings = X (integer)
-- "max X% per position" or "no position exceed X%" → constraints.max_position_pct = X (float)
-- "avoid X" or "don't want X" → preferences.sectors_avoid should include X (mapped to exact sector name)
-- "exclude X" → preferences.sectors_avoid should include X (mapped to exact sector name)
-
-REBALANCE FREQUENCY:
-- "monthly" or "rebalance monthly" → "monthly"
-- "quarterly" or "rebalance quarterly" → "quarterly"
-- "annual" or "yearly" or "rebalance annually" → "annual"
-- If not mentioned: default to "quarterly"
-
-Return ONLY valid JSON matching InvestorProfile schema. No prose, no explanation, just valid JSON.
-            
-InvestorProfile schema:
-{{
-  "user_id": "string",
-  "objective": {{"type": "growth"|"income"|"balanced", "notes": "string"}},
-  "horizon_months": int,
-  "risk_score": int (0-100),
-  "constraints": {{
-    "max_holdings": int,
-    "max_position_pct": float,
-    "exclusions": list[str],
-    "options_allowed": bool,
-    "leverage_allowed": bool
-  }},
-  "preferences": {{
-    "sectors_like": list[str],  // MUST use exact sector names from the list above
-    "sectors_avoid": list[str],  // MUST use exact sector names from the list above
-    "regions_like": list[str]
-  }},
-  "rebalance_frequency": "monthly"|"quarterly"|"annual",
-  "last_updated": "ISO datetime string"
-}}
-
-CRITICAL: 
-- For sectors_like and sectors_avoid, you MUST use the exact sector names from the list above (e.g., "Healthcare", "Technology", NOT generic keywords).
-- Extract horizon_months carefully using the rules above.
-- Extract risk_score using the rules above.
-- Return ONLY valid JSON, no markdown, no code blocks, just the JSON object."""
-            
-            # Use Backboard assistant to extract profile via AI
-            # Create a thread and send message with system prompt
-            logger.error("🔄 Creating thread...")
-            try:
-                thread = await self._sdk_client.create_thread(assistant_id=assistant_id)
-                logger.error(f"✅ Thread created: {type(thread)}")
-            except Exception as thread_error:
-                logger.error(f"❌ Failed to create thread: {thread_error}")
-                raise
-            
-            # Get thread ID correctly (same as in ticker_lookup.py)
-            thread_id = getattr(thread, 'id', None) or getattr(thread, 'thread_id', None) or str(thread)
-            logger.error(f"📋 Thread ID: {thread_id}")
-            
-            # Combine system prompt with user text
-            full_prompt = f"{system_prompt}\n\nUser onboarding text:\n{onboarding_text}"
-            
-            # Log input lengths for debugging
-            logger.error(f"📏 Profile extraction - onboarding_text length: {len(onboarding_text)}, full_prompt length: {len(full_prompt)}")
-            
-            # Send message - this triggers the assistant and returns AI response
-            response = None
-            response_text = None
-            
-            # Try calling add_message - ALWAYS use supported models first (not assistant default which uses unsupported gpt-4o-mini)
-            # This matches ticker_lookup.py strategy (lines 656-723)
-            response = None
-            raw_response_data = None
-            
-            # Use standard OpenAI models that work with Backboard API
-            # Use gpt-4o-mini for cheap operations (fast, cost-effective)
-            supported_models = [
-                "gpt-4o-mini",  # Standard cheap model - should work
-                "gpt-4o",       # Fallback if mini not available
-            ]
-            
-            logger.error("=" * 100)
-            logger.error("🔍 DEBUGGING BACKBOARD API CALL - Starting add_message attempts...")
-            logger.error(f"   Thread ID: {thread_id}")
-            logger.error(f"   Prompt length: {len(full_prompt)}")
-            logger.error(f"   Will try {len(supported_models)} supported models")
-            logger.error("=" * 100)
-            
-            # Strategy: Try without model first (assistant default), then try explicit models
-            model_attempted = False
-            last_exception = None
-            
-            # First, try without specifying a model (use assistant's default)
-            try:
-                logger.error("📤 Attempt 1: Trying without model (assistant default)...")
-                response = await self._sdk_client.add_message(
-                    thread_id=thread_id,
-                    content=full_prompt
-                )
-                logger.error(f"✅ Assistant default model worked! Response type: {type(response)}")
-                model_attempted = True
-            except Exception as default_error:
-                error_str = str(default_error).lower()
-                error_type = type(default_error).__name__
-                logger.error(f"❌ Assistant default failed: {error_type}")
-                logger.error(f"   Error message: {str(default_error)[:300]}")
-                
-                # Check if it's a validation error (message was sent, just parsing failed)
-                if "validation" in error_str and "field required" in error_str:
-                    logger.error(f"   → Validation error (message was sent), will extract from thread messages...")
-                    # Will extract from thread messages below
-                    model_attempted = True
-                else:
-                    last_exception = default_error
-                    # Try explicit models as fallback
-                    for model_idx, supported_model in enumerate(supported_models, 1):
-                        try:
-                            logger.error(f"📤 Attempt {model_idx + 1}: Trying model '{supported_model}'...")
-                            response = await self._sdk_client.add_message(
-                                thread_id=thread_id,
-                                content=full_prompt,
-                                llm_provider="openai",
-                                model_name=supported_model
-                            )
-                            logger.error(f"✅ SUCCESS! Model '{supported_model}' worked! Response type: {type(response)}")
-                            model_attempted = True
-                            break
-                        except Exception as model_error:
-                            error_str = str(model_error).lower()
-                            logger.error(f"❌ Model '{supported_model}' failed: {str(model_error)[:200]}")
-                            last_exception = model_error
-                            continue
-            
-            # If we got a response object, try to extract content from it
-            if response:
-                try:
-                    # If no model fails, try with supported models (like ticker_lookup.py lines 679-720)
-                    logger.error(f"🔍 Checking response object for content...")
-                    # Try to extract response from the response object first (like ticker_lookup.py does)
-                    if hasattr(response, 'content'):
-                        response_text = response.content
-                        logger.error(f"✅ Found response.content: {type(response_text)}, length: {len(response_text) if response_text else 0}")
-                    elif hasattr(response, 'latest_message'):
-                        if hasattr(response.latest_message, 'content'):
-                            response_text = response.latest_message.content
-                            logger.error(f"✅ Found response.latest_message.content: {type(response_text)}, length: {len(response_text) if response_text else 0}")
-                        elif isinstance(response.latest_message, dict):
-                            response_text = response.latest_message.get('content', '')
-                            logger.error(f"✅ Found response.latest_message dict content: length: {len(response_text) if response_text else 0}")
-                    elif hasattr(response, 'message'):
-                        if hasattr(response.message, 'content'):
-                            response_text = response.message.content
-                            logger.error(f"✅ Found response.message.content: {type(response_text)}, length: {len(response_text) if response_text else 0}")
-                        elif isinstance(response.message, dict):
-                            response_text = response.message.get('content', '')
-                            logger.error(f"✅ Found response.message dict content: length: {len(response_text) if response_text else 0}")
-                    elif isinstance(response, dict):
-                        response_text = (
-                            response.get('latest_message', {}).get('content', '') or
-                            response.get('message', {}).get('content', '') or
-                            response.get('content', '') or
-                            ''
-                        )
-                        logger.error(f"✅ Found response dict content: length: {len(response_text) if response_text else 0}")
-                    else:
-                        logger.error(f"⚠️  Response object doesn't have expected attributes: {dir(response)[:20]}")
-                except Exception as extract_err:
-                    logger.error(f"⚠️  Error extracting response from response object: {extract_err}")
-            else:
-                logger.error(f"⚠️  No response object to extract from")
-            
-            # If we still don't have response_text and got a validation error, the message was sent
-            # We need to wait and fetch from thread messages
-            if not response_text or len(response_text.strip()) < 10:
-                if last_exception:
-                    error_msg = str(last_exception)
-                    error_type = type(last_exception).__name__
-                    logger.error("=" * 100)
-                    logger.error("🔍 DEBUGGING: No response_text yet, analyzing exception...")
-                    logger.error(f"   Last exception type: {error_type}")
-                    logger.error(f"   Last exception message: {error_msg[:500]}")
-                    logger.error(f"   Has input_value: {hasattr(last_exception, 'input_value')}")
-                    if hasattr(last_exception, 'input_value'):
-                        try:
-                            logger.error(f"   input_value type: {type(last_exception.input_value)}")
-                            if isinstance(last_exception.input_value, dict):
-                                logger.error(f"   input_value keys: {list(last_exception.input_value.keys())[:20]}")
-                                if 'content' in last_exception.input_value:
-                                    content = last_exception.input_value['content']
-                                    logger.error(f"   Found 'content' in input_value: {type(content)}, length: {len(str(content)) if content else 0}")
-                                    logger.error(f"   Content preview: {str(content)[:300]}")
-                        except Exception as debug_err:
-                            logger.error(f"   Error inspecting input_value: {debug_err}")
-                    logger.error("=" * 100)
-                    
-                    # Also try to extract raw_response_data from exception if we haven't already
-                    if not raw_response_data:
-                        try:
-                            if hasattr(last_exception, 'input_value'):
-                                raw_response_data = last_exception.input_value
-                                logger.error(f"✅ Extracted raw_response_data from exception.input_value: {type(raw_response_data)}")
-                            elif hasattr(last_exception, 'errors') and callable(last_exception.errors):
-                                errors = last_exception.errors()
-                                if errors and len(errors) > 0:
-                                    first_error = errors[0]
-                                    if 'input' in first_error:
-                                        raw_response_data = first_error['input']
-                                        logger.error(f"✅ Extracted raw_response_data from exception.errors: {type(raw_response_data)}")
-                        except Exception as extract_error:
-                            logger.error(f"⚠️  Could not extract from exception attributes: {extract_error}")
-                
-                # Extract response_text from raw_response_data
-                if raw_response_data:
-                    logger.error(f"🔍 Processing raw_response_data (type: {type(raw_response_data)}): {str(raw_response_data)[:500]}")
-                    if isinstance(raw_response_data, dict):
-                        # The API returns 'message' but SDK expects 'latest_message'
-                        # First check if there's a 'message' field (which is what the error shows)
-                        if 'message' in raw_response_data:
-                            message_obj = raw_response_data['message']
-                            logger.error(f"   Found 'message' key: {type(message_obj)}")
-                            if isinstance(message_obj, dict):
-                                # Try to get content from message dict
-                                response_text = (
-                                    message_obj.get('content', '') or
-                                    message_obj.get('text', '') or
-                                    str(message_obj)
-                                )
-                                logger.error(f"   Extracted from message dict: length: {len(response_text) if response_text else 0}")
-                            elif isinstance(message_obj, str):
-                                # Message is already a string
-                                response_text = message_obj
-                                logger.error(f"   Message is string: length: {len(response_text) if response_text else 0}")
-                            else:
-                                # Try to get content attribute from message object
-                                if hasattr(message_obj, 'content'):
-                                    response_text = message_obj.content
-                                    logger.error(f"   Found message.content: length: {len(response_text) if response_text else 0}")
-                                else:
-                                    response_text = str(message_obj)
-                                    logger.error(f"   Converted message to string: length: {len(response_text) if response_text else 0}")
-                        else:
-                            # Try other keys
-                            response_text = (
-                                raw_response_data.get('latest_message', {}).get('content', '') if isinstance(raw_response_data.get('latest_message'), dict) else '' or
-                                raw_response_data.get('content', '') or
-                                raw_response_data.get('text', '') or
-                                ''
-                            )
-                            logger.error(f"   Extracted from other keys: length: {len(response_text) if response_text else 0}")
-                        
-                        if response_text and len(response_text) > 50:
-                            logger.error(f"✅ Got valid response from exception! First 200 chars: {response_text[:200]}")
-                        else:
-                            logger.error(f"⚠️  Response from exception too short, will try thread messages")
-                            response_text = None  # Will try thread messages instead
-                
-                # Try to extract from exception args as fallback (if we still don't have response_text)
-                if not response_text and last_exception and hasattr(last_exception, 'args') and len(last_exception.args) > 0:
-                    logger.error("   Trying to extract from exception args...")
-                    for arg in last_exception.args:
-                        if isinstance(arg, dict):
-                            response_text = (
-                                arg.get('latest_message', {}).get('content', '') or
-                                arg.get('message', {}).get('content', '') or
-                                arg.get('content', '') or
-                                ''
-                            )
-                            if response_text and len(response_text) > 50:
-                                logger.error(f"✅ Got valid response from exception args! Length: {len(response_text)}")
-                                break
-                
-                # Check if error mentions content length or truncation (only if we have last_exception and error_msg)
-                if not response_text and last_exception:
-                    error_msg = str(last_exception)
-                    if ("length" in error_msg.lower() or "too long" in error_msg.lower() or "truncat" in error_msg.lower() or "max" in error_msg.lower()):
-                        logger.error(f"Content length issue detected! Full error: {error_msg[:300]}")
-                        # Try to send just the user text with a shorter system prompt
-                        short_system = "Extract investor profile from the following text. Return ONLY valid JSON matching InvestorProfile schema."
-                        short_prompt = f"{short_system}\n\n{onboarding_text}"
-                        logger.info(f"Retrying with shorter prompt (length: {len(short_prompt)})")
-                        try:
-                            response = await self._sdk_client.add_message(
-                                thread_id=thread_id,
-                                content=short_prompt,
-                                llm_provider="openai",
-                                model_name="gpt-4o-mini"
-                            )
-                            logger.info("Successfully sent shortened message")
-                            # Try to extract from retry response too
-                            if response and hasattr(response, 'content'):
-                                response_text = response.content
-                        except Exception as retry_error:
-                            logger.error(f"Retry with shortened prompt also failed: {retry_error}")
-                
-                import asyncio
-                
-                # If we still don't have response_text, wait and fetch from thread messages
-                if not response_text or len(response_text.strip()) < 10:
-                    # Wait for AI to process (validation error means message was sent)
-                    # Wait longer for the AI to generate a response - AI needs more time for profile extraction
-                    logger.error("⏳ No response from add_message, waiting 12 seconds for AI to respond...")
-                    await asyncio.sleep(12)  # Increased to 12 seconds - profile extraction takes longer
-                    
-                    # Try to get messages from thread
-                    try:
-                        logger.error("📥 Fetching messages from thread...")
-                        messages = None
-                        if hasattr(self._sdk_client, 'get_messages'):
-                            logger.error("Using get_messages() method")
-                            messages = await self._sdk_client.get_messages(thread_id=thread_id)
-                        elif hasattr(self._sdk_client, 'list_messages'):
-                            logger.error("Using list_messages() method")
-                            messages = await self._sdk_client.list_messages(thread_id=thread_id)
-                        elif hasattr(self._sdk_client, 'get_thread'):
-                            logger.error("Using get_thread() method")
-                            thread_obj = await self._sdk_client.get_thread(thread_id=thread_id)
-                            if hasattr(thread_obj, 'messages'):
-                                messages = thread_obj.messages
-                        else:
-                            logger.error("❌ No method to get messages found!")
-                        
-                        logger.error(f"📨 Messages retrieved: {type(messages)}, length: {len(messages) if messages else 0}")
-                        logger.error(f"📨 Messages truthy check: {bool(messages)}")
-                        
-                        # DEBUG: Log full message structure to understand what we're getting
-                        if messages and isinstance(messages, list) and len(messages) > 0:
-                            logger.error(f"🔍 DEBUG: First message type: {type(messages[0])}")
-                            logger.error(f"🔍 DEBUG: First message dir (first 20): {dir(messages[0])[:20] if hasattr(messages[0], '__dict__') else 'N/A'}")
-                            if isinstance(messages[0], dict):
-                                logger.error(f"🔍 DEBUG: First message keys: {list(messages[0].keys())[:15]}")
-                            elif hasattr(messages[0], '__dict__'):
-                                logger.error(f"🔍 DEBUG: First message attributes: {list(messages[0].__dict__.keys())[:15]}")
-                        
-                        if messages:
-                            try:
-                                logger.error(f"✅ Entering messages processing block...")
-                                # Handle different message formats (matching ticker_lookup.py exactly)
-                                msg_list = []
-                                if isinstance(messages, list):
-                                    msg_list = messages
-                                    logger.error(f"   Messages is a list with {len(msg_list)} items")
-                                elif hasattr(messages, 'messages'):
-                                    msg_list = messages.messages if isinstance(messages.messages, list) else [messages.messages]
-                                    logger.error(f"   Messages has .messages attribute: {len(msg_list)} items")
-                                else:
-                                    logger.error(f"   Messages format unexpected: {type(messages)}, dir: {dir(messages)[:10]}")
-                                    msg_list = []
-                                
-                                logger.error(f"   Processing {len(msg_list)} messages...")
-                                
-                                # Find the latest assistant message (matching ticker_lookup.py line 790-812)
-                                for idx, msg in enumerate(reversed(msg_list)):
-                                    logger.error(f"   Message {idx}: type={type(msg)}")
-                                    if isinstance(msg, dict):
-                                        logger.error(f"      Dict keys: {list(msg.keys())[:10]}")
-                                        logger.error(f"      Has 'content': {'content' in msg}")
-                                        logger.error(f"      Has 'role': {'role' in msg}")
-                                        if 'content' in msg:
-                                            logger.error(f"      Content type: {type(msg['content'])}, length: {len(str(msg['content'])) if msg['content'] else 0}")
-                                    
-                                    is_assistant = False
-                                    role_str = None
-                                    if hasattr(msg, 'role'):
-                                        role = msg.role
-                                        # Convert role to string for checking - handle MessageRole enum
-                                        if hasattr(role, 'value'):
-                                            role_str = str(role.value).lower()
-                                            role_upper = str(role.value).upper()
-                                        elif hasattr(role, 'name'):
-                                            role_str = str(role.name).lower()
-                                            role_upper = str(role.name).upper()
-                                        else:
-                                            # Check the string representation (might be "MessageRole.USER" or "MessageRole.ASSISTANT")
-                                            role_str_full = str(role)
-                                            role_str = role_str_full.lower()
-                                            role_upper = role_str_full.upper()
-                                        
-                                        # CRITICAL: Explicitly check for USER first - MessageRole.USER is NEVER assistant!
-                                        # MessageRole.USER -> value="user" or "MessageRole.USER" -> NOT assistant
-                                        # MessageRole.ASSISTANT -> value="assistant" or "MessageRole.ASSISTANT" -> IS assistant
-                                        # Check exact value first, then string representation
-                                        role_value_exact = None
-                                        if hasattr(role, 'value'):
-                                            role_value_exact = str(role.value).lower()
-                                        elif hasattr(role, 'name'):
-                                            role_value_exact = str(role.name).lower()
-                                        
-                                        if role_value_exact == 'user':
-                                            is_assistant = False
-                                        elif role_value_exact in ['assistant', 'ai', 'bot']:
-                                            is_assistant = True
-                                        elif 'user' in role_str and role_str != 'assistant' and 'assistant' not in role_str:
-                                            # String contains "user" but not "assistant" -> USER
-                                            is_assistant = False
-                                        elif 'assistant' in role_str or 'ai' in role_str or 'bot' in role_str:
-                                            # String contains "assistant" -> ASSISTANT
-                                            is_assistant = True
-                                        else:
-                                            # Default to False if we can't determine (safer)
-                                            is_assistant = False
-                                        
-                                        logger.error(f"      Role from attr: {role} (value: '{role_value_exact}', full string: '{str(role)}', parsed: '{role_str}'), is_assistant: {is_assistant}")
-                                    elif isinstance(msg, dict):
-                                        # Check both 'role' and 'type' keys (like ticker_lookup.py line 796)
-                                        role_val = msg.get('role', '')
-                                        type_val = msg.get('type', '')
-                                        role_str = str(role_val).lower() if role_val else ''
-                                        type_str = str(type_val).lower() if type_val else ''
-                                        
-                                        # CRITICAL: Explicitly check for USER - if it contains "user", it's NOT assistant!
-                                        if ('user' in role_str or 'user' in type_str) and 'assistant' not in role_str and 'assistant' not in type_str:
-                                            is_assistant = False
-                                        elif 'assistant' in role_str or 'assistant' in type_str or 'ai' in role_str or 'bot' in role_str:
-                                            is_assistant = True
-                                        else:
-                                            is_assistant = False
-                                        
-                                        logger.error(f"      Role from dict: '{role_val}' (lower: '{role_str}'), type: '{type_val}' (lower: '{type_str}'), is_assistant: {is_assistant}")
-                                    
-                                    # Extract content (matching ticker_lookup.py line 798-803 exactly)
-                                    content = None
-                                    if hasattr(msg, 'content'):
-                                        content = msg.content
-                                        logger.error(f"      Content from attr: {type(content)}, length: {len(content) if content else 0}")
-                                    elif isinstance(msg, dict) and 'content' in msg:  # Check key exists first
-                                        content = msg['content']
-                                        logger.error(f"      Content from dict key: {type(content)}, length: {len(content) if content else 0}")
-                                    
-                                    if content:
-                                        # Convert to string if needed
-                                        if not isinstance(content, str):
-                                            logger.error(f"      🔄 Converting content from {type(content)} to string...")
-                                            try:
-                                                # Try to extract text from object
-                                                if hasattr(content, 'text'):
-                                                    content = content.text
-                                                    logger.error(f"         → Extracted from .text attribute")
-                                                elif hasattr(content, 'body'):
-                                                    content = content.body
-                                                    logger.error(f"         → Extracted from .body attribute")
-                                                elif isinstance(content, (list, tuple)) and len(content) > 0:
-                                                    # Content might be a list of text parts
-                                                    logger.error(f"         → Content is list/tuple with {len(content)} items")
-                                                    content = ' '.join(str(c) for c in content)
-                                                else:
-                                                    logger.error(f"         → Converting to string directly")
-                                                    content = str(content)
-                                            except Exception as conv_err:
-                                                logger.error(f"         ⚠️  Conversion error: {conv_err}")
-                                                content = str(content)
-                                        
-                                        if not isinstance(content, str):
-                                            logger.error(f"      ⚠️  Content is still not a string after conversion: {type(content)}")
-                                            logger.error(f"         Content value: {str(content)[:200]}")
-                                            content = None
-                                        else:
-                                            content_lower = content.lower()
-                                            logger.error(f"      📄 Content preview (first 300 chars): {content[:300]}")
-                                            logger.error(f"      📏 Content length: {len(content)}")
-                                            
-                                            # Check for error messages
-                                            has_error = (
-                                                "llm error" in content_lower or 
-                                                "api error" in content_lower or 
-                                                "invalid model" in content_lower or
-                                                "not supported" in content_lower or
-                                                "supported models" in content_lower
-                                            )
-                                            
-                                            # Check if it's a substantial response (not just confirmation messages or errors)
-                                            is_substantial = len(content) > 50 and (
-                                                not has_error and
-                                                "message added" not in content_lower and
-                                                "successfully" not in content_lower and
-                                                "message sent" not in content_lower
-                                            )
-                                            
-                                            logger.error(f"      🔍 Analysis:")
-                                            logger.error(f"         - has_error: {has_error}")
-                                            logger.error(f"         - is_substantial: {is_substantial}")
-                                            logger.error(f"         - is_assistant: {is_assistant}")
-                                            
-                                            if has_error:
-                                                logger.error(f"      ⚠️  ERROR MESSAGE DETECTED - This is likely why API is not working!")
-                                                logger.error(f"         Full error: {content[:500]}")
-                                            
-                                            if is_substantial:
-                                                # CRITICAL: Only take ASSISTANT messages, never USER messages
-                                                # The USER message is our prompt, not the AI response!
-                                                if is_assistant:
-                                                    response_text = content
-                                                    logger.error("=" * 100)
-                                                    logger.error(f"✅✅✅ SUCCESS! Found AI response in thread messages!")
-                                                    logger.error(f"   Length: {len(response_text)}")
-                                                    logger.error(f"   Role: {getattr(msg, 'role', msg.get('role', 'unknown') if isinstance(msg, dict) else 'unknown')}")
-                                                    logger.error(f"   Preview: {response_text[:500]}")
-                                                    logger.error("=" * 100)
-                                                    break
-                                                else:
-                                                    logger.error(f"      ⏭️  Skipping non-assistant message (role: {getattr(msg, 'role', msg.get('role', 'unknown') if isinstance(msg, dict) else 'unknown')}) - This is the USER message (our prompt)")
-                                            elif has_error:
-                                                logger.error(f"      ⚠️  Skipping error message (not substantial)")
-                                            else:
-                                                logger.error(f"      ⏭️  Skipping (not substantial: length={len(content)}, is_assistant={is_assistant})")
-                                                if content and len(content) > 10:
-                                                    # Log shorter messages for debugging
-                                                    logger.error(f"         Short message preview: {content[:100]}")
-                                    else:
-                                        logger.error(f"      ⚠️  No content found in message")
-                                        # Try additional ways to get content
-                                        if isinstance(msg, dict):
-                                            # Try other possible keys
-                                            for key in ['text', 'body', 'message', 'data', 'value']:
-                                                if key in msg:
-                                                    potential_content = msg[key]
-                                                    if isinstance(potential_content, str) and len(potential_content) > 50:
-                                                        logger.error(f"      Found content in '{key}': length={len(potential_content)}")
-                                                        response_text = potential_content
-                                                        break
-                                        elif hasattr(msg, 'text'):
-                                            potential_content = msg.text
-                                            if isinstance(potential_content, str) and len(potential_content) > 50:
-                                                logger.error(f"      Found content in .text attr: length={len(potential_content)}")
-                                                response_text = potential_content
-                                                break
-                                    
-                                    if response_text:
-                                        break  # Exit loop if we found response
-                            except Exception as msg_processing_error:
-                                logger.error(f"❌ Exception in message processing loop: {msg_processing_error}", exc_info=True)
-                                import traceback
-                                logger.error(f"❌ Traceback: {traceback.format_exc()}")
-                        else:
-                            logger.error(f"⚠️  Messages is falsy, skipping processing")
-                    except Exception as fetch_error:
-                        logger.error(f"❌ Exception fetching thread messages: {fetch_error}", exc_info=True)
-                        import traceback
-                        logger.error(f"❌ Traceback: {traceback.format_exc()}")
-                        # Try multiple times with increasing waits
-                        for retry_wait in [3, 5, 7]:
-                            try:
-                                await asyncio.sleep(retry_wait)
-                                if hasattr(self._sdk_client, 'get_messages'):
-                                    messages = await self._sdk_client.get_messages(thread_id=thread_id)
-                                    if messages:
-                                        msg_list = []
-                                        if isinstance(messages, list):
-                                            msg_list = messages
-                                        elif hasattr(messages, 'messages'):
-                                            msg_list = messages.messages if isinstance(messages.messages, list) else [messages.messages]
-                                        
-                                        for msg in reversed(msg_list):
-                                            content = None
-                                            if hasattr(msg, 'content'):
-                                                content = msg.content
-                                            elif isinstance(msg, dict):
-                                                content = msg.get('content', '')
-                                            
-                                            if content and len(content) > 50 and "llm error" not in content.lower():
-                                                # Check if it's an assistant message
-                                                is_assistant = False
-                                                if hasattr(msg, 'role'):
-                                                    role = msg.role
-                                                    if hasattr(role, 'value'):
-                                                        is_assistant = role.value in ['assistant', 'ai', 'bot']
-                                                    else:
-                                                        is_assistant = str(role).lower() in ['assistant', 'ai', 'bot']
-                                                elif isinstance(msg, dict):
-                                                    is_assistant = msg.get('role', '').lower() in ['assistant', 'ai', 'bot']
-                                                
-                                                if is_assistant or not hasattr(msg, 'role'):
-                                                    response_text = content
-                                                    logger.info(f"Found AI response on retry after {retry_wait}s wait (length: {len(response_text)})")
-                                                    break
-                                        
-                                        if response_text:
-                                            break
-                            except Exception as retry_error:
-                                logger.debug(f"Retry {retry_wait}s failed: {retry_error}")
-                                continue
-            
-            # Extract response content from response object (if we haven't already)
-            # This matches the logic in ticker_lookup.py
-            if response_text is None or len(response_text.strip()) < 10:
-                if response:
-                    logger.error(f"🔍 Extracting from response object (type: {type(response)})...")
-                    # Try multiple ways to extract content from response (same as ticker_lookup.py)
-                    if hasattr(response, 'content'):
-                        response_text = response.content
-                        logger.error(f"✅ Found response.content: length: {len(response_text) if response_text else 0}")
-                    elif hasattr(response, 'latest_message'):
-                        if hasattr(response.latest_message, 'content'):
-                            response_text = response.latest_message.content
-                            logger.error(f"✅ Found response.latest_message.content: length: {len(response_text) if response_text else 0}")
-                        elif isinstance(response.latest_message, dict):
-                            response_text = response.latest_message.get('content', '')
-                            logger.error(f"✅ Found response.latest_message dict: length: {len(response_text) if response_text else 0}")
-                    elif hasattr(response, 'message'):
-                        # Response has 'message' field instead of 'latest_message' (like ticker_lookup.py line 904-905)
-                        msg_obj = response.message
-                        if hasattr(msg_obj, 'content'):
-                            response_text = msg_obj.content
-                            logger.error(f"✅ Found response.message.content: length: {len(response_text) if response_text else 0}")
-                        elif isinstance(msg_obj, dict):
-                            response_text = msg_obj.get('content', '')
-                            logger.error(f"✅ Found response.message dict: length: {len(response_text) if response_text else 0}")
-                        else:
-                            # Message might be the content itself
-                            response_text = str(msg_obj)
-                            logger.error(f"✅ Found response.message as string: length: {len(response_text) if response_text else 0}")
-                    elif isinstance(response, dict):
-                        # Try various keys (API might return 'message' instead of 'latest_message')
-                        response_text = (
-                            response.get('latest_message', {}).get('content', '') or
-                            response.get('message', {}).get('content', '') or
-                            response.get('content', '') or
-                            response.get('text', '') or
-                            str(response)
-                        )
-                        logger.error(f"✅ Found response dict: length: {len(response_text) if response_text else 0}")
-                    else:
-                        response_text = str(response)
-                        logger.error(f"✅ Converted response to string: length: {len(response_text) if response_text else 0}")
-                    
-                    logger.info(f"Extracted response_text from response object (length: {len(response_text) if response_text else 0})")
-                else:
-                    response_text = ''
-            
-            # Log what we got for debugging
-            logger.error("=" * 100)
-            logger.error(f"📊 RESPONSE ANALYSIS:")
-            logger.error(f"   response_text type: {type(response_text)}")
-            logger.error(f"   response_text length: {len(response_text) if response_text else 0}")
-            if response_text:
-                logger.error(f"   response_text preview (first 1000 chars): {response_text[:1000]}")
-            logger.error("=" * 100)
+            response_text = await self._profile_reply(onboarding_text, user_id)
             
             if not response_text or len(response_text.strip()) < 10:
-                logger.error(f"❌ Empty or very short response_text (length: {len(response_text) if response_text else 0}), using fallback")
+                logger.warning(f"Empty or very short response_text (length: {len(response_text) if response_text else 0}), using fallback")
+                return self._parse_profile_fallback(onboarding_text)
+            if '{' not in response_text:
+                # No JSON object anywhere - none of the extraction strategies below can succeed
+                logger.warning("No JSON object in response_text, using fallback. Response: %.500s", response_text)
                 return self._parse_profile_fallback(onboarding_text)
             
-            logger.error(f"✅ Got response_text with length: {len(response_text)}")
-            
-            logger.debug(f"Response text length: {len(response_text)}, first 200 chars: {response_text[:200]}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Response text length: %s, first 200 chars: %.200s", len(response_text), response_text)
             
             # Parse JSON response with multiple extraction strategies
             try:
-                import re
+                profile_dict = None
                 extracted_json = None
                 
-                # Strategy 1: Extract from markdown code blocks (```json ... ```)
-                json_match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
-                if json_match:
-                    extracted_json = json_match.group(1).strip()
-                    logger.debug("Extracted JSON from markdown code block")
+                # Fast path: a well-behaved reply is just the JSON object
+                stripped_response = response_text.strip()
+                if stripped_response.startswith('{'):
+                    try:
+                        profile_dict = _loads(stripped_response)
+                    except json.JSONDecodeError:
+                        pass
                 
-                # Strategy 2: Extract from markdown code blocks without language (``` ... ```)
-                if not extracted_json:
-                    json_match = re.search(r'```\s*(.*?)\s*```', response_text, re.DOTALL)
-                    if json_match:
-                        candidate = json_match.group(1).strip()
-                        # Check if it looks like JSON (starts with {)
-                        if candidate.startswith('{'):
-                            extracted_json = candidate
-                            logger.debug("Extracted JSON from generic code block")
+                # Strategy 1: Extract from markdown code blocks (```json ... ``` or ``` ... ```)
+                if profile_dict is None and '```' in response_text:
+                    json_match = _JSON_BLOCK_RE.search(response_text)
+                    if json_match and json_match.group(1).startswith('{'):
+                        extracted_json = json_match.group(1)
+                        logger.debug("Extracted JSON from markdown code block")
                 
-                # Strategy 3: Find JSON object by matching braces (non-greedy, balanced)
-                if not extracted_json:
-                    # Find the first { and then match balanced braces
-                    brace_count = 0
+                # Strategy 2: Decode the first balanced JSON object after any leading prose
+                if profile_dict is None and not extracted_json:
                     start_idx = response_text.find('{')
                     if start_idx != -1:
-                        end_idx = start_idx
-                        for i in range(start_idx, len(response_text)):
-                            if response_text[i] == '{':
-                                brace_count += 1
-                            elif response_text[i] == '}':
-                                brace_count -= 1
-                                if brace_count == 0:
-                                    end_idx = i + 1
-                                    break
-                        if brace_count == 0:
-                            extracted_json = response_text[start_idx:end_idx]
-                            logger.debug("Extracted JSON by matching braces")
+                        try:
+                            profile_dict, _ = _JSON_DECODER.raw_decode(response_text, start_idx)
+                            logger.debug("Decoded first JSON object in response")
+                        except json.JSONDecodeError:
+                            pass
                 
-                # Strategy 4: Try to find JSON object with regex (more permissive)
-                if not extracted_json:
+                # Strategy 3: Try to find JSON object with regex (more permissive)
+                if profile_dict is None and not extracted_json:
                     # Match JSON object that might span multiple lines
-                    json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', response_text, re.DOTALL)
+                    json_match = _JSON_OBJECT_RE.search(response_text)
                     if json_match:
                         extracted_json = json_match.group(0)
                         logger.debug("Extracted JSON with regex pattern")
                 
-                # Strategy 5: Try to clean and extract from the whole response
-                if not extracted_json:
-                    # Remove leading/trailing whitespace and try to parse
-                    cleaned = response_text.strip()
-                    # Remove any leading text before first {
-                    first_brace = cleaned.find('{')
-                    if first_brace != -1:
-                        cleaned = cleaned[first_brace:]
-                        # Try to find the last }
-                        last_brace = cleaned.rfind('}')
-                        if last_brace != -1:
-                            cleaned = cleaned[:last_brace + 1]
-                            extracted_json = cleaned
-                            logger.debug("Extracted JSON by cleaning response")
-                
-                if not extracted_json or len(extracted_json.strip()) < 2:
-                    logger.warning(f"No valid JSON found in response_text, trying fallback. Response: {response_text[:500]}")
-                    return self._parse_profile_fallback(onboarding_text)
-                
-                # Try to parse the extracted JSON
-                logger.error(f"🔍 Attempting to parse JSON (length: {len(extracted_json)})")
-                logger.error(f"📋 JSON preview (first 500 chars): {extracted_json[:500]}")
-                try:
-                    profile_dict = json.loads(extracted_json)
-                    logger.error(f"✅ Successfully parsed JSON - keys: {list(profile_dict.keys())}")
-                    logger.error(f"   horizon_months: {profile_dict.get('horizon_months')}")
-                    logger.error(f"   risk_score: {profile_dict.get('risk_score')}")
-                except json.JSONDecodeError as json_error:
-                    logger.error(f"❌ JSON parse error: {json_error}")
-                    logger.warning(f"JSON decode error: {json_error}. Attempting to fix common issues...")
-                    # Try to fix common JSON issues
-                    # Remove trailing commas
-                    fixed_json = re.sub(r',\s*}', '}', extracted_json)
-                    fixed_json = re.sub(r',\s*]', ']', fixed_json)
-                    # Remove comments (not valid in JSON but sometimes AI adds them)
-                    fixed_json = re.sub(r'//.*?$', '', fixed_json, flags=re.MULTILINE)
-                    fixed_json = re.sub(r'/\*.*?\*/', '', fixed_json, flags=re.DOTALL)
-                    try:
-                        profile_dict = json.loads(fixed_json)
-                        logger.info("Successfully parsed JSON after fixing common issues")
-                    except json.JSONDecodeError:
-                        logger.error(f"Failed to parse JSON even after fixes. Extracted JSON: {extracted_json[:500]}")
+                # Strategy 4: Try to clean and extract from the whole response
+                if profile_dict is None and not extracted_json:
+                    # Remove any leading text before first { and trailing text after the last }
+                    first_brace = stripped_response.find('{')
+                    last_brace = stripped_response.rfind('}')
+                    if first_brace != -1 and last_brace > first_brace:
+                        extracted_json = stripped_response[first_brace:last_brace + 1]
+                        logger.debug("Extracted JSON by cleaning response")
+                
+                if profile_dict is None:
+                    if not extracted_json or len(extracted_json.strip()) < 2:
+                        logger.warning("No valid JSON found in response_text, trying fallback. Response: %.500s", response_text)
                         return self._parse_profile_fallback(onboarding_text)
+                    
+                    # Try to parse the extracted JSON
+                    if logger.isEnabledFor(logging.DEBUG):
+                        logger.debug("Parsing JSON (length: %s): %.500s", len(extracted_json), extracted_json)
+                    try:
+                        profile_dict = _loads(extracted_json)
+                    except json.JSONDecodeError as json_error:
+                        logger.warning(f"JSON decode error: {json_error}. Attempting to fix common issues...")
+                        # Try to fix common JSON issues
+                        # Remove comments first (not valid in JSON but sometimes AI adds them), so a
+                        # comma before a trailing comment is still seen as trailing
+                        fixed_json = extracted_json
+                        if '//' in fixed_json:
+                            fixed_json = _LINE_COMMENT_RE.sub('', fixed_json)
+                        if '/*' in fixed_json:
+                            fixed_json = _BLOCK_COMMENT_RE.sub('', fixed_json)
+                        # Remove trailing commas before } or ] (one pass)
+                        fixed_json = _TRAILING_COMMA_RE.sub(r'\1', fixed_json)
+                        try:
+                            profile_dict = _loads(fixed_json)
+                            logger.info("Successfully parsed JSON after fixing common issues")
+                        except json.JSONDecodeError:
+                            logger.error("Failed to parse JSON even after fixes. Extracted JSON: %.500s", extracted_json)
+                            return self._parse_profile_fallback(onboarding_text)
                 
                 # Validate and fix extracted values
                 # CRITICAL: ALWAYS run text extraction and use it if it differs from AI default (60)
                 # The AI often defaults to 60 even when explicit values are present
-                logger.error("=" * 100)
-                logger.error("🔧 POST-PROCESSING STARTED - This message should always appear!")
-                logger.error(f"   profile_dict keys: {list(profile_dict.keys())}")
-                logger.error(f"   profile_dict horizon: {profile_dict.get('horizon_months')}")
-                logger.error(f"   profile_dict risk: {profile_dict.get('risk_score')}")
-                logger.error(f"   Original text: '{onboarding_text[:200]}'")
-                logger.error("=" * 100)
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Post-processing AI profile - keys: %s, horizon: %s, risk: %s", list(profile_dict), profile_dict.get('horizon_months'), profile_dict.get('risk_score'))
+                # One pass over the text gives both the value and whether it was explicit
+                text_horizon, has_explicit_horizon = self._horizon_info(text_lower)
+                text_risk = self._risk_score(text_lower)
                 try:
-                    import re
-                    logger.error("🔍 Calling _extract_horizon_from_text...")
-                    text_horizon = self._extract_horizon_from_text(onboarding_text)
-                    logger.error(f"✅ EXTRACTED text_horizon: {text_horizon}")
-                    text_lower_check = onboarding_text.lower()
+                    logger.debug("POST-PROCESS: text='%.80s', has_explicit_horizon=%s, text_horizon=%s", onboarding_text, has_explicit_horizon, text_horizon)
                     
-                    # Check for explicit years/months in text
-                    has_explicit_years = bool(re.search(r'\d+\s*years?', text_lower_check)) or bool(re.search(r'\d+\s*year\s+horizon', text_lower_check))
-                    has_explicit_months = bool(re.search(r'\d+\s*months?', text_lower_check))
-                    
-                    # Log for debugging
-                    logger.info(f"POST-PROCESS: text='{onboarding_text[:80]}', has_years={has_explicit_years}, has_months={has_explicit_months}, text_horizon={text_horizon}")
-                    
-                    if 'horizon_months' not in profile_dict or not isinstance(profile_dict.get('horizon_months'), int):
+                    ai_horizon = profile_dict.get('horizon_months')
+                    if ai_horizon.__class__ is not int:
                         # Missing - use text extraction
                         profile_dict['horizon_months'] = text_horizon
-                        logger.info(f"POST-PROCESS: Set missing horizon to {text_horizon}")
+                        logger.info("POST-PROCESS: Set missing horizon to %s", text_horizon)
                     else:
-                        ai_horizon = profile_dict['horizon_months']
-                        logger.info(f"POST-PROCESS: AI={ai_horizon}, text={text_horizon}, explicit_years={has_explicit_years}, explicit_months={has_explicit_months}")
+                        logger.debug("POST-PROCESS: AI=%s, text=%s, explicit=%s", ai_horizon, text_horizon, has_explicit_horizon)
                         
                         # ALWAYS override if text extraction differs from AI and text extraction isn't default
                         # This catches cases where AI defaults to 60 but text has explicit values
                         should_override = False
                         if text_horizon != ai_horizon:
                             # Text extraction differs from AI
-                            if has_explicit_years or has_explicit_months:
+                            if has_explicit_horizon:
                                 # Explicit value in text - always trust text extraction
                                 should_override = True
-                                logger.info(f"POST-PROCESS: OVERRIDE - explicit value in text, text={text_horizon} != AI={ai_horizon}")
+                                logger.debug("POST-PROCESS: OVERRIDE - explicit value in text, text=%s != AI=%s", text_horizon, ai_horizon)
                             elif ai_horizon == 60 and text_horizon != 60:
                                 # AI defaulted to 60, but text extraction found something else
                                 should_override = True
-                                logger.info(f"POST-PROCESS: OVERRIDE - AI defaulted to 60, but text extraction found {text_horizon}")
+                                logger.debug("POST-PROCESS: OVERRIDE - AI defaulted to 60, but text extraction found %s", text_horizon)
                         
                         if should_override:
                             old_value = profile_dict['horizon_months']
                             profile_dict['horizon_months'] = text_horizon
-                            logger.info(f"POST-PROCESS: OVERRIDDEN horizon from {old_value} to {text_horizon}")
+                            logger.info("POST-PROCESS: OVERRIDDEN horizon from %s to %s", old_value, text_horizon)
                         elif ai_horizon < 0 or ai_horizon > 600:
                             # Out of range - fix it
                             horizon = max(0, min(600, ai_horizon))
                             profile_dict['horizon_months'] = horizon
-                            logger.warning(f"POST-PROCESS: Adjusted out-of-range horizon to {horizon}")
+                            logger.warning("POST-PROCESS: Adjusted out-of-range horizon to %s", horizon)
                         else:
-                            logger.debug(f"POST-PROCESS: Keeping AI value: {ai_horizon}")
+                            logger.debug("POST-PROCESS: Keeping AI value: %s", ai_horizon)
                     
                     # Validate risk_score - ALWAYS check text extraction for explicit risk phrases
-                    text_risk = self._extract_risk_from_text(onboarding_text)
-                    text_lower = onboarding_text.lower()
-                    has_explicit_risk = (
-                        "risk averse" in text_lower or 
-                        "i'm risk averse" in text_lower or 
-                        "very conservative" in text_lower or
-                        "conservative" in text_lower or 
-                        "aggressive" in text_lower or 
-                        "i'm aggressive" in text_lower or
-                        "high risk" in text_lower or
-                        "moderate risk" in text_lower or
-                        "moderate" in text_lower or
-                        "balanced" in text_lower
-                    )
+                    has_explicit_risk = _EXPLICIT_RISK_RE.search(text_lower) is not None
                     
-                    logger.info(f"POST-PROCESS: risk - text_risk={text_risk}, has_explicit_risk={has_explicit_risk}")
+                    logger.debug("POST-PROCESS: risk - text_risk=%s, has_explicit_risk=%s", text_risk, has_explicit_risk)
                     
-                    if 'risk_score' not in profile_dict or not isinstance(profile_dict.get('risk_score'), int):
+                    ai_risk = profile_dict.get('risk_score')
+                    if ai_risk.__class__ is not int:
                         # Missing - use text extraction
                         profile_dict['risk_score'] = text_risk
-                        logger.info(f"POST-PROCESS: Set missing risk to {text_risk}")
+                        logger.info("POST-PROCESS: Set missing risk to %s", text_risk)
                     else:
-                        ai_risk = profile_dict['risk_score']
-                        logger.info(f"POST-PROCESS: risk - AI={ai_risk}, text={text_risk}, has_explicit={has_explicit_risk}")
+                        logger.debug("POST-PROCESS: risk - AI=%s, text=%s, has_explicit=%s", ai_risk, text_risk, has_explicit_risk)
                         
                         # ALWAYS override if text extraction differs from AI and text extraction isn't default
                         # This catches cases where AI defaults to 50 but text has explicit risk phrases
@@ -1480,212 +1564,153 @@ CRITICAL:
                             if has_explicit_risk:
                                 # Explicit risk phrase in text - always trust text extraction
                                 should_override = True
-                                logger.info(f"POST-PROCESS: OVERRIDE - explicit risk phrase, text={text_risk} != AI={ai_risk}")
+                                logger.debug("POST-PROCESS: OVERRIDE - explicit risk phrase, text=%s != AI=%s", text_risk, ai_risk)
                             elif ai_risk == 50 and text_risk != 50:
                                 # AI defaulted to 50, but text extraction found something else
                                 should_override = True
-                                logger.info(f"POST-PROCESS: OVERRIDE - AI defaulted to 50, but text extraction found {text_risk}")
+                                logger.debug("POST-PROCESS: OVERRIDE - AI defaulted to 50, but text extraction found %s", text_risk)
                         
                         if should_override:
                             old_value = profile_dict['risk_score']
                             profile_dict['risk_score'] = text_risk
-                            logger.info(f"POST-PROCESS: OVERRIDDEN risk from {old_value} to {text_risk}")
+                            logger.info("POST-PROCESS: OVERRIDDEN risk from %s to %s", old_value, text_risk)
                         elif ai_risk < 0 or ai_risk > 100:
                             # Out of range - fix it
                             risk = max(0, min(100, ai_risk))
                             profile_dict['risk_score'] = risk
-                            logger.warning(f"POST-PROCESS: Adjusted out-of-range risk to {risk}")
+                            logger.warning("POST-PROCESS: Adjusted out-of-range risk to %s", risk)
                         else:
-                            logger.debug(f"POST-PROCESS: Keeping AI risk value: {ai_risk}")
+                            logger.debug("POST-PROCESS: Keeping AI risk value: %s", ai_risk)
                 except Exception as post_process_error:
                     logger.error(f"Error in post-processing: {post_process_error}", exc_info=True)
                     # Continue anyway - don't fail the whole extraction
                 
                 # Validate objective
-                if 'objective' not in profile_dict or not isinstance(profile_dict.get('objective'), dict):
-                    obj_type = self._extract_objective_from_text(onboarding_text)
+                objective = profile_dict.get('objective')
+                if not isinstance(objective, dict):
+                    obj_type = self._objective_type(text_lower)
                     profile_dict['objective'] = {'type': obj_type, 'notes': onboarding_text[:100]}
-                    logger.info(f"Extracted objective from text: {obj_type}")
-                elif 'type' not in profile_dict.get('objective', {}):
-                    obj_type = self._extract_objective_from_text(onboarding_text)
-                    profile_dict['objective'] = {'type': obj_type, 'notes': profile_dict.get('objective', {}).get('notes', onboarding_text[:100])}
-                    logger.info(f"Fixed objective type: {obj_type}")
+                    logger.info("Extracted objective from text: %s", obj_type)
+                elif 'type' not in objective:
+                    obj_type = self._objective_type(text_lower)
+                    profile_dict['objective'] = {'type': obj_type, 'notes': objective.get('notes', onboarding_text[:100])}
+                    logger.info("Fixed objective type: %s", obj_type)
+                
+                # One scan of the original text; each mention's offsets also decide whether it was avoided
+                sector_mentions = find_sector_mentions(text_lower)
                 
                 # Normalize sector names to exact sector names (also check the original text)
-                if 'preferences' in profile_dict and 'sectors_like' in profile_dict['preferences']:
+                prefs = profile_dict.setdefault('preferences', {})
+                if 'sectors_like' in prefs:
                     # Get sectors from both the extracted list and original text
-                    sectors_from_list = get_sectors_by_keywords(' '.join(profile_dict['preferences']['sectors_like']))
-                    sectors_from_text = get_sectors_by_keywords(onboarding_text)
-                    all_sectors = sectors_from_list + sectors_from_text
-                    normalized_sectors = list(set([s['name'] for s in all_sectors]))  # Remove duplicates
-                    profile_dict['preferences']['sectors_like'] = normalized_sectors if normalized_sectors else profile_dict['preferences']['sectors_like']
+                    sectors_from_list = get_sectors_by_keywords(' '.join(prefs['sectors_like']))
+                    normalized_sectors = list(dict.fromkeys(itertools.chain(
+                        (s['name'] for s in sectors_from_list),
+                        (sector['name'] for _, _, sector in sector_mentions),
+                    )))
+                    if normalized_sectors:
+                        prefs['sectors_like'] = normalized_sectors
                     
-                if 'preferences' in profile_dict and 'sectors_avoid' in profile_dict['preferences']:
-                    sectors = get_sectors_by_keywords(' '.join(profile_dict['preferences']['sectors_avoid']))
-                    normalized_sectors = list(set([s['name'] for s in sectors]))
-                    profile_dict['preferences']['sectors_avoid'] = normalized_sectors if normalized_sectors else profile_dict['preferences']['sectors_avoid']
+                if 'sectors_avoid' in prefs:
+                    sectors = get_sectors_by_keywords(' '.join(prefs['sectors_avoid']))
+                    normalized_sectors = list(dict.fromkeys(s['name'] for s in sectors))
+                    if normalized_sectors:
+                        prefs['sectors_avoid'] = normalized_sectors
                 
-                # Ensure preferences structure exists
-                if 'preferences' not in profile_dict:
-                    profile_dict['preferences'] = {}
-                if 'sectors_like' not in profile_dict['preferences']:
-                    profile_dict['preferences']['sectors_like'] = []
-                if 'sectors_avoid' not in profile_dict['preferences']:
-                    profile_dict['preferences']['sectors_avoid'] = []
-                if 'regions_like' not in profile_dict['preferences']:
-                    profile_dict['preferences']['regions_like'] = []
-                
-                # Extract constraints from text if not properly extracted
-                if 'constraints' not in profile_dict:
-                    profile_dict['constraints'] = {}
+                # Ensure preferences/constraints structure exists
+                for key in ('sectors_like', 'sectors_avoid', 'regions_like'):
+                    prefs.setdefault(key, [])
+                cons = profile_dict.setdefault('constraints', {})
                 
                 # Extract max_holdings from text
-                import re
-                max_holdings_match = re.search(r'max(?:imum)?\s+(\d+)\s+holdings?', onboarding_text.lower())
+                max_holdings_match = _MAX_HOLDINGS_RE.search(text_lower)
                 if max_holdings_match:
                     extracted_max = int(max_holdings_match.group(1))
-                    if 'max_holdings' not in profile_dict.get('constraints', {}) or profile_dict['constraints'].get('max_holdings', 20) == 20:
+                    if cons.get('max_holdings', 20) == 20:
                         # AI didn't extract it or used default - use text extraction
-                        if 'max_holdings' not in profile_dict['constraints']:
-                            profile_dict['constraints']['max_holdings'] = extracted_max
-                        else:
-                            profile_dict['constraints']['max_holdings'] = extracted_max
-                        logger.info(f"Extracted max_holdings from text: {extracted_max}")
+                        cons['max_holdings'] = extracted_max
+                        logger.debug("Extracted max_holdings from text: %s", extracted_max)
                 
                 # Extract max_position_pct from text - handle multiple patterns
-                max_position_patterns = [
-                    r'max(?:imum)?\s+(\d+(?:\.\d+)?)\s*%',  # "max 15%"
-                    r'(\d+(?:\.\d+)?)\s*%\s+per\s+position',  # "15% per position"
-                    r'no\s+.*?exceed\s+(\d+(?:\.\d+)?)\s*%',  # "no position exceed 15%"
-                    r'should\s+not\s+exceed\s+(\d+(?:\.\d+)?)\s*%',  # "should not exceed 15%"
-                ]
-                max_position_match = None
-                for pattern in max_position_patterns:
-                    max_position_match = re.search(pattern, onboarding_text.lower())
-                    if max_position_match:
-                        break
-                
-                if max_position_match:
-                    extracted_max_pct = float(max_position_match.group(1))
+                extracted_max_pct = _max_position_pct(text_lower)
+                if extracted_max_pct is not None:
                     # Always override if we found explicit value in text
-                    profile_dict['constraints']['max_position_pct'] = extracted_max_pct
-                    logger.info(f"Extracted max_position_pct from text: {extracted_max_pct}")
+                    cons['max_position_pct'] = extracted_max_pct
+                    logger.debug("Extracted max_position_pct from text: %s", extracted_max_pct)
                 
-                # Fix sector avoidance - check if text says "avoid" or "don't want"
-                text_lower = onboarding_text.lower()
-                avoid_patterns = [
-                    r"avoid\s+([^,\.]+)",
-                    r"don'?t\s+want\s+([^,\.]+)",
-                    r"exclude\s+([^,\.]+)",
-                    r"no\s+([^,\.]+)",
-                ]
+                # Fix sector avoidance - sectors mentioned inside an "avoid"/"don't want" clause
+                # (clauses come back sorted and non-overlapping, so bisect finds the candidate)
                 avoided_sectors_from_text = []
-                for pattern in avoid_patterns:
-                    matches = re.findall(pattern, text_lower)
-                    for match in matches:
-                        # Extract sector names from the match
-                        avoided_sectors = get_sectors_by_keywords(match)
-                        avoided_sectors_from_text.extend([s['name'] for s in avoided_sectors])
+                avoid_spans = [m.span(1) for m in _AVOID_PHRASE_RE.finditer(text_lower)] if sector_mentions else None
+                if avoid_spans:
+                    avoid_starts = [start for start, _ in avoid_spans]
+                    for start, end, sector in sector_mentions:
+                        i = bisect.bisect_right(avoid_starts, start) - 1
+                        if i >= 0 and end <= avoid_spans[i][1]:
+                            avoided_sectors_from_text.append(sector['name'])
                 
                 if avoided_sectors_from_text:
                     # Remove duplicates
-                    avoided_sectors_from_text = list(set(avoided_sectors_from_text))
+                    avoided_sectors_from_text = list(dict.fromkeys(avoided_sectors_from_text))
                     # Merge with AI extracted sectors_avoid
-                    current_avoid = profile_dict.get('preferences', {}).get('sectors_avoid', [])
+                    current_avoid = prefs['sectors_avoid']
                     if isinstance(current_avoid, list):
-                        all_avoided = list(set(current_avoid + avoided_sectors_from_text))
+                        all_avoided = list(dict.fromkeys(itertools.chain(current_avoid, avoided_sectors_from_text)))
                     else:
                         all_avoided = avoided_sectors_from_text
-                    profile_dict['preferences']['sectors_avoid'] = all_avoided
+                    prefs['sectors_avoid'] = all_avoided
                     # Also remove from sectors_like if they're there
-                    if 'sectors_like' in profile_dict.get('preferences', {}):
-                        sectors_like = profile_dict['preferences']['sectors_like']
-                        profile_dict['preferences']['sectors_like'] = [s for s in sectors_like if s not in all_avoided]
-                    logger.info(f"Extracted sectors_avoid from text: {all_avoided}")
-                
-                # Ensure constraints structure exists
-                if 'constraints' not in profile_dict:
-                    profile_dict['constraints'] = {}
+                    avoided_names = set(all_avoided)
+                    prefs['sectors_like'] = [s for s in prefs['sectors_like'] if s not in avoided_names]
+                    logger.debug("Extracted sectors_avoid from text: %s", all_avoided)
                 
                 # Final verification and FORCE override if needed
                 # This is the LAST chance to fix values before creating the profile
                 # ALWAYS run extraction and compare - if different, use extraction
                 try:
-                    text_horizon_final = self._extract_horizon_from_text(onboarding_text)
-                    text_risk_final = self._extract_risk_from_text(onboarding_text)
-                    text_lower_final = onboarding_text.lower()
-                    
                     current_horizon = profile_dict.get('horizon_months', 60)
                     current_risk = profile_dict.get('risk_score', 50)
                     
-                    logger.error("=" * 100)
-                    logger.error(f"🎯 FINAL CHECK BEFORE PROFILE CREATION:")
-                    logger.error(f"   current_horizon (from AI): {current_horizon}")
-                    logger.error(f"   text_horizon (from extraction): {text_horizon_final}")
-                    logger.error(f"   current_risk (from AI): {current_risk}")
-                    logger.error(f"   text_risk (from extraction): {text_risk_final}")
-                    logger.error(f"   horizon_match: {text_horizon_final == current_horizon}")
-                    logger.error(f"   risk_match: {text_risk_final == current_risk}")
-                    logger.error("=" * 100)
-                    
                     # SIMPLE RULE: If text extraction differs from current value, use text extraction
                     # This catches all cases where AI defaulted incorrectly
-                    if text_horizon_final != current_horizon:
-                        logger.error(f"🔄 FINAL OVERRIDE HORIZON: {current_horizon} -> {text_horizon_final}")
-                        profile_dict['horizon_months'] = text_horizon_final
-                        logger.error(f"✅ Updated profile_dict['horizon_months'] = {profile_dict['horizon_months']}")
-                    else:
-                        logger.error(f"⏭️  Skipping horizon override (already correct: {current_horizon})")
+                    if text_horizon != current_horizon:
+                        logger.debug("Final override horizon: %s -> %s", current_horizon, text_horizon)
+                        profile_dict['horizon_months'] = text_horizon
                     
-                    if text_risk_final != current_risk:
-                        logger.error(f"🔄 FINAL OVERRIDE RISK: {current_risk} -> {text_risk_final}")
-                        profile_dict['risk_score'] = text_risk_final
-                        logger.error(f"✅ Updated profile_dict['risk_score'] = {profile_dict['risk_score']}")
-                    else:
-                        logger.error(f"⏭️  Skipping risk override (already correct: {current_risk})")
+                    if text_risk != current_risk:
+                        logger.debug("Final override risk: %s -> %s", current_risk, text_risk)
+                        profile_dict['risk_score'] = text_risk
                 except Exception as final_error:
-                    logger.error(f"❌ Error in final override check: {final_error}", exc_info=True)
+                    logger.error(f"Error in final override check: {final_error}", exc_info=True)
                 
                 # Final verification - log what we're about to create
-                logger.error("=" * 100)
-                logger.error(f"📦 FINAL PROFILE DICT VALUES BEFORE InvestorProfile() CREATION:")
-                logger.error(f"   horizon_months: {profile_dict.get('horizon_months')}")
-                logger.error(f"   risk_score: {profile_dict.get('risk_score')}")
-                logger.error(f"   user_id: {profile_dict.get('user_id')}")
-                logger.error(f"   objective: {profile_dict.get('objective')}")
-                logger.error("=" * 100)
-                
                 try:
-                    logger.error("🏗️  Creating InvestorProfile object...")
                     profile = InvestorProfile(**profile_dict)
-                    logger.error("=" * 100)
-                    logger.error(f"✅ SUCCESSFULLY CREATED PROFILE:")
-                    logger.error(f"   profile.horizon_months: {profile.horizon_months}")
-                    logger.error(f"   profile.risk_score: {profile.risk_score}")
-                    logger.error(f"   profile.objective.type: {profile.objective.type}")
-                    logger.error("=" * 100)
-                    logger.info(f"Successfully extracted profile using Backboard AI - horizon: {profile.horizon_months}, risk: {profile.risk_score}, objective: {profile.objective.type}")
-                    return profile
+                    logger.info("Successfully extracted profile using Backboard AI - horizon: %s, risk: %s, objective: %s, sectors_like: %s, sectors_avoid: %s", profile.horizon_months, profile.risk_score, profile.objective.type, profile.preferences.sectors_like, profile.preferences.sectors_avoid)
+                    return self._remember_extraction(cache_key, profile)
                 except Exception as validation_error:
                     logger.warning(f"Profile validation error: {validation_error}. Attempting to fix...")
-                    # Try to fix common validation issues
+                    # Try to fix common validation issues; without a fix, rebuilding would fail the same way
+                    fixed = False
                     if 'user_id' not in profile_dict:
                         profile_dict['user_id'] = 'temp'  # Will be set by caller
-                    if 'last_updated' not in profile_dict:
-                        profile_dict['last_updated'] = datetime.utcnow().isoformat()
+                        fixed = True
                     # CRITICAL: Ensure horizon_months and risk_score are set from text extraction if missing
-                    if 'horizon_months' not in profile_dict or not isinstance(profile_dict.get('horizon_months'), int):
-                        text_horizon = self._extract_horizon_from_text(onboarding_text)
+                    if profile_dict.get('horizon_months').__class__ is not int:
                         profile_dict['horizon_months'] = text_horizon
                         logger.warning(f"Fixed missing horizon_months: set to {text_horizon}")
-                    if 'risk_score' not in profile_dict or not isinstance(profile_dict.get('risk_score'), int):
-                        text_risk = self._extract_risk_from_text(onboarding_text)
+                        fixed = True
+                    if profile_dict.get('risk_score').__class__ is not int:
                         profile_dict['risk_score'] = text_risk
                         logger.warning(f"Fixed missing risk_score: set to {text_risk}")
+                        fixed = True
+                    if not fixed:
+                        logger.error("No fix applies to profile validation error; using fallback")
+                        return self._parse_profile_fallback(onboarding_text)
                     try:
                         profile = InvestorProfile(**profile_dict)
                         logger.info("Successfully created profile after fixing validation issues")
-                        return profile
+                        return self._remember_extraction(cache_key, profile)
                     except Exception as final_error:
                         logger.error(f"Failed to create profile even after fixes: {final_error}")
                         # Use fallback but ensure it extracts years correctly
@@ -1700,6 +1725,436 @@ CRITICAL:
         # Fallback parsing
         return self._parse_profile_fallback(onboarding_text)
     
+    def _remember_extraction(self, cache_key: str, profile: InvestorProfile) -> InvestorProfile:
+        """Cache a copy of a successful extraction (callers mutate the returned profile)."""
+        self._extracted_profiles[cache_key] = profile.model_copy(deep=True)
+        self._extracted_profiles.move_to_end(cache_key)
+        if len(self._extracted_profiles) > EXTRACTED_PROFILE_CACHE_SIZE:
+            self._extracted_profiles.popitem(last=False)
+        return profile
+    
+    async def _profile_reply(self, onboarding_text: str, user_id: Optional[str] = None) -> Optional[str]:
+        """Model reply for one onboarding text, sharing a call with concurrent extractions when batching is on."""
+        onboarding_text = _normalize_onboarding_text(onboarding_text)
+        if self.extract_batch_max <= 1:
+            return await self._request_single_profile_reply(onboarding_text, user_id)
+        if self._extract_queue is None:
+            self._extract_queue = asyncio.Queue()
+        if self._extract_flusher is None or self._extract_flusher.done():
+            self._extract_flusher = asyncio.create_task(self._flush_extractions())
+        future = asyncio.get_running_loop().create_future()
+        self._extract_queue.put_nowait((onboarding_text, user_id, future))
+        return await future
+    
+    async def _flush_extractions(self) -> None:
+        """Send queued texts per user, collecting for up to extract_batch_wait (or extract_batch_max texts) while more are queued."""
+        loop = asyncio.get_running_loop()
+        batch: list[tuple[str, Optional[str], asyncio.Future]] = []
+        try:
+            while True:
+                batch = [await self._extract_queue.get()]
+                # A lone extraction goes out at once rather than waiting out the batch window
+                if not self._extract_queue.empty():
+                    deadline = loop.time() + self.extract_batch_wait
+                    while len(batch) < self.extract_batch_max:
+                        remaining = deadline - loop.time()
+                        if remaining <= 0:
+                            break
+                        try:
+                            batch.append(await asyncio.wait_for(self._extract_queue.get(), remaining))
+                        except asyncio.TimeoutError:
+                            break
+                # Only one user's texts share a call (and that user's thread); anonymous texts go individually
+                groups: dict[Any, list[tuple[str, Optional[str], asyncio.Future]]] = {}
+                for item in batch:
+                    groups.setdefault(item[1] or id(item), []).append(item)
+                batch = []
+                for group in groups.values():
+                    task = asyncio.create_task(self._run_extract_batch(group))
+                    self._extract_batches.add(task)
+                    task.add_done_callback(self._extract_batches.discard)
+        except asyncio.CancelledError:
+            _fail_extractions(batch, RuntimeError("BackboardClient closed"))
+            raise
+    
+    async def _run_extract_batch(self, batch: list[tuple[str, Optional[str], asyncio.Future]]) -> None:
+        """Resolve each queued future (all from one user) with its own reply text (or the exception that prevented one)."""
+        user_id = batch[0][1]
+        try:
+            if len(batch) == 1:
+                replies = [await self._request_single_profile_reply(batch[0][0], user_id)]
+            else:
+                replies = await self._request_batch_profile_replies([text for text, _, _ in batch], user_id)
+        except Exception as e:
+            _fail_extractions(batch, e)
+            return
+        for (_, _, future), reply in zip(batch, replies):
+            if not future.done():
+                future.set_result(reply)
+    
+    async def _request_single_profile_reply(self, onboarding_text: str, user_id: Optional[str] = None) -> Optional[str]:
+        """Model reply for one onboarding text sent on its own."""
+        system_prompt = await _extract_system_prompt()
+        user_text = f"User onboarding text:\n{onboarding_text}"
+        return await self._request_profile_reply(
+            f"{system_prompt}\n\n{user_text}",
+            f"{_SHORT_EXTRACT_PROMPT}\n\n{onboarding_text}",
+            user_id,
+            followup_prompt=user_text
+        )
+    
+    async def _request_batch_profile_replies(self, texts: list[str], user_id: Optional[str] = None) -> list[Optional[str]]:
+        """One model call for several of a user's texts; falls back to one call per text if the array doesn't line up."""
+        system_prompt = await _extract_system_prompt()
+        instructions = _BATCH_EXTRACT_INSTRUCTIONS.format(count=len(texts))
+        numbered = "\n".join(f"[{i}] {text}" for i, text in enumerate(texts, 1))
+        reply = await self._request_profile_reply(
+            f"{system_prompt}\n\n{instructions}\n\nUser onboarding texts:\n{numbered}",
+            f"{_SHORT_EXTRACT_PROMPT} {instructions}\n\n{numbered}",
+            user_id
+        )
+        if reply:
+            start, end = reply.find('['), reply.rfind(']')
+            try:
+                items = _loads(reply[start:end + 1]) if start != -1 and end > start else None
+            except json.JSONDecodeError:
+                items = None
+            if isinstance(items, list) and len(items) == len(texts) and all(isinstance(item, dict) for item in items):
+                logger.info(f"Extracted {len(texts)} profiles in one batched call")
+                return [_dumps(item) for item in items]
+        logger.warning(f"Batched extraction reply did not contain {len(texts)} profiles - extracting individually")
+        # One at a time - the texts share the user's pooled thread
+        return [await self._request_single_profile_reply(text, user_id) for text in texts]
+    
+    async def _poll_for_assistant_reply(self, thread_id: str, timeout: float = 15.0, skip: int = 0) -> Optional[str]:
+        """Fetch thread messages with backoff until an assistant reply appears; None after `timeout` seconds.
+        
+        The first `skip` messages (earlier turns of a reused thread) are ignored.
+        """
+        async def poll() -> Optional[str]:
+            for delay in itertools.chain(POLL_DELAYS_SECONDS, itertools.repeat(POLL_DELAYS_SECONDS[-1])):
+                try:
+                    reply = self._latest_assistant_content(await self._fetch_thread_messages(thread_id), skip)
+                    if reply:
+                        return reply
+                except Exception as e:
+                    logger.debug("Polling thread %s failed: %s", thread_id, e)
+                await asyncio.sleep(delay)
+        
+        try:
+            return await asyncio.wait_for(poll(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"No assistant reply in thread {thread_id} after {timeout}s")
+            return None
+    
+    async def _fetch_thread_messages(self, thread_id: str):
+        """Messages of a thread via whichever listing method the SDK provides."""
+        messages = None
+        if hasattr(self._sdk_client, 'get_messages'):
+            logger.debug("Using get_messages() method")
+            messages = await self._sdk_client.get_messages(thread_id=thread_id)
+        elif hasattr(self._sdk_client, 'list_messages'):
+            logger.debug("Using list_messages() method")
+            messages = await self._sdk_client.list_messages(thread_id=thread_id)
+        elif hasattr(self._sdk_client, 'get_thread'):
+            logger.debug("Using get_thread() method")
+            thread_obj = await self._sdk_client.get_thread(thread_id=thread_id)
+            if hasattr(thread_obj, 'messages'):
+                messages = thread_obj.messages
+        else:
+            logger.warning("No method to get messages found!")
+        return messages
+    
+    def _latest_assistant_content(self, messages, skip: int = 0) -> Optional[str]:
+        """Content of the newest substantial assistant message after the first `skip`, if any."""
+        if not messages:
+            return None
+        # Handle different message formats (matching ticker_lookup.py)
+        if isinstance(messages, list):
+            msg_list = messages
+        else:
+            try:
+                msg_list = messages.messages
+            except AttributeError:
+                logger.warning(f"Unexpected thread messages format: {type(messages)}")
+                return None
+            if not isinstance(msg_list, list):
+                msg_list = [msg_list]
+        
+        # Newest first, stopping before the first `skip` (older) messages without copying the list;
+        # the USER message is our prompt, never the AI response
+        newest_first = reversed(msg_list)
+        if skip:
+            newest_first = itertools.islice(newest_first, max(len(msg_list) - skip, 0))
+        for msg in map(coerce_msg, newest_first):
+            if msg.role != "assistant" or not msg.content:
+                continue
+            content = msg.content
+            # Substantial = long enough, not an error and not just a confirmation message
+            if len(content) > 50:
+                reject = _REPLY_REJECT_RE.search(content)
+                if reject is None:
+                    return content
+                has_error = reject.group("error") is not None or ERROR_RE.search(content, reject.end()) is not None
+            else:
+                has_error = ERROR_RE.search(content) is not None
+            if has_error:
+                logger.warning("Assistant message reports an error: %.500s", content)
+        return None
+    
+    async def _profile_thread(self, assistant_id: str, user_id: Optional[str]) -> tuple[str, int]:
+        """Thread for a user's extractions (reused while Backboard still has it) and its current message count."""
+        thread_id = self._thread_pool.get(user_id) if user_id else None
+        if thread_id:
+            try:
+                thread = await self._sdk_client.get_thread(thread_id=thread_id)
+                self._thread_pool[user_id] = thread_id
+                self._thread_pool.move_to_end(user_id)
+                return thread_id, len(getattr(thread, 'messages', None) or [])
+            except Exception as e:
+                logger.info(f"Pooled thread {thread_id} for user_id {user_id} is gone ({e}) - creating a new one")
+                self._thread_pool.pop(user_id, None)
+                self._thread_initialized.discard(thread_id)
+        
+        try:
+            thread = await self._sdk_client.create_thread(assistant_id=assistant_id)
+        except Exception as thread_error:
+            logger.error(f"Failed to create thread: {thread_error}")
+            raise
+        # Get thread ID correctly (same as in ticker_lookup.py)
+        thread_id = getattr(thread, 'id', None) or getattr(thread, 'thread_id', None) or str(thread)
+        if user_id:
+            self._thread_pool[user_id] = thread_id
+            if len(self._thread_pool) > PROFILE_THREAD_POOL_SIZE:
+                _, evicted_thread_id = self._thread_pool.popitem(last=False)
+                self._thread_initialized.discard(evicted_thread_id)
+        return thread_id, 0
+    
+    async def _post_message_raw(self, thread_id: str, content: str, model_kwargs: dict) -> dict:
+        """POST a thread message over the shared HTTP client and return the decoded JSON body."""
+        response = await _get_shared_http_client().post(
+            f"{self.base_url.rstrip('/')}/threads/{thread_id}/messages",
+            headers={"X-API-Key": self.api_key},
+            data={"content": content, "stream": "false", **model_kwargs}
+        )
+        response.raise_for_status()
+        return _loads(response.content)
+    
+    async def _request_profile_reply(
+        self, full_prompt: str, short_prompt: str, user_id: Optional[str] = None, followup_prompt: Optional[str] = None
+    ) -> Optional[str]:
+        """Send an extraction prompt to the assistant and recover the reply text (None without an assistant).
+        
+        On a pooled thread that already holds the extraction instructions, only `followup_prompt` is sent.
+        """
+        assistant_id = await self._ensure_assistant()
+        if not assistant_id:
+            logger.warning("No assistant ID, using fallback parser")
+            return None
+        
+        # Use Backboard assistant to extract profile via AI, in the user's pooled thread when known
+        thread_id, prior_messages = await self._profile_thread(assistant_id, user_id)
+        if followup_prompt and thread_id in self._thread_initialized:
+            full_prompt = followup_prompt
+        
+        # Send message - this triggers the assistant and returns AI response
+        response = None
+        response_text = None
+        raw_response_data = None
+        
+        # One explicit cheap model; the assistant's default model is only tried first when opted in
+        # (BACKBOARD_TRY_ASSISTANT_DEFAULT) since it is unsupported on some accounts
+        attempts = [{}] if self.try_assistant_default else []
+        attempts.append({"llm_provider": "openai", "model_name": PROFILE_EXTRACTION_MODEL})
+        
+        logger.debug("Sending profile extraction to thread %s (prompt length: %d)", thread_id, len(full_prompt))
+        
+        # Set once the prompt is known to be in the thread, so a missing reply is worth polling for
+        message_delivered = False
+        last_exception = None
+        
+        if self.raw_messages and HTTPX_AVAILABLE:
+            # Skip the SDK's response model (which rejects Backboard's `message` field) and read the JSON directly
+            try:
+                raw_response_data = await self._post_message_raw(thread_id, full_prompt, attempts[-1])
+                message_delivered = True
+                attempts = []
+            except Exception as raw_error:
+                logger.warning(f"Raw add_message failed, falling back to the SDK: {raw_error}")
+        
+        for model_kwargs in attempts:
+            model_label = model_kwargs.get("model_name", "assistant default")
+            try:
+                response = await self._sdk_client.add_message(
+                    thread_id=thread_id,
+                    content=full_prompt,
+                    **model_kwargs
+                )
+                logger.debug("Model '%s' replied with %s", model_label, type(response).__name__)
+                message_delivered = True
+                break
+            except Exception as model_error:
+                error_str = str(model_error).lower()
+                last_exception = model_error
+                if "validation" in error_str and "field required" in error_str:
+                    # The message was sent and answered - only the SDK's response parsing failed.
+                    # Recover the reply from the error payload or the thread; never resend.
+                    logger.debug("Validation error (message was sent), will extract from the response data or thread")
+                    message_delivered = True
+                    break
+                logger.warning("Model '%s' failed: %.300s", model_label, model_error)
+        
+        if message_delivered and user_id:
+            self._thread_initialized.add(thread_id)
+        
+        # If we got a response object, try to extract content from it
+        if response:
+            try:
+                # If no model fails, try with supported models (like ticker_lookup.py lines 679-720)
+                # Try to extract response from the response object first (like ticker_lookup.py does)
+                response_text = response_content(response)
+                if response_text is not None:
+                    logger.debug("Found response content: length: %d", len(response_text))
+                elif logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Response object doesn't have expected attributes: %s", dir(response)[:20])
+            except Exception as extract_err:
+                logger.warning(f"Error extracting response from response object: {extract_err}")
+        else:
+            logger.debug("No response object to extract from")
+        
+        # If we still don't have response_text and got a validation error, the message was sent
+        # We need to wait and fetch from thread messages
+        if not response_text or len(response_text.strip()) < 10:
+            if last_exception:
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("No response_text yet, recovering from %s: %.500s", type(last_exception).__name__, last_exception)
+                
+                # Also try to extract raw_response_data from exception if we haven't already
+                if not raw_response_data:
+                    try:
+                        if hasattr(last_exception, 'input_value'):
+                            raw_response_data = last_exception.input_value
+                            logger.debug("Extracted raw_response_data from exception.input_value: %s", type(raw_response_data))
+                        elif hasattr(last_exception, 'errors') and callable(last_exception.errors):
+                            errors = last_exception.errors()
+                            if errors and len(errors) > 0:
+                                first_error = errors[0]
+                                if 'input' in first_error:
+                                    raw_response_data = first_error['input']
+                                    logger.debug("Extracted raw_response_data from exception.errors: %s", type(raw_response_data))
+                    except Exception as extract_error:
+                        logger.warning(f"Could not extract from exception attributes: {extract_error}")
+            
+            # Extract response_text from raw_response_data
+            if raw_response_data:
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("Processing raw_response_data (type: %s): %.500s", type(raw_response_data), raw_response_data)
+                if isinstance(raw_response_data, dict):
+                    # The API returns 'message' but SDK expects 'latest_message'
+                    # First check if there's a 'message' field (which is what the error shows)
+                    if 'message' in raw_response_data:
+                        message_obj = raw_response_data['message']
+                        logger.debug("   Found 'message' key: %s", type(message_obj))
+                        if isinstance(message_obj, dict):
+                            # Try to get content from message dict
+                            response_text = (
+                                message_obj.get('content', '') or
+                                message_obj.get('text', '') or
+                                str(message_obj)
+                            )
+                            logger.debug("   Extracted from message dict: length: %d", len(response_text) if response_text else 0)
+                        elif isinstance(message_obj, str):
+                            # Message is already a string
+                            response_text = message_obj
+                            logger.debug("   Message is string: length: %d", len(response_text) if response_text else 0)
+                        else:
+                            # Try to get content attribute from message object
+                            try:
+                                response_text = message_obj.content
+                                logger.debug("   Found message.content: length: %d", len(response_text) if response_text else 0)
+                            except AttributeError:
+                                response_text = str(message_obj)
+                                logger.debug("   Converted message to string: length: %d", len(response_text) if response_text else 0)
+                    else:
+                        # Try other keys
+                        latest_message = raw_response_data.get('latest_message')
+                        response_text = (
+                            latest_message.get('content', '') if isinstance(latest_message, dict) else
+                            raw_response_data.get('content', '') or
+                            raw_response_data.get('text', '') or
+                            ''
+                        )
+                        logger.debug("   Extracted from other keys: length: %d", len(response_text) if response_text else 0)
+                    
+                    if response_text and len(response_text) > 50:
+                        if logger.isEnabledFor(logging.DEBUG):
+                            logger.debug("Got valid response from exception! First 200 chars: %.200s", response_text)
+                    else:
+                        logger.debug("Response from exception too short, will try thread messages")
+                        response_text = None  # Will try thread messages instead
+            
+            # Try to extract from exception args as fallback (if we still don't have response_text)
+            if not response_text and last_exception and hasattr(last_exception, 'args') and len(last_exception.args) > 0:
+                logger.debug("   Trying to extract from exception args...")
+                for arg in last_exception.args:
+                    if isinstance(arg, dict):
+                        response_text = (
+                            arg.get('latest_message', {}).get('content', '') or
+                            arg.get('message', {}).get('content', '') or
+                            arg.get('content', '') or
+                            ''
+                        )
+                        if response_text and len(response_text) > 50:
+                            logger.debug("Got valid response from exception args! Length: %d", len(response_text))
+                            break
+            
+            # Check if error mentions content length or truncation (only if the message was rejected)
+            if not response_text and last_exception and not message_delivered:
+                error_msg = str(last_exception)
+                if _LENGTH_ERROR_RE.search(error_msg):
+                    logger.warning("Content length issue detected! Full error: %.300s", error_msg)
+                    # Try to send just the user text with a shorter system prompt
+                    logger.info(f"Retrying with shorter prompt (length: {len(short_prompt)})")
+                    try:
+                        response = await self._sdk_client.add_message(
+                            thread_id=thread_id,
+                            content=short_prompt,
+                            llm_provider="openai",
+                            model_name=PROFILE_EXTRACTION_MODEL
+                        )
+                        message_delivered = True
+                        logger.info("Successfully sent shortened message")
+                        # Try to extract from retry response too
+                        if response:
+                            response_text = response_content(response)
+                    except Exception as retry_error:
+                        logger.error(f"Retry with shortened prompt also failed: {retry_error}")
+            
+            # If we still don't have response_text, poll the thread until the reply shows up
+            if (not response_text or len(response_text.strip()) < 10) and message_delivered:
+                logger.debug("No response from add_message, polling thread for the AI response...")
+                response_text = await self._poll_for_assistant_reply(thread_id, skip=prior_messages)
+        
+        # Extract response content from response object (if we haven't already)
+        # This matches the logic in ticker_lookup.py
+        if response_text is None or len(response_text.strip()) < 10:
+            if response:
+                logger.debug("Extracting from response object (type: %s)...", type(response))
+                # Try multiple ways to extract content from response (same as ticker_lookup.py)
+                response_text = response_content(response)
+                if response_text is None:
+                    response_text = str(response)
+                    logger.debug("Converted response to string: length: %d", len(response_text))
+                
+                logger.info(f"Extracted response_text from response object (length: {len(response_text) if response_text else 0})")
+            else:
+                response_text = ''
+        
+        if response_text and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Profile extraction reply (length: %s): %.1000s", len(response_text), response_text)
+        
+        return response_text
+    
     async def cheap_update_profile(
         self, current_profile: InvestorProfile, update_text: str
     ) -> InvestorProfile:
@@ -1713,28 +2168,12 @@ CRITICAL:
             if not assistant_id:
                 return self._update_profile_fallback(current_profile, update_text)
             
-            # Load sector aliases for update prompt
-            import json as json_module
-            from pathlib import Path
-            aliases_file = Path(__file__).parent.parent / "data" / "sector_aliases.json"
-            with open(aliases_file, 'r') as f:
-                aliases_data = json_module.load(f)
-            
-            # Build alias mapping for AI
-            alias_mapping_text = ""
-            for sector_name, sector_info in aliases_data['sector_aliases'].items():
-                aliases = ", ".join(sector_info['aliases'][:8])
-                alias_mapping_text += f"- {sector_info['exact_name']}: {aliases}\n"
-            
-            system_prompt = f"""Given existing InvestorProfile JSON and update_text, return updated InvestorProfile JSON only. Preserve fields not mentioned.
-
-SECTOR ALIAS MAPPING (use EXACT sector names):
-{alias_mapping_text}
-
-For sectors_like and sectors_avoid, map any keywords to EXACT sector names (exact_name values only)."""
+            system_prompt = await _update_system_prompt()
             
+            # Compact JSON straight from pydantic's serializer; reused by the shortened retry
+            profile_json = current_profile.model_dump_json()
             prompt = f"""Current profile:
-{json.dumps(current_profile.model_dump(), indent=2)}
+{profile_json}
 
 Update request:
 {update_text}
@@ -1767,12 +2206,15 @@ Return updated InvestorProfile JSON only."""
                 # If add_message fails with validation error, fetch from thread messages
                 error_msg = str(e)
                 logger.warning(f"Backboard add_message failed (content length: {len(full_prompt)}), error: {error_msg}")
+                # A validation error means the message was sent and answered - only the SDK's response parsing failed
+                error_lower = error_msg.lower()
+                message_delivered = "validation" in error_lower and "field required" in error_lower
                 # Check if error mentions content length or truncation
-                if "length" in error_msg.lower() or "too long" in error_msg.lower() or "truncat" in error_msg.lower() or "max" in error_msg.lower():
+                if _LENGTH_ERROR_RE.search(error_msg):
                     logger.error(f"Content length issue detected in update! Full error: {e}")
                     # Try to send with a shorter system prompt
                     short_system = "Update the investor profile based on the update request. Return ONLY updated InvestorProfile JSON."
-                    short_prompt = f"{short_system}\n\nCurrent profile:\n{json.dumps(current_profile.model_dump(), indent=2)}\n\nUpdate request:\n{update_text}\n\nReturn updated InvestorProfile JSON only."
+                    short_prompt = f"{short_system}\n\nCurrent profile:\n{profile_json}\n\nUpdate request:\n{update_text}\n\nReturn updated InvestorProfile JSON only."
                     logger.info(f"Retrying update with shorter prompt (length: {len(short_prompt)})")
                     try:
                         response = await self._sdk_client.add_message(
@@ -1782,90 +2224,23 @@ Return updated InvestorProfile JSON only."""
                             model_name="gpt-4o-mini"
                         )
                         logger.info("Successfully sent shortened update message")
+                        message_delivered = True
                     except Exception as retry_error:
                         logger.error(f"Retry with shortened prompt also failed: {retry_error}")
-                import asyncio
-                await asyncio.sleep(4)
-                
-                try:
-                    messages = None
-                    if hasattr(self._sdk_client, 'get_messages'):
-                        messages = await self._sdk_client.get_messages(thread_id=thread_id)
-                    elif hasattr(self._sdk_client, 'list_messages'):
-                        messages = await self._sdk_client.list_messages(thread_id=thread_id)
-                    elif hasattr(self._sdk_client, 'get_thread'):
-                        thread_obj = await self._sdk_client.get_thread(thread_id=thread_id)
-                        if hasattr(thread_obj, 'messages'):
-                            messages = thread_obj.messages
-                    
-                    if messages:
-                        msg_list = []
-                        if isinstance(messages, list):
-                            msg_list = messages
-                        elif hasattr(messages, 'messages'):
-                            msg_list = messages.messages if isinstance(messages.messages, list) else [messages.messages]
-                        
-                        for msg in reversed(msg_list):
-                            is_assistant = False
-                            if hasattr(msg, 'role'):
-                                role = msg.role
-                                if hasattr(role, 'value'):
-                                    is_assistant = role.value in ['assistant', 'ai', 'bot'] or 'ASSISTANT' in str(role)
-                                else:
-                                    is_assistant = str(role).lower() in ['assistant', 'ai', 'bot'] or 'ASSISTANT' in str(role).upper()
-                            elif isinstance(msg, dict):
-                                is_assistant = msg.get('role', '').lower() in ['assistant', 'ai', 'bot']
-                            
-                            content = None
-                            if hasattr(msg, 'content'):
-                                content = msg.content
-                            elif isinstance(msg, dict):
-                                content = msg.get('content', '')
-                            
-                            if content:
-                                content_lower = content.lower()
-                                # Check if it's a substantial response (not just confirmation messages)
-                                is_substantial = len(content) > 50 and (
-                                    "llm error" not in content_lower and 
-                                    "api error" not in content_lower and 
-                                    "invalid model" not in content_lower and
-                                    "message added" not in content_lower and
-                                    "successfully" not in content_lower
-                                )
-                                if is_substantial:
-                                    if is_assistant or not hasattr(msg, 'role'):
-                                        response_text = content
-                                        logger.info(f"Found AI response in thread messages (length: {len(response_text)}, role: {getattr(msg, 'role', 'unknown')})")
-                                        break
-                                elif content and len(content) > 10:
-                                    # Log shorter messages for debugging
-                                    logger.debug(f"Skipping message (length: {len(content)}, role: {getattr(msg, 'role', 'unknown')}): {content[:100]}")
-                except Exception as fetch_error:
-                    logger.warning(f"Could not fetch thread messages: {fetch_error}")
-                    # Try one more time after a longer wait
-                    try:
-                        await asyncio.sleep(3)
-                        if hasattr(self._sdk_client, 'get_messages'):
-                            messages = await self._sdk_client.get_messages(thread_id=thread_id)
-                            if messages and isinstance(messages, list):
-                                for msg in reversed(messages):
-                                    if hasattr(msg, 'content'):
-                                        content = msg.content
-                                        if content and len(content) > 50 and "llm error" not in content.lower():
-                                            response_text = content
-                                            logger.info(f"Found AI response on retry (length: {len(response_text)})")
-                                            break
-                    except Exception:
-                        pass
+                if not message_delivered:
+                    # Nothing was sent, so no reply will ever arrive in the thread
+                    logger.warning("Update message was not delivered, using fallback")
+                    return self._update_profile_fallback(current_profile, update_text)
+                # Returns as soon as the reply is in the thread instead of sleeping a fixed 4-7s
+                response_text = await self._poll_for_assistant_reply(thread_id)
+                if response_text:
+                    logger.info(f"Found AI response in thread messages (length: {len(response_text)})")
             
             # Extract and parse response
             if response_text is None:
                 if response:
-                    if hasattr(response, 'content'):
-                        response_text = response.content
-                    elif isinstance(response, dict):
-                        response_text = response.get('content', '{}')
-                    else:
+                    response_text = response_content(response)
+                    if response_text is None:
                         response_text = str(response)
                 else:
                     response_text = ''
@@ -1875,38 +2250,39 @@ Return updated InvestorProfile JSON only."""
                 logger.warning(f"Empty or very short response_text (length: {len(response_text) if response_text else 0}), using fallback")
                 return self._update_profile_fallback(current_profile, update_text)
             
-            logger.debug(f"Response text length: {len(response_text)}, first 200 chars: {response_text[:200]}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Response text length: %s, first 200 chars: %.200s", len(response_text), response_text)
             
             try:
-                import re
-                json_match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
-                if json_match:
-                    response_text = json_match.group(1)
-                else:
-                    json_match = re.search(r'\{.*\}', response_text, re.DOTALL)
-                    if json_match:
-                        response_text = json_match.group(0)
+                # Fast path: a well-behaved reply is just the JSON object
+                stripped_response = response_text.strip()
+                profile_dict = None
+                if stripped_response[:1] == '{' and stripped_response[-1:] == '}':
+                    try:
+                        profile_dict = _loads(stripped_response)
+                    except json.JSONDecodeError:
+                        pass
+                if profile_dict is None:
+                    json_match = _JSON_BLOCK_RE.search(response_text) if '```' in response_text else None
+                    if json_match and json_match.group(1).startswith('{'):
+                        profile_dict = _loads(json_match.group(1))
                     else:
-                        logger.warning(f"No JSON found in response_text, trying fallback. Response: {response_text[:500]}")
-                        return self._update_profile_fallback(current_profile, update_text)
-                
-                if not response_text or len(response_text.strip()) < 2:
-                    logger.warning("Extracted JSON is empty, using fallback")
-                    return self._update_profile_fallback(current_profile, update_text)
-                
-                profile_dict = json.loads(response_text)
+                        # First balanced JSON object in the reply; surrounding prose is ignored
+                        start_idx = response_text.find('{')
+                        if start_idx == -1:
+                            logger.warning("No JSON found in response_text, trying fallback. Response: %.500s", response_text)
+                            return self._update_profile_fallback(current_profile, update_text)
+                        profile_dict, _ = _JSON_DECODER.raw_decode(response_text, start_idx)
                 # Normalize sector names
-                from .sector_data import get_sectors_by_keywords
                 if 'preferences' in profile_dict and 'sectors_like' in profile_dict['preferences']:
                     sectors_from_list = get_sectors_by_keywords(' '.join(profile_dict['preferences']['sectors_like']))
                     sectors_from_text = get_sectors_by_keywords(update_text)
-                    all_sectors = sectors_from_list + sectors_from_text
-                    normalized_sectors = list(set([s['name'] for s in all_sectors]))
+                    normalized_sectors = list(dict.fromkeys(s['name'] for s in itertools.chain(sectors_from_list, sectors_from_text)))
                     profile_dict['preferences']['sectors_like'] = normalized_sectors if normalized_sectors else profile_dict['preferences']['sectors_like']
                     
                 if 'preferences' in profile_dict and 'sectors_avoid' in profile_dict['preferences']:
                     sectors = get_sectors_by_keywords(' '.join(profile_dict['preferences']['sectors_avoid']))
-                    normalized_sectors = list(set([s['name'] for s in sectors]))
+                    normalized_sectors = list(dict.fromkeys(s['name'] for s in sectors))
                     profile_dict['preferences']['sectors_avoid'] = normalized_sectors if normalized_sectors else profile_dict['preferences']['sectors_avoid']
                 
                 updated_profile = InvestorProfile(**profile_dict)
@@ -1940,29 +2316,10 @@ Return updated InvestorProfile JSON only."""
             is_new_portfolio = plan_json.get('_is_new_portfolio', False)
             plan_type = "new portfolio construction" if is_new_portfolio else "rebalance"
             
-            # Check if portfolio is risk-averse
-            is_risk_averse = profile.risk_score < 50
-            risk_note = ""
-            if is_risk_averse:
-                risk_note = f"\n\nIMPORTANT: This client is RISK-AVERSE (risk score: {profile.risk_score}/100). Emphasize:\n- Enhanced diversification across sectors (max 20-25% per sector)\n- Higher defensive allocations (bonds, low-volatility stocks)\n- Higher cash reserves for safety\n- Reduced concentration risk\n- Why diversification is critical for risk-averse portfolios"
-            
-            system_prompt = f"""You are a sophisticated investment advisor. Provide a clear, personalized explanation of the {plan_type} plan that ties each recommendation directly to the user's profile and current portfolio state. Be specific about why each action is recommended.{risk_note}
-
-Structure your response as:
-1. **Overview** (2-3 sentences): Summary of what's changing and why, referencing key profile attributes (risk score, horizon, objective). If risk-averse, emphasize risk management and diversification.
-2. **Key Recommendations** (3-5 bullets): For each major action (BUY/SELL), explain:
-   - What ticker/sector is being adjusted
-   - Why this aligns with their profile (e.g., "Adding X sector exposure aligns with your {profile.risk_score}/100 risk tolerance and {profile.horizon_months}-month horizon")
-   - How it moves toward target allocation
-   - For risk-averse clients: Explain how this maintains sector diversification (no single sector >20-25%)
-3. **Portfolio Improvements** (2-3 bullets): Explain improvements in:
-   - Sector diversification (if concentration improved, mention sector weight limits enforced)
-   - Risk management (if moving toward target risk profile, emphasize for risk-averse)
-   - Sector alignment (if better matching preferred sectors, but balanced with diversification needs)
-   - Defensive positioning (for risk-averse clients)
-4. **Considerations** (1-2 bullets): Assumptions, risks, or tradeoffs
-
-Be concise but specific. Reference actual tickers, sectors, and profile numbers. For risk-averse clients, always emphasize how the portfolio maintains proper sector diversification (max 20-25% per sector) even when incorporating preferred sectors. No generic financial advice language."""
+            # Profile fields used by both prompts, read once
+            risk_score = profile.risk_score
+            horizon_months = profile.horizon_months
+            system_prompt = _explain_system_prompt(plan_type, risk_score, horizon_months)
             
             # Extract enhanced context if available
             current_context = metrics_json.get('current_portfolio_context', {})
@@ -1973,39 +2330,27 @@ Be concise but specific. Reference actual tickers, sectors, and profile numbers.
             context_parts = []
             
             if current_context:
-                if is_new_portfolio:
-                    context_parts.append(f"### CONSTRUCTED PORTFOLIO:")
-                    if 'constructed_portfolio' in current_context:
-                        holdings_str = "\n".join([
-                            f"  - {h['ticker']}: {h['weight_pct']}% ({h['sector']})"
-                            for h in current_context['constructed_portfolio'][:15]  # Show all constructed
-                        ])
-                        context_parts.append(f"Portfolio Holdings:\n{holdings_str}")
-                    if 'total_holdings_constructed' in current_context:
-                        context_parts.append(f"Total Holdings: {current_context['total_holdings_constructed']}")
-                else:
-                    context_parts.append(f"### CURRENT PORTFOLIO STATE:")
-                    if 'current_holdings' in current_context:
-                        holdings_str = "\n".join([
-                            f"  - {h['ticker']}: {h['weight_pct']}% ({h['sector']})"
-                            for h in current_context['current_holdings'][:10]  # Top 10
-                        ])
-                        context_parts.append(f"Top Holdings:\n{holdings_str}")
-                    if 'current_cash_pct' in current_context:
-                        context_parts.append(f"Current Cash: {current_context['current_cash_pct']}%")
+                layout = _NEW_PORTFOLIO_LAYOUT if is_new_portfolio else _REBALANCE_LAYOUT
+                context_parts.append(layout.header)
+                holdings = current_context.get(layout.holdings_key)
+                if holdings is not None:
+                    holdings_str = "\n".join([
+                        _HOLDING_LINE.format_map(h)
+                        for h in holdings[:layout.holdings_cap]
+                    ])
+                    context_parts.append(f"{layout.holdings_label}:\n{holdings_str}")
+                if layout.extra_key in current_context:
+                    context_parts.append(layout.extra_line.format(current_context[layout.extra_key]))
                 
                 # Sector allocation (works for both new and rebalance)
-                sector_key = 'sector_allocation' if is_new_portfolio else 'current_sector_allocation'
-                if sector_key in current_context or 'sector_allocation' in current_context:
-                    sector_data = current_context.get(sector_key) or current_context.get('sector_allocation', {})
-                    if sector_data:
-                        sectors_str = ", ".join([
-                            f"{sector}: {pct}%"
-                            for sector, pct in sorted(sector_data.items(), 
-                                                     key=lambda x: x[1], reverse=True)[:5]
-                        ])
-                        label = "Portfolio Sector Allocation" if is_new_portfolio else "Current Sector Allocation"
-                        context_parts.append(f"{label}: {sectors_str}")
+                sector_data = next((current_context[key] for key in layout.sector_keys if current_context.get(key)), None)
+                if sector_data:
+                    # Top 5 sectors by weight without sorting them all
+                    sectors_str = ", ".join([
+                        f"{sector}: {pct}%"
+                        for sector, pct in heapq.nlargest(5, sector_data.items(), key=operator.itemgetter(1))
+                    ])
+                    context_parts.append(f"{layout.sector_label}: {sectors_str}")
                 
                 if 'concentration_analysis' in current_context:
                     conc = current_context['concentration_analysis']
@@ -2016,7 +2361,7 @@ Be concise but specific. Reference actual tickers, sectors, and profile numbers.
                 context_parts.append("")
             
             if target_context:
-                context_parts.append(f"### TARGET ALLOCATION:")
+                context_parts.append("### TARGET ALLOCATION:")
                 target_alloc = target_context.get('target_allocation', {})
                 context_parts.append(
                     f"  Cash: {target_alloc.get('cash_pct', 0)}%, "
@@ -2026,7 +2371,7 @@ Be concise but specific. Reference actual tickers, sectors, and profile numbers.
                 )
                 context_parts.append("")
                 
-                context_parts.append(f"### PROFILE FACTORS DRIVING RECOMMENDATIONS:")
+                context_parts.append("### PROFILE FACTORS DRIVING RECOMMENDATIONS:")
                 if profile_factors:
                     context_parts.append(f"  Risk Score: {profile_factors.get('risk_score', 'N/A')}/100")
                     context_parts.append(f"  Investment Horizon: {profile_factors.get('horizon_months', 'N/A')} months")
@@ -2039,117 +2384,38 @@ Be concise but specific. Reference actual tickers, sectors, and profile numbers.
                     context_parts.append(f"  Max Position Size: {profile_factors.get('max_position_pct', 'N/A')}%")
                 context_parts.append("")
             
-            context_str = "\n".join(context_parts) if context_parts else ""
-            
-            prompt = f"""{context_str}
-### RECOMMENDED ACTIONS ({plan_type}):
-{json.dumps(plan_json.get('actions', []), indent=2)}
-
-### PLAN NOTES:
-{chr(10).join(plan_json.get('notes', []))}
-
-### WARNINGS:
-{chr(10).join(plan_json.get('warnings', []))}
-
-Generate a personalized explanation that:
-1. References specific profile attributes (risk score {profile.risk_score}/100, {profile.horizon_months}-month horizon, {profile.objective.type} objective)
-2. Explains how each major action (BUY/SELL) aligns with their goals
-3. Highlights portfolio improvements (diversification, sector alignment, risk management)
-4. Uses specific numbers from the current portfolio and target allocation
-
-Be specific and actionable. Reference actual tickers and sectors mentioned in the plan."""
-            
-            # Use Backboard assistant with STRONG model for explanation
-            thread = await self._sdk_client.create_thread(assistant_id=assistant_id)
-            
-            # Get thread ID correctly
-            thread_id = getattr(thread, 'id', None) or getattr(thread, 'thread_id', None) or str(thread)
+            context_str = "\n".join(context_parts)
+            
+            prompt = _EXPLAIN_PROMPT_TEMPLATE.format_map({
+                "context_str": context_str,
+                "plan_type": plan_type,
+                "actions": _dumps(plan_json.get('actions', [])),
+                "notes": "\n".join(plan_json.get('notes', [])),
+                "warnings": "\n".join(plan_json.get('warnings', [])),
+                "risk_score": risk_score,
+                "horizon_months": horizon_months,
+                "objective": profile.objective.type,
+            })
             
             full_prompt = f"{system_prompt}\n\n{prompt}"
             
-            response = None
-            explanation = None
-            
+            cached = self._explanations.get(full_prompt)
+            if cached is not None:
+                logger.info("Using cached AI explanation")
+                return cached
+            
+            # Share one in-flight request per prompt; a reply that lands after the deadline is
+            # cached by _store_explanation for the next identical request
+            task = self._explanation_tasks.get(full_prompt)
+            if task is None:
+                task = asyncio.create_task(self._request_explanation(assistant_id, full_prompt))
+                self._explanation_tasks[full_prompt] = task
+                task.add_done_callback(partial(self._store_explanation, full_prompt))
             try:
-                response = await self._sdk_client.add_message(
-                    thread_id=thread_id,
-                    content=full_prompt,
-                    llm_provider="openai",
-                    model_name="gpt-4o"  # Strong model for explanations
-                )
-            except Exception as e:
-                # If add_message fails with validation error, fetch from thread messages
-                logger.warning(f"Backboard add_message failed, trying to get thread messages: {e}")
-                import asyncio
-                await asyncio.sleep(4)
-                
-                try:
-                    messages = None
-                    if hasattr(self._sdk_client, 'get_messages'):
-                        messages = await self._sdk_client.get_messages(thread_id=thread_id)
-                    elif hasattr(self._sdk_client, 'list_messages'):
-                        messages = await self._sdk_client.list_messages(thread_id=thread_id)
-                    elif hasattr(self._sdk_client, 'get_thread'):
-                        thread_obj = await self._sdk_client.get_thread(thread_id=thread_id)
-                        if hasattr(thread_obj, 'messages'):
-                            messages = thread_obj.messages
-                    
-                    if messages:
-                        msg_list = []
-                        if isinstance(messages, list):
-                            msg_list = messages
-                        elif hasattr(messages, 'messages'):
-                            msg_list = messages.messages if isinstance(messages.messages, list) else [messages.messages]
-                        
-                        for msg in reversed(msg_list):
-                            is_assistant = False
-                            if hasattr(msg, 'role'):
-                                role = msg.role
-                                if hasattr(role, 'value'):
-                                    is_assistant = role.value in ['assistant', 'ai', 'bot'] or 'ASSISTANT' in str(role)
-                                else:
-                                    is_assistant = str(role).lower() in ['assistant', 'ai', 'bot'] or 'ASSISTANT' in str(role).upper()
-                            elif isinstance(msg, dict):
-                                is_assistant = msg.get('role', '').lower() in ['assistant', 'ai', 'bot']
-                            
-                            content = None
-                            if hasattr(msg, 'content'):
-                                content = msg.content
-                            elif isinstance(msg, dict):
-                                content = msg.get('content', '')
-                            
-                            if content:
-                                content_lower = content.lower()
-                                # Check if it's a substantial response (not just confirmation messages)
-                                is_substantial = len(content) > 50 and (
-                                    "llm error" not in content_lower and 
-                                    "api error" not in content_lower and 
-                                    "invalid model" not in content_lower and
-                                    "message added" not in content_lower and
-                                    "successfully" not in content_lower
-                                )
-                                if is_substantial:
-                                    if is_assistant or not hasattr(msg, 'role'):
-                                        explanation = content
-                                        logger.info(f"Found AI response in thread messages (length: {len(explanation)}, role: {getattr(msg, 'role', 'unknown')})")
-                                        break
-                                elif content and len(content) > 10:
-                                    # Log shorter messages for debugging
-                                    logger.debug(f"Skipping message (length: {len(content)}, role: {getattr(msg, 'role', 'unknown')}): {content[:100]}")
-                except Exception as fetch_error:
-                    logger.warning(f"Could not fetch thread messages: {fetch_error}")
-            
-            # Extract response content
-            if explanation is None:
-                if response:
-                    if hasattr(response, 'content'):
-                        explanation = response.content
-                    elif isinstance(response, dict):
-                        explanation = response.get('content', '')
-                    else:
-                        explanation = str(response)
-                else:
-                    explanation = ''
+                explanation = await asyncio.wait_for(asyncio.shield(task), EXPLANATION_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                logger.warning(f"AI explanation not ready after {EXPLANATION_TIMEOUT_SECONDS}s, using template")
+                return self._generate_template_explanation(profile, metrics_json, plan_json)
             
             if explanation and len(explanation) > 50:  # Valid response
                 logger.info("Successfully generated explanation using Backboard AI")
@@ -2161,63 +2427,159 @@ Be specific and actionable. Reference actual tickers and sectors mentioned in th
             logger.error(f"Error generating AI explanation: {e}", exc_info=True)
             return self._generate_template_explanation(profile, metrics_json, plan_json)
     
-    def _extract_horizon_from_text(self, text: str) -> int:
-        """Extract investment horizon in months from text."""
-        import re
+    async def _request_explanation(self, assistant_id: str, full_prompt: str) -> str:
+        """Ask the STRONG model for an explanation in a new thread; '' when no reply text was found."""
+        thread = await self._sdk_client.create_thread(assistant_id=assistant_id)
+        
+        # Get thread ID correctly
+        thread_id = getattr(thread, 'id', None) or getattr(thread, 'thread_id', None) or str(thread)
+        
+        response = None
+        explanation = None
+        
+        try:
+            response = await self._sdk_client.add_message(
+                thread_id=thread_id,
+                content=full_prompt,
+                llm_provider="openai",
+                model_name="gpt-4o"  # Strong model for explanations
+            )
+        except Exception as e:
+            # If add_message fails with validation error, fetch from thread messages
+            logger.warning(f"Backboard add_message failed, trying to get thread messages: {e}")
+            explanation = await self._poll_for_assistant_reply(thread_id)
+            if explanation:
+                logger.info(f"Found AI response in thread messages (length: {len(explanation)})")
+        
+        # Extract response content
+        if explanation is None:
+            if response:
+                explanation = response_content(response)
+                if explanation is None:
+                    explanation = str(response)
+            else:
+                explanation = ''
+        return explanation
+    
+    def _store_explanation(self, full_prompt: str, task: asyncio.Task) -> None:
+        """Done-callback of an explanation request: cache a usable reply for the same prompt."""
+        self._explanation_tasks.pop(full_prompt, None)
+        if task.cancelled():
+            return
+        if task.exception() is not None:
+            logger.debug("Explanation request failed: %s", task.exception())
+            return
+        explanation = task.result()
+        if explanation and len(explanation) > 50:
+            self._explanations[full_prompt] = explanation
+            self._explanations.move_to_end(full_prompt)
+            if len(self._explanations) > EXPLANATION_CACHE_SIZE:
+                self._explanations.popitem(last=False)
+    
+    async def _rule_extract(self, text: str) -> Optional[InvestorProfile]:
+        """Extract a profile with local rules; None when the model is needed.
+        
+        Rules must map a sector and find the objective, horizon and risk themselves - a profile built
+        from defaults would skip the model for text it could have read.
+        """
         text_lower = text.lower()
         
-        logger.error(f"_extract_horizon_from_text called with: '{text[:100]}'")
+        alias_re, alias_to_sector = await _alias_scanner()
+        liked, avoided = [], []
+        for match in alias_re.finditer(text_lower):
+            window = text_lower[max(0, match.start() - _AVOID_WINDOW):match.start()]
+            bucket = avoided if _AVOID_CONTEXT_RE.search(window) else liked
+            bucket.append(alias_to_sector[match.group()])
+        sectors_avoid = list(dict.fromkeys(avoided))
+        sectors_like = [name for name in dict.fromkeys(liked) if name not in sectors_avoid]
+        if not sectors_like:
+            return None
         
-        # PRIORITY 1: Check for explicit years (most specific)
-        # Look for patterns like "3 years", "10 years", "retirement in 10 years"
-        years_patterns = [
-            r'retirement\s+in\s+(\d+)\s*years?',  # "retirement in 10 years"
-            r'investing\s+for\s+(\d+)\s*years?',   # "investing for 20 years"
-            r'investment\s+(?:horizon|timeline)\s+is\s+(\d+)\s*years?',  # "investment horizon/timeline is 5 years"
-            r'(\d+)\s*year\s+horizon',  # "7 year horizon"
-            r'(\d+)\s*years?',  # "3 years", "5 years", etc. (catch-all, must be last)
-        ]
-        for pattern in years_patterns:
-            years_match = re.search(pattern, text_lower)
-            if years_match:
-                years = int(years_match.group(1))
-                result = years * 12
-                logger.error(f"_extract_horizon_from_text: Pattern '{pattern}' matched '{years_match.group(1)}' -> {result} months")
-                return result
-        
-        # PRIORITY 2: Check for explicit months
-        months_patterns = [
-            r'need\s+(?:cash|money)\s+in\s+(\d+)\s*months?',  # "need cash in 24 months"
-            r'(\d+)\s*months?',  # "18 months", "24 months", etc.
-        ]
-        for pattern in months_patterns:
-            months_match = re.search(pattern, text_lower)
-            if months_match:
-                return int(months_match.group(1))
+        objective_type = self._objective_type(text_lower, default=None)
+        horizon_months = self._horizon_info(text_lower, default=None).months
+        risk_score = self._risk_score(text_lower, default=None)
+        if objective_type is None or horizon_months is None or risk_score is None:
+            return None
+        
+        # Collected as kwargs so Constraints validates the ranges once, when it is built
+        constraint_values = {}
+        max_holdings_match = _MAX_HOLDINGS_RE.search(text_lower)
+        if max_holdings_match:
+            constraint_values["max_holdings"] = int(max_holdings_match.group(1))
+        max_position_pct = _max_position_pct(text_lower)
+        if max_position_pct is not None:
+            constraint_values["max_position_pct"] = max_position_pct
+        
+        words = set(_WORD_RE.findall(text_lower))
+        frequency = next((freq for freq, keywords in _REBALANCE_KEYWORDS if words & keywords), "quarterly")
+        
+        try:
+            return InvestorProfile(
+                user_id="temp",  # Will be set by caller
+                objective=Objective(type=objective_type, notes=text[:100]),
+                horizon_months=horizon_months,
+                risk_score=risk_score,
+                constraints=Constraints(**constraint_values),
+                preferences=Preferences(sectors_like=sectors_like, sectors_avoid=sectors_avoid),
+                rebalance_frequency=frequency
+            )
+        except ValueError as e:
+            # Out-of-range values (e.g. "max 500 holdings") - let the model path handle it
+            logger.info(f"Rule-based extraction rejected: {e}")
+            return None
+    
+    def _extract_horizon_from_text(self, text: str) -> int:
+        """Extract investment horizon in months from text."""
+        return self._horizon_info(text.lower()).months
+    
+    def _horizon_info(self, text_lower: str, default: Optional[int] = 60) -> _HorizonInfo:
+        """Horizon in months from lowercased text, and whether it was stated as a number of years/months.
+        
+        `default` (months) is used when no rule matches; pass None to tell "not mentioned" apart.
+        """
+        # PRIORITY 1-2: Explicit years (most specific phrasing first), then explicit months,
+        # e.g. "retirement in 10 years", "3 years", "need cash in 24 months" - one pass for all
+        best = None
+        for match in _HORIZON_NUMBER_RE.finditer(text_lower):
+            if best is None or match.lastindex < best.lastindex:
+                best = match
+                if best.lastindex == 1:
+                    break
+        if best is not None:
+            value = int(best.group(best.lastindex))
+            if best.lastindex <= _HORIZON_YEAR_GROUPS:
+                value *= 12
+            logger.debug("_horizon_info: alternative %s matched %r -> %s months", best.lastindex, best.group(), value)
+            return _HorizonInfo(value, True)
         
         # PRIORITY 3: Check for horizon keywords
         if "long horizon" in text_lower or "long term" in text_lower or "long-term" in text_lower:
-            return 60
+            return _HorizonInfo(60, False)
         if "short horizon" in text_lower or "short term" in text_lower or "short-term" in text_lower:
-            return 12
+            return _HorizonInfo(12, False)
         if "early investor" in text_lower or "early stage" in text_lower:
-            return 72
+            return _HorizonInfo(72, False)
         if "retirement" in text_lower or "retire" in text_lower:
             # Check if there's a year mentioned with retirement
-            retirement_years = re.search(r'retirement.*?(\d+)\s*years?', text_lower)
+            retirement_years = _RETIREMENT_YEARS_RE.search(text_lower)
             if retirement_years:
-                return int(retirement_years.group(1)) * 12
-            return 180
+                return _HorizonInfo(int(retirement_years.group(1)) * 12, False)
+            return _HorizonInfo(180, False)
         
         # Default
-        return 60
+        return _HorizonInfo(default, False)
     
     def _extract_risk_from_text(self, text: str) -> int:
         """Extract risk score (0-100) from text."""
-        text_lower = text.lower()
+        return self._risk_score(text.lower())
+    
+    def _risk_score(self, text_lower: str, default: Optional[int] = 50) -> Optional[int]:
+        """Risk score (0-100) from lowercased text; `default` when no rule matches."""
+        # Substring checks in priority order; phrases that contain an earlier-checked phrase of the
+        # same rule ("i'm risk averse", "moderate risk", ...) are implied and not re-scanned
         
         # Check for explicit risk averse phrases first (most specific)
-        if "risk averse" in text_lower or "i'm risk averse" in text_lower:
+        if "risk averse" in text_lower:
             return 25
         if "very conservative" in text_lower or "very low risk" in text_lower:
             return 20
@@ -2225,37 +2587,36 @@ Be specific and actionable. Reference actual tickers and sectors mentioned in th
             return 25
         
         # Moderate/balanced
-        if "moderate risk" in text_lower or "moderate" in text_lower:
-            return 50
-        if "balanced" in text_lower or "balanced approach" in text_lower:
+        if "moderate" in text_lower or "balanced" in text_lower:
             return 50
         
         # Aggressive
         if "very aggressive" in text_lower or "very high risk" in text_lower:
             return 85
-        if "aggressive" in text_lower or "i'm aggressive" in text_lower or "high risk" in text_lower or "risk tolerant" in text_lower:
+        if "aggressive" in text_lower or "high risk" in text_lower or "risk tolerant" in text_lower:
             return 75
         
         # Default
-        return 50
+        return default
     
     def _extract_objective_from_text(self, text: str) -> str:
         """Extract investment objective type from text."""
-        text_lower = text.lower()
-        
+        return self._objective_type(text.lower())
+    
+    def _objective_type(self, text_lower: str, default: Optional[str] = "balanced") -> Optional[str]:
+        """Investment objective type from lowercased text; `default` when no rule matches."""
         if "growth" in text_lower or "capital appreciation" in text_lower:
             return "growth"
         if "income" in text_lower or "dividend" in text_lower or "yield" in text_lower:
             return "income"
         
         # Default
-        return "balanced"
+        return default
     
     def _parse_profile_fallback(self, text: str) -> InvestorProfile:
         """Fallback parser for demo when API key not set."""
-        logger.error("=" * 100)
-        logger.error(f"🔄 FALLBACK PARSER CALLED - text: '{text[:200]}'")
-        logger.error("=" * 100)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Fallback parser called - text: %.200r", text)
         
         text_lower = text.lower()
         
@@ -2268,55 +2629,57 @@ Be specific and actionable. Reference actual tickers and sectors mentioned in th
             obj_type = "balanced"
         
         # Extract risk - FIXED to handle "risk averse" and other phrases
-        if "risk averse" in text_lower or "i'm risk averse" in text_lower:
+        if "risk averse" in text_lower:
             risk_score = 25
-            logger.error(f"✅ FALLBACK: Extracted risk averse -> {risk_score}")
+            logger.debug("Fallback risk: risk averse -> %s", risk_score)
         elif "very conservative" in text_lower or "very low risk" in text_lower:
             risk_score = 20
-            logger.error(f"✅ FALLBACK: Extracted very conservative -> {risk_score}")
-        elif "conservative" in text_lower or "low risk" in text_lower or "low" in text_lower:
+            logger.debug("Fallback risk: very conservative -> %s", risk_score)
+        elif "conservative" in text_lower or "low" in text_lower:
             risk_score = 30
-            logger.error(f"✅ FALLBACK: Extracted conservative -> {risk_score}")
-        elif "aggressive" in text_lower or "i'm aggressive" in text_lower or "high risk" in text_lower or "high" in text_lower:
+            logger.debug("Fallback risk: conservative -> %s", risk_score)
+        elif "aggressive" in text_lower or "high" in text_lower:
             risk_score = 70
-            logger.error(f"✅ FALLBACK: Extracted aggressive -> {risk_score}")
-        elif "moderate risk" in text_lower or "moderate" in text_lower:
+            logger.debug("Fallback risk: aggressive -> %s", risk_score)
+        elif "moderate" in text_lower:
             risk_score = 50
-            logger.error(f"✅ FALLBACK: Extracted moderate -> {risk_score}")
+            logger.debug("Fallback risk: moderate -> %s", risk_score)
         elif "balanced" in text_lower:
             risk_score = 50
-            logger.error(f"✅ FALLBACK: Extracted balanced -> {risk_score}")
+            logger.debug("Fallback risk: balanced -> %s", risk_score)
         else:
             risk_score = 50
-            logger.error(f"⏭️  FALLBACK: Using default risk -> {risk_score}")
+            logger.debug("Fallback risk: default risk -> %s", risk_score)
         
         # Extract horizon - FIXED to handle years too - USE THE METHOD!
         # Use the extraction method instead of inline code
-        horizon = self._extract_horizon_from_text(text)
-        logger.error(f"✅ FALLBACK: Extracted horizon -> {horizon} months")
-        
-        # Extract max holdings
-        max_holdings = 20
-        max_match = re.search(r'max\s*(\d+)\s*holdings?', text_lower)
-        if max_match:
-            max_holdings = int(max_match.group(1))
+        horizon = self._horizon_info(text_lower).months
         
-        # Extract max position
-        max_position = 25.0
-        pos_match = re.search(r'max\s*(\d+)\s*%', text_lower)
-        if pos_match:
-            max_position = float(pos_match.group(1))
+        # Extract max holdings / max position - first "max N holdings" and first "max N%" in one scan
+        max_holdings = None
+        max_position = None
+        for match in _FALLBACK_MAX_RE.finditer(text_lower):
+            if match.group('holdings'):
+                if max_holdings is None:
+                    max_holdings = int(match.group(1))
+            elif max_position is None:
+                max_position = float(match.group(1))
+            if max_holdings is not None and max_position is not None:
+                break
+        if max_holdings is None:
+            max_holdings = 20
+        if max_position is None:
+            max_position = 25.0
         
         # Extract exclusions
         exclusions = []
         if "avoid" in text_lower or "exclude" in text_lower:
-            avoid_match = re.search(r'(?:avoid|exclude)\s+([^.]+)', text_lower)
+            avoid_match = _FALLBACK_EXCLUSIONS_RE.search(text_lower)
             if avoid_match:
                 exclusions = [w.strip() for w in avoid_match.group(1).split(",")]
         
         # Extract sector preferences using sector data
-        from .sector_data import get_sectors_by_keywords
-        sectors = get_sectors_by_keywords(text)
+        sectors = get_sectors_by_keywords(text_lower)
         sectors_like = [s['name'] for s in sectors]
         sectors_avoid = []
         
@@ -2332,8 +2695,7 @@ Be specific and actionable. Reference actual tickers and sectors mentioned in th
         elif "annual" in text_lower or "yearly" in text_lower:
             freq = "annual"
         
-        from .models import Objective, Constraints, Preferences
-        
+        logger.info("Fallback parser: objective=%s risk=%s horizon=%s sectors=%s", obj_type, risk_score, horizon, sectors_like)
         return InvestorProfile(
             user_id="temp",  # Will be set by caller
             objective=Objective(type=obj_type, notes=text[:100]),
@@ -2363,9 +2725,9 @@ Be specific and actionable. Reference actual tickers and sectors mentioned in th
         
         # Update horizon (cash need)
         if "cash" in text_lower and "month" in text_lower:
-            months = re.findall(r'(\d+)\s*month', text_lower)
-            if months:
-                updated.horizon_months = min(profile.horizon_months, int(months[0]))
+            months_match = _CASH_MONTHS_RE.search(text_lower)
+            if months_match:
+                updated.horizon_months = min(profile.horizon_months, int(months_match.group(1)))
         
         
         updated.last_updated = datetime.utcnow().isoformat()
@@ -2380,31 +2742,20 @@ Be specific and actionable. Reference actual tickers and sectors mentioned in th
         plan_type = "New Portfolio Construction" if is_new_portfolio else "Rebalance Recommendation"
         actions_count = len(plan.get("actions", []))
         
-        explanation = f"""{plan_type} for {profile.objective.type} objective:
-
-• Target allocation reflects your {profile.horizon_months}-month horizon and {profile.risk_score}/100 risk score
-"""
-        
-        if is_new_portfolio:
-            explanation += f"• Constructed portfolio with {actions_count} holdings based on your preferences\n"
-        else:
-            explanation += f"• {actions_count} adjustments recommended to align with constraints\n"
-        
-        if profile.preferences.sectors_like:
-            explanation += f"• Thematic focus maintained on: {', '.join(profile.preferences.sectors_like)}\n"
-        
-        if plan.get("warnings"):
-            explanation += f"• Warnings: {'; '.join(plan['warnings'][:2])}\n"
-        
-        if is_new_portfolio:
-            explanation += f"""
-Assumptions: Portfolio constructed based on your investment profile. Rebalancing recommended every {profile.rebalance_frequency} per your preference.
-Risks / tradeoffs: Diversification does not guarantee returns. Market movements may require ongoing adjustments. No guarantees on returns.
-"""
-        else:
-            explanation += f"""
-Assumptions: Rebalancing to target every {profile.rebalance_frequency} per your preference.
-Risks / tradeoffs: Market movements may require ongoing adjustments. No guarantees on returns.
-"""
+        parts = [
+            f"{plan_type} for {profile.objective.type} objective:\n",
+            f"• Target allocation reflects your {profile.horizon_months}-month horizon and {profile.risk_score}/100 risk score",
+            f"• Constructed portfolio with {actions_count} holdings based on your preferences"
+            if is_new_portfolio
+            else f"• {actions_count} adjustments recommended to align with constraints",
+        ]
+        sectors_like = profile.preferences.sectors_like
+        if sectors_like:
+            parts.append(f"• Thematic focus maintained on: {', '.join(sectors_like)}")
+        warnings = plan.get("warnings")
+        if warnings:
+            parts.append(f"• Warnings: {'; '.join(warnings[:2])}")
         
-        return explanation
+        assumptions = _TEMPLATE_ASSUMPTIONS_NEW if is_new_portfolio else _TEMPLATE_ASSUMPTIONS_REBALANCE
+        parts.append(assumptions.format(freq=profile.rebalance_frequency))
+        return "\n".join(parts)
@@ -1,8 +1,12 @@
 """FastAPI main application."""
 
 import os
+import json
 import logging
+import time
+import traceback
 from datetime import datetime
+from operator import attrgetter
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
@@ -20,12 +24,15 @@ from .models import (
     PortfolioSnapshotRequest,
     PortfolioSnapshot,
     PortfolioHistoryResponse,
+    DecisionLogResponse,
     CompareRequest,
     PortfolioComparison,
+    Holding,
 )
-from .backboard_client import BackboardClient
-from .portfolio import compute_metrics, compute_target_allocation, compute_rebalance_plan
-from .sector_data import get_ticker_sector
+from .backboard_client import BackboardClient, close_shared_http_client
+from .portfolio import compute_metrics, compute_target_allocation, compute_rebalance_plan, construct_portfolio_from_scratch
+from .sector_data import get_ticker_sector, load_sectors_data
+from .ticker_lookup import ticker_exists, lookup_or_add_ticker, lookup_or_add_tickers
 from .logging_config import setup_logging
 
 # Setup logging
@@ -52,21 +59,38 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Request logging middleware
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
+# Request logging middleware (plain ASGI: no Request/Response wrappers or extra task per call)
+class RequestLoggingMiddleware:
     """Log all incoming requests."""
-    start_time = datetime.utcnow()
-    logger.info(f"{request.method} {request.url.path} - Client: {request.client.host if request.client else 'unknown'}")
     
-    try:
-        response = await call_next(request)
-        process_time = (datetime.utcnow() - start_time).total_seconds()
-        logger.info(f"{request.method} {request.url.path} - Status: {response.status_code} - Time: {process_time:.3f}s")
-        return response
-    except Exception as e:
-        logger.error(f"Error processing {request.method} {request.url.path}: {e}", exc_info=True)
-        raise
+    def __init__(self, app):
+        self.app = app
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        
+        start_ns = time.perf_counter_ns()
+        method = scope["method"]
+        path = scope["path"]
+        client = scope.get("client")
+        logger.info("%s %s - Client: %s", method, path, client[0] if client else 'unknown')
+        
+        async def send_with_logging(message):
+            if message["type"] == "http.response.start":
+                process_time = (time.perf_counter_ns() - start_ns) / 1e9
+                logger.info("%s %s - Status: %s - Time: %.3fs", method, path, message["status"], process_time)
+            await send(message)
+        
+        try:
+            await self.app(scope, receive, send_with_logging)
+        except Exception as e:
+            logger.error(f"Error processing {method} {path}: {e}", exc_info=True)
+            raise
+
+
+app.add_middleware(RequestLoggingMiddleware)
 
 # Exception handler for Pydantic validation errors
 from fastapi.exceptions import RequestValidationError
@@ -105,6 +129,15 @@ async def global_exception_handler(request: Request, exc: Exception):
 
 # Initialize Backboard client
 backboard = BackboardClient()
+
+
+@app.on_event("shutdown")
+async def shutdown_backboard():
+    """Close Backboard connections on shutdown."""
+    await backboard.close()
+    await close_shared_http_client()
+
+
 logger.info("Application initialized")
 
 
@@ -167,7 +200,7 @@ async def init_profile(request: ProfileInitRequest):
             logger.info(f"Last 500 chars: ...{request.onboarding_text[-500:]}")
         
         # Extract profile using CHEAP model
-        profile = await backboard.cheap_extract_profile(request.onboarding_text)
+        profile = await backboard.cheap_extract_profile(request.onboarding_text, user_id=request.user_id)
         profile.user_id = request.user_id
         profile.last_updated = datetime.utcnow().isoformat()
         
@@ -281,8 +314,6 @@ async def analyze_portfolio(request: AnalyzeRequest):
     """
     try:
         # Check for unknown tickers and look them up
-        from .ticker_lookup import ticker_exists, lookup_or_add_ticker
-        
         unknown_tickers = []
         lookup_results = []
         
@@ -290,10 +321,8 @@ async def analyze_portfolio(request: AnalyzeRequest):
             if not ticker_exists(holding.ticker):
                 unknown_tickers.append(holding.ticker)
         
-        # Look up unknown tickers (parallelize for performance)
-        import asyncio
-        lookup_tasks = [lookup_or_add_ticker(ticker) for ticker in unknown_tickers]
-        lookup_results_raw = await asyncio.gather(*lookup_tasks, return_exceptions=True)
+        # Look up unknown tickers (one batched classification request)
+        lookup_results_raw = await lookup_or_add_tickers(unknown_tickers)
         
         # Process lookup results
         for i, result in enumerate(lookup_results_raw):
@@ -391,22 +420,17 @@ async def recommend_rebalance(request: RecommendRequest):
         
         if is_new_portfolio:
             # Construct portfolio from scratch
-            from .portfolio import construct_portfolio_from_scratch
             portfolio, plan = construct_portfolio_from_scratch(profile, target)
             logger.info(f"Constructed new portfolio with {len(portfolio.holdings)} holdings for user {request.user_id}")
         else:
             # Check for unknown tickers and look them up before rebalancing
-            from .ticker_lookup import ticker_exists, lookup_or_add_ticker
-            
             unknown_tickers = []
             for holding in request.holdings:
                 if not ticker_exists(holding.ticker):
                     unknown_tickers.append(holding.ticker)
             
-            # Look up unknown tickers (parallelize for performance)
-            import asyncio
-            lookup_tasks = [lookup_or_add_ticker(ticker) for ticker in unknown_tickers]
-            lookup_results_raw = await asyncio.gather(*lookup_tasks, return_exceptions=True)
+            # Look up unknown tickers (one batched classification request)
+            lookup_results_raw = await lookup_or_add_tickers(unknown_tickers)
             
             # Process lookup results
             lookup_results = []
@@ -457,7 +481,7 @@ async def recommend_rebalance(request: RecommendRequest):
                         'weight_pct': round(h.weight * 100, 2),
                         'sector': get_ticker_sector(h.ticker) or 'Unknown'
                     }
-                    for h in sorted(portfolio.holdings, key=lambda x: x.weight, reverse=True)
+                    for h in sorted(portfolio.holdings, key=attrgetter('weight'), reverse=True)
                 ]
                 current_portfolio_context['total_holdings_constructed'] = len(portfolio.holdings)
             else:
@@ -468,7 +492,7 @@ async def recommend_rebalance(request: RecommendRequest):
                         'weight_pct': round(h.weight * 100, 2),
                         'sector': get_ticker_sector(h.ticker) or 'Unknown'
                     }
-                    for h in sorted(portfolio.holdings, key=lambda x: x.weight, reverse=True)
+                    for h in sorted(portfolio.holdings, key=attrgetter('weight'), reverse=True)
                 ]
                 current_portfolio_context['current_cash_pct'] = round(portfolio.cash_weight * 100, 2)
             
@@ -598,6 +622,13 @@ async def get_profile(user_id: str):
     return profile
 
 
+@app.get("/profile/{user_id}/decisions", response_model=DecisionLogResponse)
+async def get_decision_log(user_id: str):
+    """Get the profile decision log from Backboard.io memory."""
+    entries = await backboard.get_decision_log(user_id)
+    return DecisionLogResponse(user_id=user_id, entries=entries)
+
+
 @app.post("/ticker/lookup")
 async def lookup_ticker(request: dict):
     """
@@ -619,8 +650,6 @@ async def lookup_ticker(request: dict):
                 content=error_response.model_dump()
             )
         
-        from .ticker_lookup import lookup_or_add_ticker
-        
         success, message = await lookup_or_add_ticker(ticker)
         
         if success:
@@ -672,8 +701,6 @@ async def get_ticker_sectors(request: Request):
                 content=error_response.model_dump()
             )
         
-        from .sector_data import get_ticker_sector
-        
         result = {}
         for ticker in tickers:
             sector = get_ticker_sector(ticker)
@@ -700,16 +727,11 @@ async def lookup_ticker_debug(request: dict):
     """
     Debug endpoint for ticker lookup - returns raw AI response.
     """
-    import traceback
-    
     try:
         ticker = request.get("ticker") if isinstance(request, dict) else None
         if not ticker:
             raise HTTPException(status_code=400, detail="ticker parameter required")
         
-        from .ticker_lookup import search_and_classify_ticker
-        from .backboard_client import BackboardClient
-        
         backboard_client = BackboardClient()
         ticker_upper = ticker.upper()
         
@@ -718,7 +740,6 @@ async def lookup_ticker_debug(request: dict):
         if not assistant_id:
             return {"error": "Could not get assistant ID"}
         
-        from backend.sector_data import load_sectors_data
         sectors_data = load_sectors_data()
         valid_sectors = [s['name'] for s in sectors_data['sectors']]
         sectors_list = ", ".join(valid_sectors)
@@ -906,11 +927,9 @@ async def get_portfolio_history(user_id: str):
             try:
                 content = memory.get('content', {}) if isinstance(memory, dict) else memory
                 if isinstance(content, str):
-                    import json
                     content = json.loads(content)
                 
                 # Reconstruct holdings
-                from .models import Holding
                 holdings = [Holding(**h) for h in content.get('holdings', [])]
                 
                 # Reconstruct metrics
@@ -5,6 +5,10 @@ from datetime import datetime
 from typing import Literal, Optional
 from pydantic import BaseModel, Field, field_validator, ConfigDict
 
+# Field formats checked by the validators below
+_TICKER_RE = re.compile(r'^[A-Z0-9]{1,5}$')
+_USER_ID_RE = re.compile(r'^[a-zA-Z0-9_-]+$')
+
 
 class Objective(BaseModel):
     """Investment objective."""
@@ -54,7 +58,7 @@ class Holding(BaseModel):
         # Normalize to uppercase
         v = v.upper().strip()
         # Check format: alphanumeric only, 1-5 characters
-        if not re.match(r'^[A-Z0-9]{1,5}$', v):
+        if not _TICKER_RE.match(v):
             raise ValueError(f"Ticker must be 1-5 alphanumeric characters, got: {v}")
         return v
 
@@ -128,7 +132,7 @@ class ProfileInitRequest(BaseModel):
     @classmethod
     def validate_user_id_format(cls, v: str) -> str:
         """Validate user_id format: alphanumeric, underscore, dash only."""
-        if not re.match(r'^[a-zA-Z0-9_-]+$', v):
+        if not _USER_ID_RE.match(v):
             raise ValueError("user_id must contain only alphanumeric characters, underscores, or dashes")
         return v
 
@@ -142,7 +146,7 @@ class ProfileUpdateRequest(BaseModel):
     @classmethod
     def validate_user_id_format(cls, v: str) -> str:
         """Validate user_id format: alphanumeric, underscore, dash only."""
-        if not re.match(r'^[a-zA-Z0-9_-]+$', v):
+        if not _USER_ID_RE.match(v):
             raise ValueError("user_id must contain only alphanumeric characters, underscores, or dashes")
         return v
 
@@ -157,7 +161,7 @@ class AnalyzeRequest(BaseModel):
     @classmethod
     def validate_user_id_format(cls, v: str) -> str:
         """Validate user_id format: alphanumeric, underscore, dash only."""
-        if not re.match(r'^[a-zA-Z0-9_-]+$', v):
+        if not _USER_ID_RE.match(v):
             raise ValueError("user_id must contain only alphanumeric characters, underscores, or dashes")
         return v
     
@@ -186,7 +190,7 @@ class RecommendRequest(BaseModel):
     @classmethod
     def validate_user_id_format(cls, v: str) -> str:
         """Validate user_id format: alphanumeric, underscore, dash only."""
-        if not re.match(r'^[a-zA-Z0-9_-]+$', v):
+        if not _USER_ID_RE.match(v):
             raise ValueError("user_id must contain only alphanumeric characters, underscores, or dashes")
         return v
     
@@ -225,7 +229,7 @@ class PortfolioSnapshotRequest(BaseModel):
     @classmethod
     def validate_user_id_format(cls, v: str) -> str:
         """Validate user_id format: alphanumeric, underscore, dash only."""
-        if not re.match(r'^[a-zA-Z0-9_-]+$', v):
+        if not _USER_ID_RE.match(v):
             raise ValueError("user_id must contain only alphanumeric characters, underscores, or dashes")
         return v
 
@@ -246,6 +250,12 @@ class PortfolioHistoryResponse(BaseModel):
     snapshots: list[PortfolioSnapshot] = Field(default_factory=list, description="List of portfolio snapshots, sorted by timestamp (newest first)")
 
 
+class DecisionLogResponse(BaseModel):
+    """Response containing a user's decision log."""
+    user_id: str = Field(..., description="User identifier")
+    entries: list[str] = Field(default_factory=list, description="Decision log entries, oldest first")
+
+
 class CompareRequest(BaseModel):
     """Request to compare two portfolios."""
     user_id: str = Field(..., min_length=1, max_length=100, description="User identifier")
@@ -256,7 +266,7 @@ class CompareRequest(BaseModel):
     @classmethod
     def validate_user_id_format(cls, v: str) -> str:
         """Validate user_id format: alphanumeric, underscore, dash only."""
-        if not re.match(r'^[a-zA-Z0-9_-]+$', v):
+        if not _USER_ID_RE.match(v):
             raise ValueError("user_id must contain only alphanumeric characters, underscores, or dashes")
         return v
 
@@ -1,5 +1,7 @@
 """Local portfolio analytics and rebalance logic (no LLM)."""
 
+import heapq
+from operator import attrgetter
 from typing import Optional, List
 from .models import (
     InvestorProfile,
@@ -55,13 +57,13 @@ def compute_metrics(
         # Note: This is just a warning in metrics, actual enforcement happens in allocation computation
         pass  # Warning can be added to constraint violations if needed
     
-    # Sort by weight descending
-    sorted_holdings = sorted(holdings, key=lambda h: h.weight, reverse=True)
+    # Five heaviest holdings, by weight descending (enough for every top-N metric below)
+    top_holdings = heapq.nlargest(5, holdings, key=attrgetter('weight'))
     
     # Concentration metrics
-    top_1_weight = sorted_holdings[0].weight if sorted_holdings else 0.0
-    top_3_weight = sum(h.weight for h in sorted_holdings[:3])
-    top_5_weight = sum(h.weight for h in sorted_holdings[:5])
+    top_1_weight = top_holdings[0].weight if top_holdings else 0.0
+    top_3_weight = sum(h.weight for h in top_holdings[:3])
+    top_5_weight = sum(h.weight for h in top_holdings[:5])
     
     # Herfindahl-Hirschman Index
     hhi = sum(h.weight ** 2 for h in holdings)
@@ -304,8 +306,7 @@ def compute_rebalance_plan(
     
     # Calculate concentration metrics
     if current_portfolio.holdings:
-        sorted_holdings = sorted(current_portfolio.holdings, key=lambda h: h.weight, reverse=True)
-        top_2_weight = sum(h.weight for h in sorted_holdings[:2])
+        top_2_weight = sum(h.weight for h in heapq.nlargest(2, current_portfolio.holdings, key=attrgetter('weight')))
         is_highly_concentrated = top_2_weight > 0.6  # More than 60% in top 2 holdings
     else:
         is_highly_concentrated = False
@@ -1,8 +1,9 @@
 """Sector and stock data loader."""
 
 import json
+import re
 from pathlib import Path
-from typing import Optional, Dict, List
+from typing import Optional, Dict, List, Tuple
 from functools import lru_cache
 import os
 
@@ -13,6 +14,10 @@ SECTORS_FILE = Path(__file__).parent.parent / "data" / "sectors.json"
 _sectors_data_cache: Optional[Dict] = None
 _sectors_file_mtime: Optional[float] = None
 
+# Per-sector keyword patterns, keyed on the sectors data they were built from
+_sector_matchers: List[Tuple[Dict, "re.Pattern"]] = []
+_sector_matchers_source: Optional[Dict] = None
+
 
 def load_sectors_data() -> Dict:
     """Load sectors data from JSON file with in-memory caching.
@@ -31,7 +36,7 @@ def load_sectors_data() -> Dict:
     # Reload if cache is None or file was modified
     if _sectors_data_cache is None or _sectors_file_mtime != current_mtime:
         try:
-            with open(SECTORS_FILE, 'r') as f:
+            with open(SECTORS_FILE, 'r', encoding='utf-8') as f:
                 _sectors_data_cache = json.load(f)
             _sectors_file_mtime = current_mtime
             
@@ -52,9 +57,11 @@ def load_sectors_data() -> Dict:
 
 def clear_sectors_cache():
     """Clear the sectors data cache (useful for testing or forced reload)."""
-    global _sectors_data_cache, _sectors_file_mtime
+    global _sectors_data_cache, _sectors_file_mtime, _sector_matchers, _sector_matchers_source
     _sectors_data_cache = None
     _sectors_file_mtime = None
+    _sector_matchers = []
+    _sector_matchers_source = None
 
 
 def get_sector_by_keyword(keyword: str) -> Optional[Dict]:
@@ -71,46 +78,51 @@ def get_sector_by_keyword(keyword: str) -> Optional[Dict]:
     return None
 
 
-def get_sectors_by_keywords(text: str) -> List[Dict]:
-    """Extract multiple sectors from text based on keywords."""
-    import re
-    data = load_sectors_data()
-    text_lower = text.lower()
-    found_sectors = []
-    seen_names = set()
-    
-    # Note: Sector keywords from sectors.json will be matched below
-    # No hardcoded alias mappings - everything goes through keyword matching
-    
-    # Then check sector names and keywords (but skip if already found via alias)
+def _get_sector_matchers(data: Dict) -> List[Tuple[Dict, "re.Pattern"]]:
+    """Return one compiled pattern per sector, rebuilt when sectors data is reloaded.
+
+    Each pattern matches the sector name or any single-word keyword as a whole
+    word, and any multi-word keyword as a substring.
+    """
+    global _sector_matchers, _sector_matchers_source
+    if _sector_matchers_source is data:
+        return _sector_matchers
+
+    matchers = []
     for sector in data['sectors']:
-        if sector['name'] in seen_names:
-            continue
-            
-        # Check if sector name appears in text (as whole word)
-        sector_name_lower = sector['name'].lower()
-        if re.search(rf'\b{sector_name_lower}\b', text_lower):
-            found_sectors.append(sector)
-            seen_names.add(sector['name'])
-            continue
-            
-        # Check keywords (prefer whole word matches)
+        words = [sector['name'].lower()]
+        phrases = []
         for keyword in sector['keywords']:
             keyword_lower = keyword.lower()
-            # Use word boundary for multi-word keywords, otherwise substring
-            if ' ' in keyword_lower:
-                if keyword_lower in text_lower:
-                    found_sectors.append(sector)
-                    seen_names.add(sector['name'])
-                    break
-            else:
-                # Single word - use word boundary to avoid substring matches
-                if re.search(rf'\b{re.escape(keyword_lower)}\b', text_lower):
-                    found_sectors.append(sector)
-                    seen_names.add(sector['name'])
-                    break
-    
-    return found_sectors
+            (phrases if ' ' in keyword_lower else words).append(keyword_lower)
+        pattern = rf"\b(?:{'|'.join(map(re.escape, words))})\b"
+        if phrases:
+            pattern += '|' + '|'.join(map(re.escape, phrases))
+        matchers.append((sector, re.compile(pattern)))
+
+    _sector_matchers = matchers
+    _sector_matchers_source = data
+    return matchers
+
+
+def get_sectors_by_keywords(text: str) -> List[Dict]:
+    """Extract multiple sectors from text based on keywords."""
+    text_lower = text.lower()
+    return [
+        sector
+        for sector, matcher in _get_sector_matchers(load_sectors_data())
+        if matcher.search(text_lower)
+    ]
+
+
+def find_sector_mentions(text: str) -> List[Tuple[int, int, Dict]]:
+    """(start, end, sector) for every sector name/keyword match in text, grouped in sectors.json order."""
+    text_lower = text.lower()
+    return [
+        (*match.span(), sector)
+        for sector, matcher in _get_sector_matchers(load_sectors_data())
+        for match in matcher.finditer(text_lower)
+    ]
 
 
 def get_stocks_for_sectors(sector_names: List[str]) -> List[Dict]:
@@ -1,14 +1,75 @@
 """Ticker lookup and classification with web search."""
 
+import os
 import json
 import re
+import asyncio
 import logging
 from pathlib import Path
-from typing import Optional, Dict, List, Tuple
+from typing import Optional, Dict, List, Tuple, Union
 from .sector_data import load_sectors_data, SECTORS_FILE
+from .backboard_client import BackboardClient, coerce_msg, dumps_indented, response_content, ERROR_RE, NONSUBSTANTIAL_RE
 
 logger = logging.getLogger(__name__)
 
+# openai is optional - used to classify tickers when Backboard is not configured
+try:
+    import openai
+    OPENAI_AVAILABLE = True
+except ImportError:
+    openai = None
+    OPENAI_AVAILABLE = False
+
+# httpx is optional - used to scrape Yahoo Finance as the last classification fallback
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    httpx = None
+    HTTPX_AVAILABLE = False
+
+# JSON in model replies: ```json fenced block, a (one-level nested) object, or a flat object
+_JSON_FENCE_RE = re.compile(r'```json\s*(.*?)\s*```', re.DOTALL)
+_JSON_OBJECT_RE = re.compile(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', re.DOTALL)
+_FLAT_JSON_RE = re.compile(r'\{[^}]+\}')
+_JSON_ARRAY_RE = re.compile(r'\[.*\]', re.DOTALL)
+# Yahoo Finance profile page fields
+_HTML_NAME_RE = re.compile(r'<h1[^>]*>([^<]+)</h1>')
+_HTML_SECTOR_RE = re.compile(r'Sector[^>]*>([^<]+)</span>', re.IGNORECASE)
+_HTML_SECTOR_CELL_RE = re.compile(r'data-test="SECTOR-value"[^>]*>([^<]+)</td>', re.IGNORECASE)
+_HTML_MARKET_CAP_RE = re.compile(r'Market Cap[^>]*>([^<]+)</span>', re.IGNORECASE)
+_MARKET_CAP_NUMBER_RE = re.compile(r'([\d.]+)')
+
+
+def _is_substantial_reply(text) -> bool:
+    """A string long enough to be the model's answer rather than a delivery confirmation."""
+    return isinstance(text, str) and len(text) > 50 and not NONSUBSTANTIAL_RE.search(text)
+
+
+_REQUIRED_CLASSIFICATION_FIELDS = ('ticker', 'name', 'sector', 'market_cap', 'industry_risk')
+
+
+def _validated_classification(classification, ticker: str, valid_sectors: List[str]) -> Optional[Dict]:
+    """The model's classification for `ticker` with the ticker normalized, or None if incomplete or off-list."""
+    if not isinstance(classification, dict):
+        logger.warning(f"Unexpected classification for ticker {ticker}: {classification!r:.200}")
+        return None
+    if not all(k in classification for k in _REQUIRED_CLASSIFICATION_FIELDS):
+        missing = [f for f in _REQUIRED_CLASSIFICATION_FIELDS if f not in classification]
+        logger.warning(f"Missing required fields for ticker {ticker}: {missing}")
+        return None
+    # Check for error
+    if 'error' in classification:
+        logger.warning(f"Backboard returned error for ticker {ticker}: {classification.get('error')}")
+        return None
+    # Validate sector is one of our 11 sectors
+    if classification['sector'] not in valid_sectors:
+        logger.warning(f"Invalid sector '{classification['sector']}' for ticker {ticker}. Valid sectors: {valid_sectors}")
+        return None
+    # Ensure ticker matches
+    classification['ticker'] = ticker.upper()
+    return classification
+
 
 def ticker_exists(ticker: str) -> bool:
     """Check if ticker exists in database."""
@@ -70,8 +131,6 @@ async def _classify_ticker_with_backboard(ticker: str) -> Optional[Dict]:
     
     Returns classification dict or None if Backboard is not available.
     """
-    import os
-    
     # Check if Backboard API key is available
     backboard_api_key = os.getenv("BACKBOARD_API_KEY")
     if not backboard_api_key:
@@ -79,7 +138,6 @@ async def _classify_ticker_with_backboard(ticker: str) -> Optional[Dict]:
         return None
     
     try:
-        from .backboard_client import BackboardClient
         backboard_client = BackboardClient()
         
         if not backboard_client._sdk_client:
@@ -163,7 +221,6 @@ Return JSON only, no explanation."""
             # If add_message fails with validation error, the message was still sent
             # We need to wait and fetch the AI response from thread messages
             logger.warning(f"Backboard add_message failed, trying to get thread messages: {e}")
-            import asyncio
             
             # Wait longer for AI to process (validation error means message was sent)
             await asyncio.sleep(4)  # Give AI more time to respond
@@ -191,37 +248,15 @@ Return JSON only, no explanation."""
                         msg_list = messages.messages if isinstance(messages.messages, list) else [messages.messages]
                     
                     # Find the latest assistant message (usually the last one)
-                    for msg in reversed(msg_list):
-                        # Check if this is an assistant message
-                        is_assistant = False
-                        if hasattr(msg, 'role'):
-                            role = msg.role
-                            # Handle enum or string
-                            if hasattr(role, 'value'):
-                                is_assistant = role.value in ['assistant', 'ai', 'bot'] or 'ASSISTANT' in str(role)
-                            else:
-                                is_assistant = str(role).lower() in ['assistant', 'ai', 'bot'] or 'ASSISTANT' in str(role).upper()
-                        elif isinstance(msg, dict):
-                            is_assistant = msg.get('role', '').lower() in ['assistant', 'ai', 'bot']
-                        
-                        # Get content
-                        content = None
-                        if hasattr(msg, 'content'):
-                            content = msg.content
-                        elif isinstance(msg, dict):
-                            content = msg.get('content', '')
-                        
-                        if content and len(content) > 50:
-                            # Check if it's an error message
-                            content_lower = content.lower()
-                            if ("llm error" not in content_lower and 
-                                "api error" not in content_lower and 
-                                "invalid model" not in content_lower):
-                                # Prefer assistant messages, but take any substantial message if no role info
-                                if is_assistant or not hasattr(msg, 'role'):
-                                    response_text = content
-                                    logger.info(f"Found AI response in thread messages (length: {len(response_text)}, role: {getattr(msg, 'role', 'unknown')})")
-                                    break
+                    for msg in map(coerce_msg, reversed(msg_list)):
+                        content = msg.content
+                        # Skip error messages
+                        if content and len(content) > 50 and not ERROR_RE.search(content):
+                            # Prefer assistant messages, but take any substantial message if no role info
+                            if msg.role in ("assistant", ""):
+                                response_text = content
+                                logger.info(f"Found AI response in thread messages (length: {len(response_text)}, role: {msg.role or 'unknown'})")
+                                break
             except Exception as fetch_error:
                 logger.warning(f"Could not fetch thread messages: {fetch_error}")
                 # Try one more time after a longer wait
@@ -230,13 +265,12 @@ Return JSON only, no explanation."""
                     if hasattr(backboard_client._sdk_client, 'get_messages'):
                         messages = await backboard_client._sdk_client.get_messages(thread_id=thread_id)
                         if messages and isinstance(messages, list):
-                            for msg in reversed(messages):
-                                if hasattr(msg, 'content'):
-                                    content = msg.content
-                                    if content and len(content) > 50 and "llm error" not in content.lower():
-                                        response_text = content
-                                        logger.info(f"Found AI response on retry (length: {len(response_text)})")
-                                        break
+                            for msg in map(coerce_msg, reversed(messages)):
+                                content = msg.content
+                                if content and len(content) > 50 and not ERROR_RE.search(content):
+                                    response_text = content
+                                    logger.info(f"Found AI response on retry (length: {len(response_text)})")
+                                    break
                 except Exception:
                     pass
         
@@ -254,7 +288,7 @@ Return JSON only, no explanation."""
             return None
         
         # Check if response is an error
-        if "llm error" in response_text.lower() or "api error" in response_text.lower() or "invalid model" in response_text.lower():
+        if ERROR_RE.search(response_text):
             logger.warning(f"Backboard returned error: {response_text[:200]}")
             return None
         
@@ -263,37 +297,17 @@ Return JSON only, no explanation."""
         # Parse JSON from response
         try:
             # Try to extract JSON from markdown code blocks first
-            json_match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
+            json_match = _JSON_FENCE_RE.search(response_text)
             if json_match:
                 response_text = json_match.group(1)
             else:
                 # Try to find JSON object directly
-                json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', response_text, re.DOTALL)
+                json_match = _JSON_OBJECT_RE.search(response_text)
                 if json_match:
                     response_text = json_match.group(0)
             
             classification = json.loads(response_text)
-            
-            # Validate required fields
-            required_fields = ['ticker', 'name', 'sector', 'market_cap', 'industry_risk']
-            if all(k in classification for k in required_fields):
-                # Check for error
-                if 'error' in classification:
-                    logger.warning(f"Backboard returned error for ticker {ticker}: {classification.get('error')}")
-                    return None
-                
-                # Validate sector is one of our 11 sectors
-                if classification['sector'] in valid_sectors:
-                    # Ensure ticker matches
-                    classification['ticker'] = ticker.upper()
-                    return classification
-                else:
-                    logger.warning(f"Invalid sector '{classification['sector']}' for ticker {ticker}. Valid sectors: {valid_sectors}")
-                    return None
-            else:
-                missing = [f for f in required_fields if f not in classification]
-                logger.warning(f"Missing required fields for ticker {ticker}: {missing}")
-                return None
+            return _validated_classification(classification, ticker, valid_sectors)
         except json.JSONDecodeError as e:
             logger.error(f"Failed to parse JSON from Backboard response for ticker {ticker}: {e}")
             logger.error(f"Response text: {response_text[:500]}")
@@ -304,28 +318,132 @@ Return JSON only, no explanation."""
         return None
 
 
+async def _classify_tickers_with_backboard(tickers: List[str]) -> Dict[str, Dict]:
+    """
+    Classify several tickers with one Backboard request.
+    
+    Returns {ticker: classification} for the tickers the reply covered with a valid
+    classification; empty if Backboard is not available or the reply could not be parsed.
+    """
+    if not os.getenv("BACKBOARD_API_KEY"):
+        logger.debug("BACKBOARD_API_KEY not set, skipping Backboard batch classification")
+        return {}
+    
+    try:
+        backboard_client = BackboardClient()
+        if not backboard_client._sdk_client:
+            logger.debug("Backboard SDK client not initialized, skipping Backboard batch classification")
+            return {}
+        
+        sectors_data = load_sectors_data()
+        valid_sectors = [s['name'] for s in sectors_data['sectors']]
+        sectors_list = ", ".join(valid_sectors)
+        tickers_list = ", ".join(tickers)
+        
+        prompt = f"""You are a financial data classifier. Search the web for current information about these stock tickers: {tickers_list}
+
+Return ONLY a valid JSON array with one object per ticker, in the order given:
+[
+  {{
+    "ticker": "AAPL",
+    "name": "Apple Inc.",
+    "sector": "Technology",
+    "market_cap": "large",
+    "industry_risk": "medium"
+  }}
+]
+
+Sector: EXACTLY one of: {sectors_list}
+Market cap: "large" (>$10B), "medium" ($2-10B), "small" (<$2B), or "etf" (ETF/fund)
+Industry risk: "low", "medium", "high", or "very_high"
+
+If you cannot find a ticker, put {{"ticker": "XXX", "error": "Ticker not found"}} in its place.
+Return JSON only, no explanation."""
+        
+        assistant_id = await backboard_client._ensure_assistant()
+        if not assistant_id:
+            logger.debug("Could not get Backboard assistant, skipping Backboard batch classification")
+            return {}
+        
+        thread = await backboard_client._sdk_client.create_thread(assistant_id=assistant_id)
+        thread_id = getattr(thread, 'id', None) or getattr(thread, 'thread_id', None) or str(thread)
+        
+        response_text = None
+        try:
+            try:
+                # Use the assistant's default model first
+                response = await backboard_client._sdk_client.add_message(thread_id=thread_id, content=prompt)
+            except Exception as e:
+                error_str = str(e).lower()
+                if "validation" in error_str and "field required" in error_str:
+                    # The message was sent and answered - only the SDK's response parsing failed; don't resend
+                    raise
+                logger.debug(f"Calling without model failed, trying with model: {e}")
+                response = await backboard_client._sdk_client.add_message(
+                    thread_id=thread_id,
+                    content=prompt,
+                    llm_provider="openai",
+                    model_name="gpt-4o-mini"
+                )
+            response_text = response_content(response)
+        except Exception as e:
+            # The message was still sent - wait for the reply in the thread
+            logger.warning(f"Backboard add_message failed, trying to get thread messages: {e}")
+            response_text = await backboard_client._poll_for_assistant_reply(thread_id)
+        
+        if not response_text or ERROR_RE.search(response_text):
+            logger.warning(f"No usable Backboard reply for tickers {tickers_list}")
+            return {}
+        
+        logger.info(f"Backboard response for tickers {tickers_list} (first 500 chars): {response_text[:500]}")
+        
+        json_match = _JSON_FENCE_RE.search(response_text) or _JSON_ARRAY_RE.search(response_text)
+        if json_match:
+            response_text = json_match.group(json_match.lastindex or 0)
+        try:
+            items = json.loads(response_text)
+        except json.JSONDecodeError as e:
+            logger.error(f"Failed to parse JSON from Backboard response for tickers {tickers_list}: {e}")
+            return {}
+        if isinstance(items, dict):
+            items = [items]
+        if not isinstance(items, list):
+            logger.warning(f"Unexpected Backboard reply for tickers {tickers_list}: {type(items).__name__}")
+            return {}
+        
+        # Match items by their ticker field; the model may skip or reorder entries
+        wanted = set(tickers)
+        classifications = {}
+        for item in items:
+            ticker = str(item.get('ticker', '')).upper() if isinstance(item, dict) else ''
+            if ticker in wanted and ticker not in classifications:
+                classification = _validated_classification(item, ticker, valid_sectors)
+                if classification:
+                    classifications[ticker] = classification
+        return classifications
+    
+    except Exception as e:
+        logger.warning(f"Error using Backboard for tickers {tickers}: {e}")
+        return {}
+
+
 async def _classify_ticker_with_openai(ticker: str) -> Optional[Dict]:
     """
     Use OpenAI API directly to search and classify ticker.
     
     Returns classification dict or None if OpenAI is not available.
     """
-    import os
-    
     # Check if OpenAI API key is available
     openai_api_key = os.getenv("OPENAI_API_KEY")
     if not openai_api_key:
         logger.debug("OPENAI_API_KEY not set, skipping OpenAI classification")
         return None
     
+    if not OPENAI_AVAILABLE:
+        logger.debug("openai package not installed, skipping OpenAI classification")
+        return None
+    
     try:
-        # Try to import openai
-        try:
-            import openai
-        except ImportError:
-            logger.debug("openai package not installed, skipping OpenAI classification")
-            return None
-        
         # Initialize OpenAI client
         client = openai.AsyncOpenAI(api_key=openai_api_key)
         
@@ -400,12 +518,12 @@ Return JSON only, no explanation."""
         # Parse JSON from response
         try:
             # Try to extract JSON from markdown code blocks first
-            json_match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
+            json_match = _JSON_FENCE_RE.search(response_text)
             if json_match:
                 response_text = json_match.group(1)
             else:
                 # Try to find JSON object directly
-                json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', response_text, re.DOTALL)
+                json_match = _JSON_OBJECT_RE.search(response_text)
                 if json_match:
                     response_text = json_match.group(0)
             
@@ -448,7 +566,9 @@ async def _classify_ticker_with_web_search(ticker: str) -> Optional[Dict]:
     This is a fallback when OpenAI is not available.
     Uses multiple sources to gather company information.
     """
-    import httpx
+    if not HTTPX_AVAILABLE:
+        logger.debug("httpx package not installed, skipping web search classification")
+        return None
     
     ticker_upper = ticker.upper()
     sectors_data = load_sectors_data()
@@ -470,22 +590,22 @@ async def _classify_ticker_with_web_search(ticker: str) -> Optional[Dict]:
                     html = response.text
                     
                     # Extract company name
-                    name_match = re.search(r'<h1[^>]*>([^<]+)</h1>', html)
+                    name_match = _HTML_NAME_RE.search(html)
                     if name_match:
                         company_name = name_match.group(1).strip()
                     
                     # Try to find sector in the HTML
                     # Yahoo Finance typically has sector info in the page
-                    sector_match = re.search(r'Sector[^>]*>([^<]+)</span>', html, re.IGNORECASE)
+                    sector_match = _HTML_SECTOR_RE.search(html)
                     if not sector_match:
-                        sector_match = re.search(r'data-test="SECTOR-value"[^>]*>([^<]+)</td>', html, re.IGNORECASE)
+                        sector_match = _HTML_SECTOR_CELL_RE.search(html)
                     if sector_match:
                         sector_raw = sector_match.group(1).strip()
                         # Map Yahoo Finance sectors to our sectors
                         sector = _map_yahoo_sector_to_our_sector(sector_raw, valid_sectors)
                     
                     # Try to get market cap info
-                    market_cap_match = re.search(r'Market Cap[^>]*>([^<]+)</span>', html, re.IGNORECASE)
+                    market_cap_match = _HTML_MARKET_CAP_RE.search(html)
                     if market_cap_match:
                         market_cap_str = _classify_market_cap(market_cap_match.group(1))
                     
@@ -557,10 +677,8 @@ def _map_yahoo_sector_to_our_sector(yahoo_sector: str, valid_sectors: List[str])
 
 def _classify_market_cap(market_cap_str: str) -> str:
     """Classify market cap string into our categories."""
-    import re
-    
     # Extract number from string (e.g., "$100B" -> 100)
-    match = re.search(r'([\d.]+)', market_cap_str.replace(',', ''))
+    match = _MARKET_CAP_NUMBER_RE.search(market_cap_str.replace(',', ''))
     if not match:
         return "medium"
     
@@ -759,7 +877,6 @@ Return JSON only, no explanation."""
                         pass
             
             # Wait for AI to process, then try to get messages from thread
-            import asyncio
             await asyncio.sleep(3)  # Give AI more time to respond
             
             # Try to get messages from the thread using available methods
@@ -783,54 +900,24 @@ Return JSON only, no explanation."""
                     
                     # Find the latest AI/assistant message (not user or system messages)
                     if messages:
-                        # Messages might be in different formats
+                        # Messages might be a list or an object with a messages attribute
                         if isinstance(messages, list):
-                            # Find the most recent assistant/AI message
-                            for msg in reversed(messages):
-                                # Check if this is an assistant/AI message (not user or system)
-                                is_assistant = False
-                                if hasattr(msg, 'role'):
-                                    is_assistant = msg.role in ['assistant', 'ai', 'bot']
-                                elif isinstance(msg, dict):
-                                    is_assistant = msg.get('role') in ['assistant', 'ai', 'bot'] or msg.get('type') == 'assistant'
-                                
-                                # Also check if content exists and is substantial (not just "Message added successfully")
-                                content = None
-                                if hasattr(msg, 'content'):
-                                    content = msg.content
-                                elif isinstance(msg, dict) and 'content' in msg:
-                                    content = msg['content']
-                                
-                                if content and len(content) > 50:  # Substantial content
-                                    # If we found role info, prefer assistant messages
-                                    # Otherwise, take any substantial message (likely the AI response)
-                                    if is_assistant or not hasattr(msg, 'role'):
-                                        response_text = content
-                                        response = msg
-                                        logger.info(f"Found AI response in thread messages (length: {len(response_text)}, role: {getattr(msg, 'role', 'unknown') if hasattr(msg, 'role') else msg.get('role', 'unknown')})")
-                                        break
+                            msg_list = messages
                         elif hasattr(messages, 'messages'):
-                            # Messages object with messages attribute
                             msg_list = messages.messages if isinstance(messages.messages, list) else [messages.messages]
-                            for msg in reversed(msg_list):
-                                # Check if this is an assistant message
-                                is_assistant = False
-                                if hasattr(msg, 'role'):
-                                    is_assistant = msg.role in ['assistant', 'ai', 'bot']
-                                elif isinstance(msg, dict):
-                                    is_assistant = msg.get('role') in ['assistant', 'ai', 'bot']
-                                
-                                content = None
-                                if hasattr(msg, 'content'):
-                                    content = msg.content
-                                elif isinstance(msg, dict) and 'content' in msg:
-                                    content = msg['content']
-                                
-                                if content and len(content) > 50:
-                                    if is_assistant or not hasattr(msg, 'role'):
-                                        response_text = content
-                                        response = msg
-                                        break
+                        else:
+                            msg_list = []
+                        # Newest substantial message; without role info, take any substantial one
+                        found = next((
+                            (msg, coerced)
+                            for msg in reversed(msg_list)
+                            for coerced in (coerce_msg(msg),)
+                            if coerced.content and len(coerced.content) > 50 and coerced.role in ("assistant", "")
+                        ), None)
+                        if found:
+                            response, coerced = found
+                            response_text = coerced.content
+                            logger.info(f"Found AI response in thread messages (length: {len(response_text)}, role: {coerced.role or 'unknown'})")
                 except Exception as fetch_error:
                     logger.warning(f"Could not fetch thread messages: {fetch_error}")
         
@@ -855,36 +942,20 @@ Return JSON only, no explanation."""
                 if 'message' in raw_response_data:
                     msg = raw_response_data['message']
                     if isinstance(msg, dict):
-                        # Message is a dict, look for content
-                        if 'content' in msg:
-                            content = msg['content']
-                            # Skip if it's just a confirmation message
-                            if len(content) > 50 and 'successfully' not in content.lower():
-                                response_text = content
-                        elif 'text' in msg:
-                            content = msg['text']
-                            if len(content) > 50 and 'successfully' not in content.lower():
-                                response_text = content
-                        elif 'body' in msg:
-                            content = msg['body']
-                            if len(content) > 50 and 'successfully' not in content.lower():
-                                response_text = content
+                        # Message is a dict, look for content (skip if it's just a confirmation message)
+                        key = next((k for k in ('content', 'text', 'body') if k in msg), None)
+                        if key is not None:
+                            if _is_substantial_reply(msg[key]):
+                                response_text = msg[key]
                         else:
                             # Try to find any substantial string value in the message dict
-                            for key, value in msg.items():
-                                if isinstance(value, str) and len(value) > 50 and 'successfully' not in value.lower():
-                                    response_text = value
-                                    break
-                    elif isinstance(msg, str) and len(msg) > 50 and 'successfully' not in msg.lower():
+                            response_text = next((v for v in msg.values() if _is_substantial_reply(v)), response_text)
+                    elif _is_substantial_reply(msg):
                         response_text = msg
-                elif 'content' in raw_response_data:
-                    content = raw_response_data['content']
-                    if len(content) > 50 and 'successfully' not in content.lower():
-                        response_text = content
-                elif 'text' in raw_response_data:
-                    content = raw_response_data['text']
-                    if len(content) > 50 and 'successfully' not in content.lower():
-                        response_text = content
+                else:
+                    key = next((k for k in ('content', 'text') if k in raw_response_data), None)
+                    if key is not None and _is_substantial_reply(raw_response_data[key]):
+                        response_text = raw_response_data[key]
                 
                 if response_text:
                     logger.info(f"Extracted response text from raw_response_data (length: {len(response_text)})")
@@ -912,8 +983,7 @@ Return JSON only, no explanation."""
             return None
         
         # Check if the response is an error message from the LLM API
-        response_lower = response_text.lower()
-        if "llm error" in response_lower or "api error" in response_lower or "invalid model" in response_lower:
+        if ERROR_RE.search(response_text):
             logger.error(f"LLM API error in response for ticker {ticker}: {response_text[:200]}")
             logger.error("This usually means the assistant is not configured with a valid model.")
             logger.error("Please configure the assistant in Backboard dashboard with a supported model.")
@@ -923,10 +993,10 @@ Return JSON only, no explanation."""
         
         # Parse JSON from response
         # Try to extract JSON from markdown code blocks first
-        json_match = re.search(r'```json\s*(.*?)\s*```', response_text, re.DOTALL)
+        json_match = _JSON_FENCE_RE.search(response_text)
         if not json_match:
             # Try to find JSON object directly (multiline)
-            json_match = re.search(r'\{[^{}]*(?:\{[^{}]*\}[^{}]*)*\}', response_text, re.DOTALL)
+            json_match = _JSON_OBJECT_RE.search(response_text)
         
         if json_match:
             try:
@@ -955,7 +1025,7 @@ Return JSON only, no explanation."""
             logger.warning(f"No JSON found in AI response for ticker {ticker}")
             logger.warning(f"Full response: {response_text[:500]}")
             # Try one more time with a simpler regex
-            simple_json = re.search(r'\{[^}]+\}', response_text)
+            simple_json = _FLAT_JSON_RE.search(response_text)
             if simple_json:
                 try:
                     classification = json.loads(simple_json.group(0))
@@ -1017,8 +1087,8 @@ def add_ticker_to_database(classification: Dict) -> bool:
         sector_found['stocks'].append(new_stock)
         
         # Save to file
-        with open(SECTORS_FILE, 'w') as f:
-            json.dump(data, f, indent=2)
+        with open(SECTORS_FILE, 'w', encoding='utf-8') as f:
+            f.write(dumps_indented(data))
         
         logger.info(f"Added ticker {ticker_upper} to {sector_name} sector")
         return True
@@ -1057,8 +1127,6 @@ async def lookup_or_add_ticker(ticker: str) -> Tuple[bool, Optional[str]]:
             return False, "No match found - unable to classify ticker from web search. Check server logs for AI response details."
     except Exception as e:
         logger.error(f"Error during ticker classification for {ticker_upper}: {e}", exc_info=True)
-        import traceback
-        logger.error(f"Traceback: {traceback.format_exc()}")
         return False, f"Error during web search: {str(e)}"
     
     if not classification:
@@ -1070,3 +1138,43 @@ async def lookup_or_add_ticker(ticker: str) -> Tuple[bool, Optional[str]]:
     else:
         return False, "Failed to add ticker to database"
 
+
+async def lookup_or_add_tickers(tickers: List[str]) -> List[Union[Tuple[bool, Optional[str]], BaseException]]:
+    """
+    Lookup or add several tickers, classifying the unknown ones with one Backboard request.
+    
+    Tickers the batch reply does not cover go through lookup_or_add_ticker (Backboard,
+    OpenAI, then web search) concurrently.
+    
+    Returns:
+        One entry per input ticker, in order: the (success, message) pair of
+        lookup_or_add_ticker, or the exception raised for that ticker
+        (like asyncio.gather(..., return_exceptions=True)).
+    """
+    tickers_upper = [ticker.upper() for ticker in tickers]
+    results: Dict[str, Union[Tuple[bool, Optional[str]], BaseException]] = {}
+    unknown = []
+    for ticker_upper in dict.fromkeys(tickers_upper):
+        if ticker_exists(ticker_upper):
+            results[ticker_upper] = (True, "Found in database")
+        else:
+            unknown.append(ticker_upper)
+    
+    # A single unknown ticker gains nothing from the batch prompt
+    classified = await _classify_tickers_with_backboard(unknown) if len(unknown) > 1 else {}
+    for ticker_upper, classification in classified.items():
+        logger.info(f"Successfully classified ticker {ticker_upper} using Backboard batch: {classification}")
+        if add_ticker_to_database(classification):
+            results[ticker_upper] = (True, f"Added to database (classified as {classification['sector']})")
+        else:
+            results[ticker_upper] = (False, "Failed to add ticker to database")
+    
+    remaining = [ticker_upper for ticker_upper in unknown if ticker_upper not in results]
+    if remaining:
+        fallback_results = await asyncio.gather(
+            *(lookup_or_add_ticker(ticker_upper) for ticker_upper in remaining),
+            return_exceptions=True,
+        )
+        results.update(zip(remaining, fallback_results))
+    
+    return [results[ticker_upper] for ticker_upper in tickers_upper]
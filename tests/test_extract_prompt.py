@@ -0,0 +1,41 @@
+"""Guards on the size and coverage of the compact profile-extraction prompt."""
+import asyncio
+
+import pytest
+
+from backend import backboard_client
+from backend.models import Constraints, InvestorProfile, Objective, Preferences
+
+# The compact prompt was sized to stay within this many gpt-4o-mini tokens
+MAX_PROMPT_TOKENS = 800
+# Rough upper bound (~4 chars per token) checked when tiktoken is not installed
+MAX_PROMPT_CHARS = MAX_PROMPT_TOKENS * 4
+
+
+@pytest.fixture(scope="module")
+def extract_prompt() -> str:
+    backboard_client._extract_system_prompt_cache = None
+    return asyncio.run(backboard_client._extract_system_prompt())
+
+
+def test_extract_prompt_within_token_budget(extract_prompt):
+    tiktoken = pytest.importorskip("tiktoken")
+    encoding = tiktoken.encoding_for_model("gpt-4o-mini")
+    assert len(encoding.encode(extract_prompt)) <= MAX_PROMPT_TOKENS
+
+
+def test_extract_prompt_within_char_budget(extract_prompt):
+    assert len(extract_prompt) <= MAX_PROMPT_CHARS
+
+
+@pytest.mark.parametrize("model", [InvestorProfile, Objective, Constraints, Preferences])
+def test_extract_prompt_names_every_field(extract_prompt, model):
+    missing = [name for name in model.model_fields if f'"{name}"' not in extract_prompt]
+    assert not missing
+
+
+def test_extract_prompt_template_has_only_alias_placeholder():
+    # Every other brace in the template is an escaped JSON literal
+    prompt = backboard_client._EXTRACT_SYSTEM_PROMPT_TEMPLATE.format_map({"alias_mapping_text": ""})
+    assert "{alias_mapping_text}" not in prompt
+    assert "{{" not in prompt
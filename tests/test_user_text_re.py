@@ -0,0 +1,48 @@
+"""User-text patterns must behave the same under RE2 as under stdlib re."""
+import re
+
+import pytest
+
+from backend import backboard_client
+
+HORIZON_TEXTS = [
+    "retirement in 10 years",
+    "I'm investing for 20 years",
+    "my investment horizon is 5 years",
+    "7 year horizon, maybe 3 years",
+    "3 years and 18 months",
+    "need cash in 24 months",
+    "18 months",
+    "no numbers here",
+]
+MAX_POSITION_TEXTS = [
+    "max 15% per position",
+    "10% per position, maximum 12.5%",
+    "no single position should exceed 8%",
+    "it should not exceed 20%",
+    "max 12 holdings",
+]
+
+
+def _lastindex_matches(pattern, text: str) -> list[tuple]:
+    return [(m.lastindex, m.group(m.lastindex), m.span()) for m in pattern.finditer(text)]
+
+
+@pytest.mark.parametrize(
+    "compiled, texts",
+    [
+        (backboard_client._HORIZON_NUMBER_RE, HORIZON_TEXTS),
+        (backboard_client._MAX_POSITION_RE, MAX_POSITION_TEXTS),
+    ],
+)
+def test_re2_lastindex_matches_stdlib(compiled, texts):
+    re2 = pytest.importorskip("re2")
+    with_re2 = re2.compile(compiled.pattern)
+    with_re = re.compile(compiled.pattern)
+    for text in texts:
+        assert _lastindex_matches(with_re2, text) == _lastindex_matches(with_re, text)
+
+
+def test_avoid_phrase_needs_word_start():
+    assert not backboard_client._AVOID_PHRASE_RE.search("casino stocks, piano makers")
+    assert backboard_client._AVOID_PHRASE_RE.search("no tobacco").group(1) == "tobacco"